@@ -0,0 +1,441 @@
+"""
+crawl_frontier.py : Persistent crawl frontier for Kapook and TrueID discovery
+คิวลิงก์สำหรับไล่เก็บสูตรอาหารแบบ breadth-first เก็บสถานะใน SQLite หยุดแล้วทำต่อได้
+
+    python crawl_frontier.py kapook --max-pages 200
+    python crawl_frontier.py trueid --max-pages 500 --max-depth 3
+    python crawl_frontier.py stats
+"""
+import re
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+from bs4 import BeautifulSoup
+
+from fetcher import get_fetcher
+from rate_limiter import HostRateLimiter
+from recipe_store import RecipeStore
+from scrape_metrics import get_metrics
+from scrape_pipeline import (
+    DEFAULT_PARSE_WORKERS, default_window, iter_fetch_parse, open_pools, resolve_parse_workers
+)
+
+DEFAULT_FRONTIER_PATH = Path(__file__).parent / "crawl_frontier.db"
+
+PENDING, FETCHED, FAILED = "pending", "fetched", "failed"
+RECIPE, LISTING = "recipe", "listing"
+
+# Query parameters that never change page content
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|ref|share|from)$', re.IGNORECASE)
+
+# Per-site URL patterns (matched against normalized URLs)
+SITES = {
+    "kapook": {
+        "host": "cooking.kapook.com",
+        "seeds": ["https://cooking.kapook.com/"],
+        "recipe": re.compile(r'^https://cooking\.kapook\.com/view\d+\.html$'),
+        "listing": re.compile(
+            r'^https://cooking\.kapook\.com/(?:$|(?:category|tag|menu|list)/|.*[?&]page=\d+|page/\d+)'
+        ),
+        "recipe_query": True,
+    },
+    "trueid": {
+        "host": "food.trueid.net",
+        "seeds": ["https://food.trueid.net/detail/M6oyloE4klNB"],
+        # Collections are also /detail/ pages; pages that do not parse as a
+        # recipe are still followed for links
+        "recipe": re.compile(r'^https://food\.trueid\.net/detail/\w+$'),
+        "listing": re.compile(
+            r'^https://food\.trueid\.net/(?:$|(?:category|tag|recipe|food)/|.*[?&]page=\d+)'
+        ),
+        # Recipe URLs carry only tracking parameters
+        "recipe_query": False,
+    },
+}
+
+
+def normalize_url(url, keep_query=True):
+    """
+    Canonical form of a URL used as the frontier's dedup key
+
+    Lowercases scheme and host, upgrades http to https, drops the fragment,
+    default port, trailing slash and tracking parameters, and sorts the
+    remaining query parameters.
+
+    Args:
+        url (str): Absolute URL
+        keep_query (bool): Keep non-tracking query parameters (pagination)
+
+    Returns:
+        str: Normalized URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = "https" if parts.scheme.lower() in ("http", "https") else parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = re.sub(r'/{2,}', '/', parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+    query = ""
+    if keep_query:
+        params = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                  if not TRACKING_PARAMS.match(k)]
+        query = urlencode(sorted(params))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def url_key(site, url):
+    """
+    Normalized frontier key of a URL on a site
+
+    Listing pages keep their (pagination) query; on sites whose recipe
+    URLs only carry tracking parameters the query is dropped entirely.
+    """
+    bare = normalize_url(url, keep_query=False)
+    if not SITES[site]["recipe_query"] and SITES[site]["recipe"].match(bare):
+        return bare
+    return normalize_url(url)
+
+
+def classify(site, url):
+    """"recipe", "listing" or None for a normalized URL on a site"""
+    config = SITES[site]
+    if config["recipe"].match(url):
+        return RECIPE
+    if config["listing"].match(url):
+        return LISTING
+    return None
+
+
+def extract_links(site, page_url, html):
+    """
+    Recipe and listing links on a page, normalized and classified
+
+    Returns:
+        list: (normalized url, kind) pairs in page order, without duplicates
+    """
+    config = SITES[site]
+    soup = BeautifulSoup(html, "html.parser")
+    found = {}
+    for a in soup.find_all("a", href=True):
+        absolute = urljoin(page_url, a["href"])
+        if urlsplit(absolute).hostname != config["host"]:
+            continue
+        url = url_key(site, absolute)
+        kind = classify(site, url)
+        if kind and url not in found:
+            found[url] = kind
+    return list(found.items())
+
+
+class CrawlFrontier:
+    """
+    Discovered URLs with their crawl state in a local SQLite file
+
+    Each URL is stored once under its normalized key with its site, kind
+    (recipe or listing), BFS depth, state (pending/fetched/failed),
+    attempts and fetch time. Pending URLs are handed out shallowest first,
+    so a crawl proceeds breadth-first and resumes where it stopped.
+    """
+
+    def __init__(self, path=DEFAULT_FRONTIER_PATH):
+        self.path = Path(path)
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS urls (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    site TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    depth INTEGER NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    discovered_at REAL NOT NULL,
+                    fetched_at REAL,
+                    error TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_urls_pending
+                    ON urls(site, state, depth, discovered_at);
+            """)
+
+    @contextmanager
+    def _connect(self):
+        # Short-lived connection per call, committed and closed like
+        # RecipeStore._connect (sqlite3's own context manager never closes)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add(self, site, url, kind, depth=0):
+        """
+        Add a URL unless its normalized key is already known
+
+        Returns:
+            bool: True when the URL is new
+        """
+        key = url_key(site, url)
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO urls (key, url, site, kind, depth, discovered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, site, kind, depth, time.time())
+            )
+            return cursor.rowcount > 0
+
+    def add_many(self, site, links, depth):
+        """Add (url, kind) pairs at one depth; returns how many were new"""
+        now = time.time()
+        rows = [(url_key(site, url), url, site, kind, depth, now) for url, kind in links]
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO urls (key, url, site, kind, depth, discovered_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)", rows
+            )
+            return conn.total_changes - before
+
+    def next_batch(self, site, limit):
+        """
+        Pending URLs, shallowest and oldest first
+
+        Returns:
+            list: (url, kind, depth) tuples
+        """
+        with self._connect() as conn:
+            return conn.execute(
+                "SELECT url, kind, depth FROM urls WHERE site = ? AND state = ? "
+                "ORDER BY depth, discovered_at, key LIMIT ?",
+                (site, PENDING, limit)
+            ).fetchall()
+
+    def mark_fetched(self, site, url):
+        """Record a successful fetch"""
+        self._set_state(site, url, FETCHED, None)
+
+    def mark_failed(self, site, url, error, max_attempts=3):
+        """Record a failure; the URL stays pending until max_attempts is reached"""
+        key = url_key(site, url)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE urls SET attempts = attempts + 1, error = ?, fetched_at = ?, "
+                "state = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE key = ?",
+                (str(error)[:500], time.time(), max_attempts, FAILED, PENDING, key)
+            )
+
+    def _set_state(self, site, url, state, error):
+        key = url_key(site, url)
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE urls SET state = ?, error = ?, fetched_at = ?, "
+                "attempts = attempts + 1 WHERE key = ?",
+                (state, error, time.time(), key)
+            )
+
+    def requeue(self, site, kind=LISTING, older_than_seconds=24 * 60 * 60):
+        """Mark fetched pages of a kind as pending again once they are stale"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE urls SET state = ? WHERE site = ? AND kind = ? AND state = ? "
+                "AND fetched_at < ?",
+                (PENDING, site, kind, FETCHED, time.time() - older_than_seconds)
+            )
+            return cursor.rowcount
+
+    def retry_failed(self, site):
+        """Give failed URLs another chance"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE urls SET state = ?, attempts = 0 WHERE site = ? AND state = ?",
+                (PENDING, site, FAILED)
+            )
+            return cursor.rowcount
+
+    def stats(self, site=None):
+        """
+        Count URLs per site, kind and state
+
+        Returns:
+            dict: {site: {kind: {state: count}}}
+        """
+        query = "SELECT site, kind, state, COUNT(*) FROM urls"
+        params = ()
+        if site:
+            query += " WHERE site = ?"
+            params = (site,)
+        query += " GROUP BY site, kind, state"
+        result = {}
+        with self._connect() as conn:
+            for row_site, kind, state, count in conn.execute(query, params):
+                result.setdefault(row_site, {}).setdefault(kind, {})[state] = count
+        return result
+
+
+def parse_page(site, kind, url, html, follow_links):
+    """
+    Parse a fetched page (module-level so parse workers can run it)
+
+    Args:
+        site (str): "kapook" or "trueid"
+        kind (str): "recipe" or "listing"
+        url (str): Normalized page URL
+        html (str): Page HTML
+        follow_links (bool): Also extract links to crawl next
+
+    Returns:
+        tuple: (recipe dict or None, parse timings or None, links)
+    """
+    recipe = timings = None
+    if kind == RECIPE:
+        if site == "trueid":
+            from scrape_trueid import parse_trueid_page
+            recipe, timings = parse_trueid_page(url, html)
+        else:
+            from scrape_kapook import parse_kapook_page
+            parsed, timings = parse_kapook_page(html)
+            if parsed["ingredients"]:
+                recipe = dict(parsed, url=url)
+    links = extract_links(site, url, html) if follow_links else []
+    return recipe, timings, links
+
+
+def crawl(site, frontier=None, store=None, seeds=None, max_pages=100, max_depth=3,
+          max_workers=4, requests_per_second=2.0, batch_size=20, parse_workers=None,
+          rate_limiter=None, metrics=None):
+    """
+    Crawl a site breadth-first from the frontier, resuming any earlier run
+
+    Listing pages (and TrueID collections) are followed for links up to
+    ``max_depth``; recipe pages are parsed and upserted into the recipe
+    store in batches. URLs already fetched are never fetched again. Pages
+    are downloaded on ``max_workers`` threads and parsed (recipe fields and
+    links) on ``parse_workers`` processes.
+
+    Args:
+        site (str): "kapook" or "trueid"
+        frontier (CrawlFrontier): Frontier to use (default file if None)
+        store (RecipeStore): Store receiving recipes (default store if None)
+        seeds (list): Start URLs (default: the site's seeds)
+        max_pages (int): Pages fetched in this run
+        max_depth (int): Maximum link depth from a seed
+        max_workers (int): Concurrent fetches
+        requests_per_second (float): Politeness budget per host (when no
+            rate_limiter is given)
+        batch_size (int): Recipes per store write
+        parse_workers (int): Parse processes (None = a small fixed pool)
+        rate_limiter (HostRateLimiter): Limiter to share, e.g. a scraper's
+            ``rate_limiter``, so both stay within one per-host budget
+        metrics (ScrapeMetrics): Metrics receiving parse timings (default:
+            the process-wide instance)
+
+    Returns:
+        dict: "fetched", "failed", "recipes", "discovered" counts for this run
+    """
+    if site not in SITES:
+        raise ValueError(f"Unknown site: {site} (expected one of {list(SITES)})")
+    frontier = frontier or CrawlFrontier()
+    store = store or RecipeStore()
+    for seed in seeds or SITES[site]["seeds"]:
+        url = url_key(site, seed)
+        frontier.add(site, url, classify(site, url) or LISTING)
+
+    fetcher = get_fetcher()
+    limiter = rate_limiter if rate_limiter is not None else HostRateLimiter(requests_per_second)
+    metrics = metrics if metrics is not None else get_metrics()
+    headers = {"User-Agent": "Mozilla/5.0"}
+
+    def fetch(item):
+        url, kind, depth = item
+        limiter.wait(url)
+        try:
+            html = fetcher.get_text(url, headers=headers, timeout=15)
+        except Exception as e:
+            return e, None
+        return None, (parse_page, site, kind, url, html, depth < max_depth)
+
+    stats = {"fetched": 0, "failed": 0, "recipes": 0, "discovered": 0}
+    pending_recipes = []
+    fetch_workers = max(1, max_workers)
+    parse_workers = resolve_parse_workers(parse_workers)
+    window = default_window(fetch_workers, parse_workers)
+    with open_pools(fetch_workers, parse_workers) as (fetch_pool, parse_pool):
+        while stats["fetched"] + stats["failed"] < max_pages:
+            remaining = max_pages - stats["fetched"] - stats["failed"]
+            batch = frontier.next_batch(site, min(remaining, max(fetch_workers * 4, window)))
+            if not batch:
+                break
+
+            # SQLite and the store are only touched from this thread
+            for (url, kind, depth), error, result in iter_fetch_parse(
+                fetch_pool, parse_pool, fetch, batch, window
+            ):
+                if error is not None or result is None:
+                    error = error or "parse error"
+                    print(f"❌ Error crawling {url}: {error}")
+                    frontier.mark_failed(site, url, error)
+                    stats["failed"] += 1
+                    continue
+
+                recipe, timings, links = result
+                if timings is not None:
+                    metrics.record_parse(url, *timings)
+                if recipe:
+                    pending_recipes.append(recipe)
+                    stats["recipes"] += 1
+                if links:
+                    stats["discovered"] += frontier.add_many(site, links, depth + 1)
+                frontier.mark_fetched(site, url)
+                stats["fetched"] += 1
+
+                if len(pending_recipes) >= batch_size:
+                    store.upsert_recipes(pending_recipes, source=site)
+                    pending_recipes = []
+
+    if pending_recipes:
+        store.upsert_recipes(pending_recipes, source=site)
+    print(
+        f"✅ Crawled {site}: {stats['fetched']} fetched, {stats['failed']} failed, "
+        f"{stats['recipes']} recipes, {stats['discovered']} new links"
+    )
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Crawl recipe sites into the recipe store")
+    parser.add_argument("site", choices=[*SITES, "stats"], help="site to crawl, or stats")
+    parser.add_argument("--max-pages", type=int, default=100, help="pages fetched this run")
+    parser.add_argument("--max-depth", type=int, default=3, help="link depth from the seeds")
+    parser.add_argument("--workers", type=int, default=4, help="concurrent fetches")
+    parser.add_argument("--parse-workers", type=int, default=None,
+                        help=f"parse processes (default: {DEFAULT_PARSE_WORKERS})")
+    parser.add_argument("--seed", action="append", help="extra start URL (repeatable)")
+    parser.add_argument("--requeue-listings", action="store_true",
+                        help="refetch listing pages older than a day to find new recipes")
+    parser.add_argument("--retry-failed", action="store_true", help="retry failed URLs")
+    args = parser.parse_args()
+
+    frontier = CrawlFrontier()
+    if args.site == "stats":
+        for site_name, kinds in frontier.stats().items():
+            for kind, states in kinds.items():
+                print(f"{site_name:<8} {kind:<8} " +
+                      ", ".join(f"{state}={count}" for state, count in sorted(states.items())))
+        sys.exit(0)
+
+    if args.requeue_listings:
+        print(f"♻️ Requeued {frontier.requeue(args.site)} listing pages")
+    if args.retry_failed:
+        print(f"♻️ Retrying {frontier.retry_failed(args.site)} failed URLs")
+    crawl(args.site, frontier, seeds=args.seed, max_pages=args.max_pages,
+          max_depth=args.max_depth, max_workers=args.workers,
+          parse_workers=args.parse_workers)
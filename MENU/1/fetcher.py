@@ -0,0 +1,184 @@
+"""
+fetcher.py : Shared HTTP fetch layer for all scrapers
+ชั้นดึงหน้าเว็บที่ใช้ร่วมกัน: keep-alive session + แคชแบบมีเงื่อนไข (ETag/Last-Modified)
+"""
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import http_fixtures
+from recipe_cache import write_json_atomic
+from scrape_metrics import get_metrics
+
+DEFAULT_CACHE_DIR = Path(__file__).parent / ".http_cache"
+
+
+class CachedFetcher:
+    """
+    Fetch pages through one pooled keep-alive session
+
+    Every 200 response that carries an ETag or Last-Modified header is
+    stored on disk keyed by URL. The next fetch of that URL sends
+    If-None-Match / If-Modified-Since, and a 304 reuses the cached body.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, pool_size=10, use_cache=True,
+                 mode="live", fixture_dir=http_fixtures.DEFAULT_FIXTURE_DIR,
+                 retries=2, metrics=None):
+        """
+        Args:
+            cache_dir (str | Path): Directory for cached responses
+            pool_size (int): Keep-alive connections kept per host
+            use_cache (bool): Disable to always download full pages
+            mode (str): "live", "record" (save raw responses as fixtures)
+                or "replay" (serve fixtures, no network)
+            fixture_dir (str | Path): Fixture directory for record/replay
+            retries (int): Retries on connection errors, 429 and 5xx
+            metrics (ScrapeMetrics): Recorder for per-request timings
+                (defaults to the process-wide one)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.mode = mode
+        # Fixtures must hold full pages, so skip conditional requests
+        self.use_cache = use_cache and mode == "live"
+        self.metrics = metrics or get_metrics()
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.5,
+                      status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size,
+                              max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        http_fixtures.install(self.session, mode, fixture_dir, pool_size)
+
+    def _cache_path(self, url):
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{key}.json"
+
+    def _load_cached(self, url):
+        path = self._cache_path(url)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            return entry if entry.get("url") == url else None
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, url, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+
+        entry = {
+            "url": url,
+            "etag": etag,
+            "last_modified": last_modified,
+            "text": response.text,
+        }
+        # Readers never see a partial entry
+        write_json_atomic(self._cache_path(url), entry, indent=None)
+
+    def get_text(self, url, headers=None, timeout=15):
+        """
+        Fetch a page and return its HTML
+
+        Args:
+            url (str): Page URL
+            headers (dict): Extra request headers (e.g. User-Agent)
+            timeout (int): Request timeout in seconds
+
+        Returns:
+            str: Page HTML, from the network or from the cache on a 304
+
+        Raises:
+            requests.RequestException: On network errors or 4xx/5xx
+        """
+        request_headers = dict(headers or {})
+        cached = self._load_cached(url) if self.use_cache else None
+        if cached:
+            if cached.get("etag"):
+                request_headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                request_headers["If-Modified-Since"] = cached["last_modified"]
+
+        response = self._request(url, request_headers, timeout, bool(cached))
+        if response.status_code == 304 and cached:
+            return cached["text"]
+
+        response.raise_for_status()
+        if self.use_cache:
+            self._store(url, response)
+        return response.text
+
+    def get_bytes(self, url, headers=None, timeout=15):
+        """
+        Fetch a binary resource (e.g. a recipe image)
+
+        Binary bodies are not kept in the page cache; callers store them
+        themselves (see image_store.py).
+
+        Returns:
+            tuple: (body bytes, Content-Type header or None)
+
+        Raises:
+            requests.RequestException: On network errors or 4xx/5xx
+        """
+        response = self._request(url, dict(headers or {}), timeout, False)
+        response.raise_for_status()
+        return response.content, response.headers.get("Content-Type")
+
+    def _request(self, url, request_headers, timeout, has_cached):
+        """GET through the session, recording the request in the metrics"""
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, headers=request_headers, timeout=timeout)
+        except requests.RequestException as e:
+            self.metrics.record_request(url, seconds=time.perf_counter() - start, error=str(e))
+            raise
+        seconds = time.perf_counter() - start
+        self.metrics.record_request(
+            url,
+            status=response.status_code,
+            seconds=seconds,
+            first_byte_seconds=min(seconds, response.elapsed.total_seconds())
+            if response.elapsed else seconds,
+            nbytes=len(response.content),
+            retries=_retry_count(response),
+            from_cache=response.status_code == 304 and has_cached,
+            error=None if response.ok or response.status_code == 304 else response.reason,
+        )
+        return response
+
+
+def _retry_count(response):
+    """Number of retries urllib3 made before this response"""
+    retries = getattr(response.raw, "retries", None)
+    return len(retries.history) if retries is not None else 0
+
+
+_default_fetcher = None
+_default_lock = threading.Lock()
+
+
+def get_fetcher():
+    """
+    Get the process-wide fetcher shared by all scrapers
+
+    RECIPE_FETCH_MODE=record|replay (see http_fixtures.py) switches every
+    scraper to the fixture transport without code changes.
+    """
+    global _default_fetcher
+    with _default_lock:
+        if _default_fetcher is None:
+            mode, fixture_dir = http_fixtures.mode_from_env()
+            _default_fetcher = CachedFetcher(mode=mode, fixture_dir=fixture_dir)
+        return _default_fetcher
@@ -0,0 +1,157 @@
+"""
+http_fixtures.py : Record/replay transport for offline scraping
+บันทึกหน้าเว็บจริงลงโฟลเดอร์ fixture แล้วเล่นซ้ำโดยไม่ต้องใช้เครือข่าย
+
+Set RECIPE_FETCH_MODE=record to save every response the scrapers receive,
+then RECIPE_FETCH_MODE=replay to serve them back with no network access.
+RECIPE_FIXTURE_DIR overrides the fixture directory.
+"""
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from recipe_cache import write_bytes_atomic, write_json_atomic
+
+DEFAULT_FIXTURE_DIR = Path(__file__).parent / "fixtures"
+MODES = ("live", "record", "replay")
+
+
+def fixture_key(url):
+    """File name stem of the fixture for a URL"""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()
+
+
+def _paths(fixture_dir, url):
+    stem = Path(fixture_dir) / fixture_key(url)
+    return stem.with_suffix(".json"), stem.with_suffix(".body")
+
+
+def save_fixture(fixture_dir, url, status_code, headers, body):
+    """
+    Store one raw response as <sha1>.json (status, headers) + <sha1>.body
+
+    Args:
+        fixture_dir (str | Path): Fixture directory
+        url (str): Requested URL
+        status_code (int): HTTP status
+        headers (dict): Response headers
+        body (bytes): Raw (decoded transfer-encoding) response body
+    """
+    meta_path, body_path = _paths(fixture_dir, url)
+    # Fetch threads record concurrently; the body goes first so a readable
+    # .json always has its complete .body next to it
+    write_bytes_atomic(body_path, body)
+    # Body length and encoding headers no longer describe the stored bytes
+    headers = {k: v for k, v in headers.items()
+               if k.lower() not in ("content-encoding", "content-length", "transfer-encoding")}
+    write_json_atomic(meta_path, {"url": url, "status": status_code, "headers": headers})
+
+
+def load_fixture(fixture_dir, url):
+    """
+    Load a recorded response
+
+    Returns:
+        tuple: (metadata dict, body bytes), or None when not recorded
+    """
+    meta_path, body_path = _paths(fixture_dir, url)
+    if not meta_path.exists() or not body_path.exists():
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("url") != url:
+        return None
+    return meta, body_path.read_bytes()
+
+
+def list_fixtures(fixture_dir=DEFAULT_FIXTURE_DIR):
+    """URLs of all recorded responses with a 200 status, sorted"""
+    urls = []
+    for meta_path in sorted(Path(fixture_dir).glob("*.json")):
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if meta.get("status") == 200 and meta.get("url"):
+            urls.append(meta["url"])
+    return sorted(urls)
+
+
+class RecordingAdapter(HTTPAdapter):
+    """HTTPAdapter that also writes every response to the fixture directory"""
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR, **kwargs):
+        super().__init__(**kwargs)
+        self.fixture_dir = Path(fixture_dir)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        # Reading .content consumes the stream; it stays cached on the response
+        if response.status_code != 304:
+            save_fixture(self.fixture_dir, request.url, response.status_code,
+                         dict(response.headers), response.content)
+        return response
+
+
+class ReplayAdapter(BaseAdapter):
+    """Transport that answers requests from recorded fixtures only"""
+
+    def __init__(self, fixture_dir=DEFAULT_FIXTURE_DIR):
+        super().__init__()
+        self.fixture_dir = Path(fixture_dir)
+
+    def send(self, request, **kwargs):
+        recorded = load_fixture(self.fixture_dir, request.url)
+        if recorded is None:
+            raise requests.ConnectionError(
+                f"No recorded fixture for {request.url}", request=request
+            )
+        meta, body = recorded
+
+        response = requests.Response()
+        response.status_code = meta["status"]
+        response.headers = CaseInsensitiveDict(meta.get("headers", {}))
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.reason = "Replayed"
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def close(self):
+        pass
+
+
+def install(session, mode, fixture_dir=DEFAULT_FIXTURE_DIR, pool_size=10):
+    """
+    Mount the record or replay transport on a requests session
+
+    Args:
+        session (requests.Session): Session used by a fetcher
+        mode (str): "live" (leave as is), "record" or "replay"
+        fixture_dir (str | Path): Fixture directory
+        pool_size (int): Connection pool size when recording
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown fetch mode: {mode} (expected one of {MODES})")
+    if mode == "record":
+        adapter = RecordingAdapter(fixture_dir, pool_connections=pool_size, pool_maxsize=pool_size)
+    elif mode == "replay":
+        adapter = ReplayAdapter(fixture_dir)
+    else:
+        return
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+
+def mode_from_env():
+    """(mode, fixture_dir) from RECIPE_FETCH_MODE and RECIPE_FIXTURE_DIR"""
+    mode = os.environ.get("RECIPE_FETCH_MODE", "live").strip().lower() or "live"
+    fixture_dir = Path(os.environ.get("RECIPE_FIXTURE_DIR") or DEFAULT_FIXTURE_DIR)
+    return mode, fixture_dir
@@ -0,0 +1,358 @@
+"""
+image_store.py : Content-addressed recipe images with pre-sized variants
+คลังรูปสูตรอาหาร เก็บตาม hash ของไฟล์ (รูปซ้ำเก็บครั้งเดียว) พร้อมรูปย่อขนาดต่าง ๆ (WebP/JPEG)
+
+Originals are stored once under their SHA-256 digest, no matter how many
+URLs or files point at them. Each image is resized once, at ingest, into
+thumbnail, card and detail variants; views ask for the smallest variant
+that is at least as wide as they display it.
+
+Usage:
+    python image_store.py import [DIR]    # local files, matched to recipes by name (default ../image)
+    python image_store.py fetch           # image URLs of the recipes in recipes.db
+    python image_store.py stats
+"""
+import hashlib
+import io
+import json
+import re
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image, ImageOps, features
+
+from fetcher import get_fetcher
+from rate_limiter import HostRateLimiter
+from recipe_cache import iter_bounded, write_bytes_atomic, write_json_atomic
+
+MENU_DIR = Path(__file__).parent.parent
+DEFAULT_IMAGE_DIR = MENU_DIR / "image_store"
+LOCAL_IMAGE_DIR = MENU_DIR / "image"
+
+# Variant name -> maximum width in pixels (aspect ratio kept, never upscaled)
+VARIANTS = {"thumb": 160, "card": 480, "detail": 1200}
+# Taller images are capped at this many times the variant width
+MAX_ASPECT = 2
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+FORMAT_EXTENSIONS = {"jpeg": "jpg", "webp": "webp", "png": "png", "gif": "gif", "bmp": "bmp"}
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+
+def _encode(image, fmt):
+    """Encode a variant as "webp" or "jpeg" bytes"""
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+    else:
+        if image.mode != "RGB":
+            # JPEG has no alpha: flatten onto white
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A") if "A" in image.getbands() else None)
+            image = background
+        image.save(buffer, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+class ImageStore:
+    """
+    Recipe images stored by content hash, with resized variants
+
+    Layout under ``root``::
+
+        originals/ab/<sha256>.<ext>
+        variants/ab/<sha256>-<variant>.<webp|jpg>
+        index.json    # digest -> sizes, source URL/path -> digest, recipe name -> digest
+    """
+
+    def __init__(self, root=DEFAULT_IMAGE_DIR, variants=VARIANTS, formats=None):
+        """
+        Args:
+            root (str | Path): Store directory
+            variants (dict): Variant name -> maximum width
+            formats (tuple): Variant encodings (default WebP and JPEG, or
+                JPEG only when Pillow lacks WebP support)
+        """
+        self.root = Path(root)
+        self.variants = dict(sorted(variants.items(), key=lambda item: item[1]))
+        self.formats = formats or (("webp", "jpeg") if features.check("webp") else ("jpeg",))
+        self.index_path = self.root / "index.json"
+        self._lock = threading.Lock()
+        self._index_mtime = None
+        self.index = {"images": {}, "sources": {}, "names": {}}
+        self.refresh()
+
+    # ------------------------------------------
+    # Index
+    # ------------------------------------------
+
+    def refresh(self):
+        """Reload index.json if another process changed it (cheap stat otherwise)"""
+        try:
+            mtime = self.index_path.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._index_mtime:
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                loaded = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self.index = {key: dict(loaded.get(key, {})) for key in ("images", "sources", "names")}
+            self._index_mtime = mtime
+
+    def save(self):
+        """Write index.json atomically"""
+        with self._lock:
+            snapshot = {key: dict(value) for key, value in self.index.items()}
+        write_json_atomic(self.index_path, snapshot)
+        self._index_mtime = self.index_path.stat().st_mtime
+
+    def _original_path(self, digest, ext):
+        return self.root / "originals" / digest[:2] / f"{digest}.{ext}"
+
+    def _variant_path(self, digest, variant, fmt):
+        return self.root / "variants" / digest[:2] / f"{digest}-{variant}.{FORMAT_EXTENSIONS[fmt]}"
+
+    # ------------------------------------------
+    # Ingest
+    # ------------------------------------------
+
+    def put_bytes(self, data, source=None, name=None):
+        """
+        Store an image and its variants (once per distinct content)
+
+        Args:
+            data (bytes): Encoded image
+            source (str): URL or file path it came from, for later lookups
+            name (str): Recipe name it belongs to
+
+        Returns:
+            str: SHA-256 hex digest of the original
+
+        Raises:
+            PIL.UnidentifiedImageError: When the data is not an image
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            known = digest in self.index["images"]
+        info = None if known else self._ingest(digest, data)
+        with self._lock:
+            if info is not None:
+                self.index["images"].setdefault(digest, info)
+            if source:
+                self.index["sources"][source] = digest
+            if name:
+                self.index["names"][name] = digest
+        return digest
+
+    def _ingest(self, digest, data):
+        """Write the original and every variant; returns the index entry"""
+        largest = max(self.variants.values())
+        with Image.open(io.BytesIO(data)) as opened:
+            width, height = opened.size
+            fmt = (opened.format or "jpeg").lower()
+            if fmt == "jpeg":
+                # Let libjpeg decode at a reduced scale when the original is huge
+                opened.draft("RGB", (largest, largest * MAX_ASPECT))
+            image = ImageOps.exif_transpose(opened)
+            image.load()
+
+        write_bytes_atomic(self._original_path(digest, FORMAT_EXTENSIONS.get(fmt, fmt)), data)
+        has_alpha = image.mode in ("RGBA", "LA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+        variants = {}
+        previous_width = None
+        # Largest first, each resized from the previous one
+        for variant, max_width in sorted(self.variants.items(), key=lambda item: -item[1]):
+            resized = image.copy()
+            resized.thumbnail((max_width, max_width * MAX_ASPECT), Image.LANCZOS)
+            if resized.width == previous_width:
+                # Original narrower than this variant: the smaller one is identical
+                continue
+            entry = {"width": resized.width, "height": resized.height}
+            for encoding in self.formats:
+                encoded = _encode(resized, encoding)
+                write_bytes_atomic(self._variant_path(digest, variant, encoding), encoded)
+                entry[encoding] = len(encoded)
+            variants[variant] = entry
+            previous_width = resized.width
+            image = resized
+
+        return {
+            "width": width,
+            "height": height,
+            "format": fmt,
+            "bytes": len(data),
+            "variants": variants,
+        }
+
+    def import_file(self, path, name=None):
+        """Store a local image file; ``name`` defaults to the file name without extension"""
+        path = Path(path)
+        try:
+            source = path.resolve().relative_to(MENU_DIR.resolve()).as_posix()
+        except ValueError:
+            source = str(path.resolve())
+        return self.put_bytes(path.read_bytes(), source=source, name=name or path.stem)
+
+    def import_dir(self, directory=LOCAL_IMAGE_DIR, max_workers=4):
+        """
+        Store every image file in a directory (decoded and resized on a thread pool)
+
+        Returns:
+            int: Number of files stored
+        """
+        paths = sorted(p for p in Path(directory).iterdir()
+                       if p.suffix.lower() in IMAGE_EXTENSIONS)
+
+        def import_one(path):
+            try:
+                return self.import_file(path)
+            except Exception as e:
+                print(f"❌ Error importing image {path.name}: {str(e)}")
+                return None
+
+        imported = 0
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            # Pillow releases the GIL while decoding, resizing and encoding
+            for _, digest in iter_bounded(pool, import_one, paths, max_workers * 2):
+                imported += digest is not None
+        self.save()
+        print(f"✅ Imported {imported} images from {directory}")
+        return imported
+
+    def fetch_many(self, urls, max_workers=4, requests_per_second=2.0):
+        """
+        Download images concurrently (rate limited per host) and store them
+
+        URLs already in the store are skipped.
+
+        Args:
+            urls (iterable): Image URLs
+            max_workers (int): Concurrent downloads
+            requests_per_second (float): Politeness budget per host
+
+        Returns:
+            dict: URL -> digest (None when the download or decode failed)
+        """
+        fetcher = get_fetcher()
+        limiter = HostRateLimiter(requests_per_second)
+        with self._lock:
+            todo = [url for url in dict.fromkeys(urls)
+                    if url and url not in self.index["sources"]]
+
+        def fetch_one(url):
+            limiter.wait(url)
+            try:
+                data, _ = fetcher.get_bytes(url, headers=HEADERS, timeout=15)
+                return self.put_bytes(data, source=url)
+            except Exception as e:
+                print(f"❌ Error fetching image {url}: {str(e)}")
+                return None
+
+        results = {}
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            for url, digest in iter_bounded(pool, fetch_one, todo, max_workers * 2):
+                results[url] = digest
+        self.save()
+        print(f"✅ Fetched {sum(d is not None for d in results.values())}/{len(todo)} images")
+        return results
+
+    # ------------------------------------------
+    # Serving
+    # ------------------------------------------
+
+    def digest_for(self, ref):
+        """Digest for a digest, a known source URL/path, or None"""
+        if not ref:
+            return None
+        if DIGEST_PATTERN.match(ref) and ref in self.index["images"]:
+            return ref
+        return self.index["sources"].get(ref)
+
+    def best_variant(self, digest, width, formats=None):
+        """
+        Path of the smallest variant at least ``width`` pixels wide
+
+        Falls back to the widest variant, then to the original.
+
+        Args:
+            digest (str): Image digest
+            width (int): Display width in pixels
+            formats (tuple): Acceptable encodings in order of preference
+
+        Returns:
+            Path: Variant file, or None for unknown images
+        """
+        info = self.index["images"].get(digest)
+        if info is None:
+            return None
+        formats = formats or self.formats
+        ordered = sorted(info["variants"].items(), key=lambda item: item[1]["width"])
+        fitting = [item for item in ordered if item[1]["width"] >= width] or ordered[-1:]
+        for variant, entry in fitting[:1]:
+            for encoding in formats:
+                path = self._variant_path(digest, variant, encoding)
+                if encoding in entry and path.exists():
+                    return path
+        ext = FORMAT_EXTENSIONS.get(info["format"], info["format"])
+        path = self._original_path(digest, ext)
+        return path if path.exists() else None
+
+    def resolve(self, ref, width, formats=None):
+        """Best local variant for an image reference (digest, URL or path), or None"""
+        digest = self.digest_for(ref)
+        return self.best_variant(digest, width, formats) if digest else None
+
+    def image_for_recipe(self, recipe, width, formats=None):
+        """
+        Best local variant for a recipe's image
+
+        Uses the recipe's "image" reference, or a local file named after
+        the recipe (e.g. image/ต้มข่าไก่.jpg).
+
+        Returns:
+            Path: Variant file, or None when no image is stored
+        """
+        digest = self.digest_for(recipe.get("image")) or self.index["names"].get(recipe.get("name"))
+        return self.best_variant(digest, width, formats) if digest else None
+
+    def stats(self):
+        """Image count and bytes of originals and of each variant/encoding"""
+        totals = {"images": len(self.index["images"]), "sources": len(self.index["sources"]),
+                  "original_bytes": 0, "variant_bytes": {}}
+        for info in self.index["images"].values():
+            totals["original_bytes"] += info["bytes"]
+            for variant, entry in info["variants"].items():
+                for encoding in self.formats:
+                    key = f"{variant}.{encoding}"
+                    totals["variant_bytes"][key] = (
+                        totals["variant_bytes"].get(key, 0) + entry.get(encoding, 0)
+                    )
+        return totals
+
+
+if __name__ == "__main__":
+    store = ImageStore()
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "import":
+        store.import_dir(Path(sys.argv[2]) if len(sys.argv) > 2 else LOCAL_IMAGE_DIR)
+    elif command == "fetch":
+        from recipe_store import RecipeStore
+
+        urls = [r["image"] for r in RecipeStore().load_recipes()
+                if str(r.get("image", "")).startswith("http")]
+        store.fetch_many(urls)
+    elif command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    else:
+        print(__doc__)
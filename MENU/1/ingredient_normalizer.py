@@ -0,0 +1,256 @@
+"""
+ingredient_normalizer.py : Split scraped ingredient lines into name, quantity and unit
+แยกบรรทัดวัตถุดิบ (เช่น "ซอสหอย 3 ช้อนโต๊ะ") เป็นชื่อมาตรฐาน ปริมาณ และหน่วย
+"""
+import re
+
+from trueid_extractor import INGREDIENT_UNITS
+
+# Units from the scrapers' unit lists plus other common Thai measures.
+# "/", "อย่าง" and "ซอย" in INGREDIENT_UNITS are detection hints, not units.
+UNITS = sorted(
+    {u for u in INGREDIENT_UNITS if u not in ("/", "อย่าง", "ซอย")} | {
+        "ช้อนตวง", "ถ้วยตวง", "ทัพพี", "กิโลกรัม", "มิลลิลิตร", "เม็ด",
+        "ตัว", "ต้น", "กล่อง", "ใบ", "หัว", "กลีบ", "ซอง", "ขวด", "แผ่น",
+        "กระป๋อง", "ราก", "ดอก", "เส้น", "g", "kg", "ml",
+    },
+    key=len,
+    reverse=True,
+)
+
+# variant -> canonical name
+SYNONYMS = {
+    # pork
+    "เนื้อหมู": "หมู", "หมูสับ": "หมู", "หมูบด": "หมู", "หมูสันคอ": "หมู",
+    "หมูสันใน": "หมู", "หมูสันนอก": "หมู",
+    # chicken
+    "เนื้อไก่": "ไก่", "อกไก่": "ไก่", "สะโพกไก่": "ไก่", "น่องไก่": "ไก่",
+    "ปีกไก่": "ไก่", "ปีกบนไก่": "ไก่", "ไก่สับ": "ไก่",
+    # beef
+    "เนื้อ": "เนื้อวัว", "เนื้อวัวสันคอ": "เนื้อวัว", "เนื้อสันใน": "เนื้อวัว",
+    # shrimp
+    "กุ้งสด": "กุ้ง", "กุ้งแชบ๊วย": "กุ้ง", "กุ้งขาว": "กุ้ง", "กุ้งกุลาดำ": "กุ้ง",
+    # eggs
+    "ไข่": "ไข่ไก่",
+    # seasoning
+    "เกลือป่น": "เกลือ", "เกลือสมุทร": "เกลือ", "ดอกเกลือ": "เกลือ",
+    "น้ำตาล": "น้ำตาลทราย", "น้ำตาลทรายขาว": "น้ำตาลทราย",
+    "ซีอิ้วดำ": "ซีอิ๊วดำ", "ซีอิ้วดำหวาน": "ซีอิ๊วดำ", "ซีอิ๊วดำหวาน": "ซีอิ๊วดำ",
+    "ซีอิ้วขาว": "ซีอิ๊วขาว",
+    "ซอสหอย": "ซอสหอยนางรม", "น้ำมันหอย": "ซอสหอยนางรม",
+    "ซอสปรุงรสฝาเขียว": "ซอสปรุงรส",
+    "พริกไทยป่น": "พริกไทย",
+    "กระเทียมไทย": "กระเทียม",
+    "กะเพรา": "ใบกะเพรา",
+    # water and oil
+    "น้ำเปล่า": "น้ำ", "น้ำสะอาด": "น้ำ",
+    "น้ำมัน": "น้ำมันพืช",
+}
+
+# Preparation words cut from the end of a name: "ดอกกะหล่ำหั่นชิ้น" -> "ดอกกะหล่ำ"
+PREPARATION_MARKERS = ["หั่น", "ซอย", "สับ", "สไลซ์", "เลาะกระดูก", "บุบ", "ขูด", "บด", "สำหรับ"]
+
+# Lines that are instructions or titles rather than ingredients: cooking
+# verbs and connectives that no ingredient name starts with ("คน" and "อบ"
+# are left out because of "คนอร์" and "อบเชย")
+NON_INGREDIENT_PREFIXES = (
+    "นำ", "จากนั้น", "ทำ", "หั่น", "แชร์", "สูตร", "วิธี",
+    "เติม", "ใส่", "แต่ง", "คลุก", "เมื่อ", "ผัด", "ต้ม", "ปั่น", "ซอย",
+    "ตัก", "ทอด", "นึ่ง", "พัก", "ชิม", "ตามด้วย", "แล้ว", "จน",
+)
+# Words of instructions ("...ลงไป", "...ให้เข้ากัน") in lines without an amount
+INSTRUCTION_MARKERS = ("ลงไป", "เข้ากัน", "เป็นอันเสร็จ")
+# Longest name accepted from a line without an amount; real ones are short
+# ("กระเทียมจีนซอย"), longer ones are sentences (Thai has no spaces)
+MAX_UNQUANTIFIED_NAME_LENGTH = 20
+
+_NUMBER = r'(?:\d[\d,]*(?:\.\d+)?(?:/\d+)?|[¼½¾⅓⅔])'
+QUANTITY_PATTERN = re.compile(
+    rf'{_NUMBER}(?:\s*\+\s*{_NUMBER}|\s+{_NUMBER}(?=\s|$))?(?:\s*-\s*{_NUMBER})?'
+)
+PARENTHESES_PATTERN = re.compile(r'\([^)]*\)')
+
+_FRACTIONS = {"¼": 0.25, "½": 0.5, "¾": 0.75, "⅓": 1 / 3, "⅔": 2 / 3}
+
+
+def _number_value(token):
+    token = token.replace(",", "")
+    if token in _FRACTIONS:
+        return _FRACTIONS[token]
+    if "/" in token:
+        numerator, denominator = token.split("/", 1)
+        return float(numerator) / float(denominator) if float(denominator) else None
+    return float(token)
+
+
+def parse_amount(quantity):
+    """
+    Convert a quantity string to a number
+
+    "1 1/2" and "1+1/2" -> 1.5, "3-4" -> 3.0 (lower bound), "½" -> 0.5
+
+    Returns:
+        float: Amount, or None if it cannot be parsed
+    """
+    if not quantity:
+        return None
+    first = quantity.split("-")[0]
+    try:
+        return sum(_number_value(part) for part in re.findall(_NUMBER, first))
+    except (ValueError, ZeroDivisionError, TypeError):
+        return None
+
+
+def canonical_name(raw_name):
+    """
+    Map an ingredient name to its canonical form
+
+    Args:
+        raw_name (str): Name part of a line, e.g. "หมูสับ" or "ซีอิ้วดำ(หวาน)"
+
+    Returns:
+        str: Canonical name, or None if nothing usable is left
+    """
+    name = PARENTHESES_PATTERN.sub(" ", raw_name or "").strip().lower()
+    if not name:
+        return None
+    name = name.split()[0].strip(",")
+
+    if name in SYNONYMS:
+        return SYNONYMS[name]
+
+    cuts = [name.find(marker, 2) for marker in PREPARATION_MARKERS]
+    cuts = [idx for idx in cuts if idx >= 2]
+    if cuts:
+        name = name[:min(cuts)]
+
+    return SYNONYMS.get(name, name) or None
+
+
+def _find_unit(text):
+    text = text.lstrip()
+    for unit in UNITS:
+        if text.lower().startswith(unit):
+            return unit, text[len(unit):].strip()
+    return None, text.strip()
+
+
+def parse_ingredient(line):
+    """
+    Split one scraped ingredient line into structured entries
+
+    "ซอสหอย 3 ช้อนโต๊ะ" -> [{"name": "ซอสหอยนางรม", "quantity": "3",
+    "amount": 3.0, "unit": "ช้อนโต๊ะ", ...}]. Lines listing several items
+    ("น้ำปลา, น้ำมันหอย อย่างละ 1 ช้อนโต๊ะ") give one entry per item.
+
+    Args:
+        line (str): Ingredient line as scraped
+
+    Returns:
+        list: Entries with text, name, raw_name, quantity, amount, unit, note
+    """
+    text = " ".join((line or "").split())
+    if not text or text.startswith(NON_INGREDIENT_PREFIXES):
+        return []
+
+    matches = list(QUANTITY_PATTERN.finditer(text))
+    chosen = None
+    unit, note = None, ""
+    for match in matches:
+        unit, note = _find_unit(text[match.end():])
+        if unit:
+            chosen = match
+            break
+    if chosen is None and matches:
+        chosen = matches[0]
+        unit, note = _find_unit(text[chosen.end():])
+
+    if chosen is not None:
+        raw_name = text[:matches[0].start()].strip()
+        quantity = chosen.group(0).strip()
+    else:
+        # No amount ("เกลือ เล็กน้อย"); long sentences are not ingredients
+        if (text.count(" ") > 3
+                or len(text.split()[0]) > MAX_UNQUANTIFIED_NAME_LENGTH
+                or any(marker in text for marker in INSTRUCTION_MARKERS)):
+            return []
+        raw_name, quantity, note = text, None, ""
+
+    raw_name = raw_name.replace("อย่างละ", "").strip()
+    names = [part.strip() for part in raw_name.split(",")] if "," in raw_name else [raw_name]
+
+    entries = []
+    for part in names:
+        name = canonical_name(part)
+        if not name:
+            continue
+        entries.append({
+            "text": line,
+            "name": name,
+            "raw_name": part,
+            "quantity": quantity,
+            "amount": parse_amount(quantity),
+            "unit": unit,
+            "note": note,
+        })
+    return entries
+
+
+def normalize_ingredients(lines):
+    """Structured entries for all ingredient lines of a recipe"""
+    entries = []
+    for line in lines:
+        entries.extend(parse_ingredient(line))
+    return entries
+
+
+def canonical_names(lines):
+    """Sorted unique canonical ingredient names of a recipe"""
+    return sorted({entry["name"] for entry in normalize_ingredients(lines)})
+
+
+def add_structured_fields(recipe):
+    """
+    Store structured ingredient fields on a recipe dictionary (in place)
+
+    Adds "ingredients_structured" and "canonical_ingredients" so query-time
+    matching compares canonical names instead of searching strings.
+    """
+    entries = normalize_ingredients(recipe.get("ingredients", []))
+    recipe["ingredients_structured"] = entries
+    recipe["canonical_ingredients"] = sorted({entry["name"] for entry in entries})
+    return recipe
+
+
+if __name__ == "__main__":
+    # Regression check: python 1/ingredient_normalizer.py
+    # Instruction sentences found among the ingredients of recipes_cache.json
+    instructions = [
+        "เติมกะทิลงไป ค่อยๆ ใส่ทีละนิด คนจนทุกอย่างเข้ากันดี",
+        "ใส่เนื้อปลาช่อนที่แร่เป็นชิ้นไว้ลงไป คนให้เข้ากันอีกครั้ง พักไว้",
+        "แต่งหน้าด้านบนด้วยใบมะกรูดและพริกชี้ฟ้าซอย เป็นอันเสร็จ",
+        "คลุกเคล้าให้ส่วนผสมเข้ากันดี แรปด้วยฟิล์มถนอมอาหาร และนำไปแช่ในตู้เย็นอย่างน้อย 1 ชั่วโมง",
+        "เมื่อทุกอย่างเข้ากันดีแล้ว ใส่แอปเปิ้ลปั่นลงไปปั่นต่อ จนเนื้อสวยเนียน",
+        "ใส่ปลาลงไปอย่าพึ่งคน ให้ชิ้นปลาเซ็ตตัว รอจนสุกเหลืองสวย ใช้เวลาประมาณ 6-7 นาที",
+        "ปั่นให้ละเอียด เทใส่ถ้วย นำถั่วตัดที่โขลกไว้ใส่ลงไป ชิมรสชาติตามชอบ",
+    ]
+    # line -> expected canonical names
+    ingredients = {
+        "ซอสหอย 3 ช้อนโต๊ะ": ["ซอสหอยนางรม"],
+        "น้ำปลา, น้ำมันหอย อย่างละ 1 ช้อนโต๊ะ": ["น้ำปลา", "ซอสหอยนางรม"],
+        "เกลือ เล็กน้อย": ["เกลือ"],
+        "กระเทียมจีนซอย": ["กระเทียมจีน"],
+        "คนอร์ซุปก้อน 1 ก้อน": ["คนอร์ซุปก้อน"],
+        "อบเชย 2 ชิ้น": ["อบเชย"],
+        "น้ำส้มสายชูหมักจากแอปเปิ้ล 4 ช้อนโต๊ะ": ["น้ำส้มสายชูหมักจากแอปเปิ้ล"],
+    }
+    failures = [line for line in instructions if parse_ingredient(line)]
+    failures += [
+        line for line, names in ingredients.items()
+        if [entry["name"] for entry in parse_ingredient(line)] != names
+    ]
+    for line in failures:
+        print(f"❌ {line} -> {[entry['name'] for entry in parse_ingredient(line)]}")
+    if failures:
+        raise SystemExit(1)
+    print(f"✅ {len(instructions)} instruction lines dropped, {len(ingredients)} ingredient lines parsed")
@@ -0,0 +1,69 @@
+"""
+rate_limiter.py : Per-host token-bucket rate limiter shared by the scrapers
+ตัวจำกัดอัตราการส่งคำขอต่อโฮสต์ (token bucket) ใช้ร่วมกันระหว่างตัวดึงข้อมูล
+"""
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    ``rate`` tokens are added per second up to ``capacity``. Each request
+    takes one token and waits when the bucket is empty.
+    """
+
+    def __init__(self, rate, capacity=1):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Keeps one token bucket per host so each site gets its own budget"""
+
+    def __init__(self, requests_per_second=2.0, burst=1):
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket_for(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.requests_per_second, self.burst)
+                self._buckets[host] = bucket
+            return bucket
+
+    def wait(self, url):
+        """
+        Wait until a request to the URL's host is allowed
+
+        Args:
+            url (str): URL about to be requested
+        """
+        host = urlsplit(url).netloc.lower()
+        self._bucket_for(host).acquire()
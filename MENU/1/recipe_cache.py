@@ -0,0 +1,328 @@
+"""
+recipe_cache.py : Incremental refresh of the recipes cache
+อัปเดตแคชสูตรอาหารแบบเพิ่มเฉพาะส่วนที่เปลี่ยน แทนการลบแล้วดึงใหม่ทั้งหมด
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from scrape_pipeline import default_window, iter_fetch_parse, open_pools, resolve_parse_workers
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+def manifest_path_for(cache_path):
+    """recipes_cache.json -> recipes_cache.meta.json"""
+    cache_path = Path(cache_path)
+    return cache_path.with_name(f"{cache_path.stem}.meta.json")
+
+
+def content_hash(html):
+    """Hash of a downloaded page, used to skip reparsing unchanged pages"""
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+
+def _load_json(path, default):
+    path = Path(path)
+    if not path.exists():
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _default_file_mode():
+    """0o666 minus the process umask, the mode open() would create a file with"""
+    # os.umask can only be read by setting it; this runs once at import,
+    # before any writer thread exists
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+FILE_MODE = _default_file_mode()
+
+
+@contextmanager
+def atomic_writer(path, mode="wb", **open_kwargs):
+    """
+    Open a temp file next to ``path`` and rename it over ``path`` on success
+
+    Readers (e.g. a running Streamlit session or a web server) see either
+    the old or the new file, never a half-written one. mkstemp creates 0600
+    files, so the usual umask-based mode is applied before the rename.
+
+    Args:
+        path (str | Path): Target file
+        mode (str): open() mode, "wb" or "w"
+        **open_kwargs: Extra open() arguments such as encoding
+
+    Yields:
+        file: Writable file object of the temp file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **open_kwargs) as f:
+            yield f
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_bytes_atomic(path, data):
+    """Write bytes with atomic_writer"""
+    with atomic_writer(path) as f:
+        f.write(data)
+
+
+def write_json_atomic(path, data, indent=2):
+    """Write JSON with atomic_writer"""
+    with atomic_writer(path, "w", encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=indent)
+
+
+def load_cache(cache_path):
+    """
+    Load cached recipes and their per-URL fetch records
+
+    Returns:
+        tuple: (list of recipes, dict url -> {"hash", "fetched_at"})
+    """
+    recipes = _load_json(cache_path, [])
+    manifest = _load_json(manifest_path_for(cache_path), {})
+    return recipes, manifest
+
+
+def save_cache(cache_path, recipes, manifest):
+    """Atomically write the recipes cache and its manifest"""
+    write_json_atomic(cache_path, recipes)
+    write_json_atomic(manifest_path_for(cache_path), manifest)
+
+
+def checkpoint_path_for(cache_path):
+    """recipes_cache.json -> recipes_cache.partial.ndjson"""
+    cache_path = Path(cache_path)
+    return cache_path.with_name(f"{cache_path.stem}.partial.ndjson")
+
+
+def append_checkpoint(checkpoint_path, url, recipe, digest=None, fetched_at=None):
+    """
+    Append one scraped recipe to an NDJSON checkpoint
+
+    Each line is flushed and fsynced, so a crash loses at most the recipe
+    being written.
+    """
+    line = json.dumps({
+        "url": url,
+        "hash": digest,
+        "fetched_at": fetched_at if fetched_at is not None else time.time(),
+        "recipe": recipe,
+    }, ensure_ascii=False)
+    with open(checkpoint_path, 'a', encoding='utf-8') as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def load_checkpoint(checkpoint_path):
+    """
+    Read an NDJSON checkpoint
+
+    Returns:
+        dict: url -> {"url", "hash", "fetched_at", "recipe"}; a truncated
+            last line from an interrupted write is ignored
+    """
+    entries = {}
+    path = Path(checkpoint_path)
+    if not path.exists():
+        return entries
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get("url") and entry.get("recipe"):
+                entries[entry["url"]] = entry
+    return entries
+
+
+def iter_bounded(pool, func, items, window):
+    """
+    Run ``func`` over ``items`` on a pool, yielding (item, result) as each finishes
+
+    At most ``window`` calls are queued at once, so memory stays flat no
+    matter how many items there are. Results are yielded in the calling
+    thread (Streamlit callbacks only work there).
+    """
+    items = iter(items)
+    in_flight = {pool.submit(func, item): item for item in islice(items, window)}
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            item = in_flight.pop(future)
+            for next_item in islice(items, 1):
+                in_flight[pool.submit(func, next_item)] = next_item
+            yield item, future.result()
+
+
+def scrape_with_checkpoint(scraper, collection_url, checkpoint_path, max_recipes=20,
+                           max_workers=None):
+    """
+    Stream a collection into an NDJSON checkpoint, resuming where it stopped
+
+    Recipes already in the checkpoint are yielded first without refetching,
+    then each newly parsed recipe is appended and yielded.
+
+    Args:
+        scraper (TrueIDFoodScraper): Scraper used for links and pages
+        collection_url (str): TrueID collection/article URL
+        checkpoint_path (str | Path): NDJSON file to append to
+        max_recipes (int): Maximum number of collection links to consider
+        max_workers (int): Concurrent fetches (defaults to scraper.max_workers)
+
+    Yields:
+        dict: Recipe data
+    """
+    done = load_checkpoint(checkpoint_path)
+    for entry in done.values():
+        yield entry["recipe"]
+    for recipe in scraper.iter_collection(collection_url, max_recipes, max_workers,
+                                          skip_urls=done):
+        append_checkpoint(checkpoint_path, recipe["url"], recipe)
+        yield recipe
+
+
+def incremental_refresh(scraper, collection_url, cache_path, max_recipes=20,
+                        ttl_seconds=DEFAULT_TTL_SECONDS, max_workers=None,
+                        on_recipe=None):
+    """
+    Refresh the cache with only new or expired recipe pages
+
+    Links found on the collection page are fetched when they are new or
+    their last fetch is older than ``ttl_seconds``. A refetched page whose
+    content hash is unchanged keeps its cached recipe without reparsing.
+    Recipes not on the collection page are kept as they are. Pages are
+    downloaded on threads and parsed on the scraper's parse worker
+    processes (``scraper.parse_workers``).
+
+    Args:
+        scraper (TrueIDFoodScraper): Scraper used for links and pages
+        collection_url (str): TrueID collection/article URL
+        cache_path (str | Path): recipes_cache.json path
+        max_recipes (int): Maximum number of collection links to consider
+        ttl_seconds (float): Age after which a cached page is refetched
+        max_workers (int): Concurrent fetches (defaults to scraper.max_workers)
+        on_recipe (callable): Called with each new or updated recipe as soon
+            as it is parsed, for progressive display
+
+    Every parsed page is also appended to ``recipes_cache.partial.ndjson``.
+    If a run is interrupted, the next one reuses those pages instead of
+    fetching them again; the checkpoint is removed once the cache is saved.
+
+    Returns:
+        tuple: (merged list of recipes, dict of "new", "updated",
+            "unchanged", "skipped", "failed" and "total" counts)
+    """
+    recipes, manifest = load_cache(cache_path)
+    by_url = {r.get("url"): i for i, r in enumerate(recipes) if r.get("url")}
+    now = time.time()
+
+    links = [scraper.recipe_url_for(link)
+             for link in scraper.extract_recipe_links(collection_url)[:max_recipes]]
+
+    stats = {"new": 0, "updated": 0, "unchanged": 0, "skipped": 0, "failed": 0}
+    checkpoint_path = checkpoint_path_for(cache_path)
+    checkpoint = load_checkpoint(checkpoint_path)
+    to_fetch, resumed = [], []
+    for url in links:
+        record = manifest.get(url)
+        if url in checkpoint:
+            entry = checkpoint[url]
+            resumed.append((url, entry["hash"], entry["recipe"]))
+        elif url in by_url and record and now - record.get("fetched_at", 0) < ttl_seconds:
+            stats["skipped"] += 1
+        else:
+            to_fetch.append(url)
+    if resumed:
+        print(f"♻️ Resuming: {len(resumed)} recipes taken from {checkpoint_path.name}")
+
+    def fetch_one(url):
+        # Fetch thread: download and hash; only changed pages go to a parse worker
+        try:
+            recipe_url, html = scraper.fetch_recipe_html(url)
+        except Exception as e:
+            print(f"❌ Error scraping {url}: {str(e)}")
+            return (None, None, None), None
+        digest = content_hash(html)
+        record = manifest.get(recipe_url)
+        if recipe_url in by_url and record and record.get("hash") == digest:
+            return (recipe_url, digest, recipes[by_url[recipe_url]]), None
+        return (recipe_url, digest, None), scraper.parse_task(recipe_url, html)
+
+    def merge(url, digest, recipe):
+        if digest is None or recipe is None:
+            stats["failed"] += 1
+            return
+
+        old_record = manifest.get(url)
+        manifest[url] = {"hash": digest, "fetched_at": now}
+        if url in by_url:
+            if old_record and old_record.get("hash") == digest:
+                stats["unchanged"] += 1
+                return
+            recipes[by_url[url]] = recipe
+            stats["updated"] += 1
+        else:
+            by_url[url] = len(recipes)
+            recipes.append(recipe)
+            stats["new"] += 1
+        if on_recipe is not None:
+            on_recipe(recipe)
+
+    for url, digest, recipe in resumed:
+        merge(url, digest, recipe)
+
+    workers = max(1, max_workers or scraper.max_workers)
+    parse_workers = resolve_parse_workers(scraper.parse_workers)
+    if to_fetch:
+        with open_pools(workers, parse_workers) as (fetch_pool, parse_pool):
+            for url, (recipe_url, digest, recipe), result in iter_fetch_parse(
+                fetch_pool, parse_pool, fetch_one, to_fetch,
+                default_window(workers, parse_workers)
+            ):
+                if result is not None:
+                    recipe = scraper.parse_result(recipe_url, result)
+                if digest is not None and recipe is not None:
+                    append_checkpoint(checkpoint_path, url, recipe, digest, now)
+                merge(url, digest, recipe)
+
+    if stats["new"] or stats["updated"] or stats["unchanged"]:
+        save_cache(cache_path, recipes, manifest)
+    if checkpoint_path.exists():
+        checkpoint_path.unlink()
+    stats["total"] = len(recipes)
+    metrics = getattr(scraper, "metrics", None)
+    if metrics is not None:
+        for outcome in ("new", "updated", "unchanged", "skipped", "failed"):
+            metrics.count("refresh_pages", stats[outcome], collection=collection_url,
+                          result=outcome)
+    print(
+        f"✅ Refreshed cache: {stats['new']} new, {stats['updated']} updated, "
+        f"{stats['unchanged']} unchanged, {stats['skipped']} within TTL, "
+        f"{stats['failed']} failed"
+    )
+    return recipes, stats
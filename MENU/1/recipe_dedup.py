@@ -0,0 +1,233 @@
+"""
+recipe_dedup.py : Near-duplicate recipe detection with MinHash and LSH
+ตรวจหาสูตรซ้ำ (ชื่อต่างกันแต่วัตถุดิบเหมือนกัน) ข้ามแหล่งข้อมูล โดยไม่ต้องเทียบทุกคู่
+
+Each recipe has two shingle sets: its canonical ingredient names and the
+character trigrams of its title. MinHash estimates the Jaccard similarity
+of each; the signature is the ingredient part (INGREDIENT_PERM slots)
+followed by the title part, so the ingredients weigh three times as much as
+the title. LSH banding puts recipes whose signatures agree on a whole band
+into the same bucket, so only bucket-mates are compared.
+
+Usage:
+    python recipe_dedup.py                 # report duplicate clusters in recipes.db
+    python recipe_store.py dedupe          # collapse them to canonical recipes
+"""
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+from ingredient_normalizer import canonical_names
+
+NUM_PERM = 64
+INGREDIENT_PERM = 48
+BANDS = 16
+# Estimated Jaccard similarity at which two recipes count as the same dish
+DEFAULT_THRESHOLD = 0.6
+# Recipes with fewer canonical ingredients are never merged (too little evidence)
+MIN_INGREDIENTS = 4
+# Compare a new recipe with at most this many cluster leaders of one bucket
+MAX_BUCKET_CHECKS = 32
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_BAND_MULTIPLIERS = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9], dtype=np.uint64
+)
+
+
+# Ingredient names and title trigrams repeat across recipes
+@lru_cache(maxsize=1 << 17)
+def _hash64(text):
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def title_shingles(name, size=3):
+    """Character n-grams of a title (Thai titles have no word boundaries)"""
+    text = "".join((name or "").lower().split())
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def recipe_shingles(recipe):
+    """
+    Shingle sets of a recipe
+
+    Args:
+        recipe (dict): Recipe with "canonical_ingredients" or raw "ingredients"
+
+    Returns:
+        tuple: (set of canonical ingredient names, set of title trigrams)
+    """
+    names = recipe.get("canonical_ingredients")
+    if names is None:
+        names = canonical_names(recipe.get("ingredients", []))
+    title = recipe.get("name") or recipe.get("recipe_name") or ""
+    return {name for name in names if name}, title_shingles(title)
+
+
+class MinHasher:
+    """
+    MinHash signatures from ``num_perm`` universal hash functions
+
+    ((a * x + b) mod p) truncated to 32 bits over a 32-bit shingle hash, as
+    in common MinHash implementations (the uint64 product wraps), so a
+    signature packs into ``num_perm * 4`` bytes.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, ingredient_perm=INGREDIENT_PERM, seed=1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.ingredient_perm = ingredient_perm
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def _minhash(self, shingles, a, b):
+        if not shingles:
+            return np.full(len(a), _MAX_HASH, dtype=np.uint32)
+        x = np.fromiter((_hash64(s) for s in shingles), dtype=np.uint64, count=len(shingles))
+        x = (x & np.uint64(_MAX_HASH))[:, None]
+        values = ((a * x + b) % np.uint64(_MERSENNE_PRIME)) & np.uint64(_MAX_HASH)
+        return values.min(axis=0).astype(np.uint32)
+
+    def signature(self, ingredients, title_grams=()):
+        """
+        MinHash signature of a recipe's shingle sets
+
+        Args:
+            ingredients (set): Canonical ingredient names
+            title_grams (set): Title trigrams
+
+        Returns:
+            numpy.ndarray: uint32 array of length num_perm
+        """
+        split = self.ingredient_perm
+        return np.concatenate([
+            self._minhash(ingredients, self._a[:split], self._b[:split]),
+            self._minhash(title_grams, self._a[split:], self._b[split:]),
+        ])
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity: fraction of equal signature slots"""
+    return float(np.count_nonzero(sig_a == sig_b)) / len(sig_a)
+
+
+def band_keys(signature, bands=BANDS):
+    """
+    LSH bucket key of each band
+
+    Returns:
+        list: One signed 64-bit integer per band (fits an SQLite INTEGER)
+    """
+    rows = signature.astype(np.uint64).reshape(bands, -1)
+    keys = np.arange(bands, dtype=np.uint64) * _BAND_MULTIPLIERS[2]
+    for column in range(rows.shape[1]):
+        # Multiply-xor mixing (wraps modulo 2^64); deterministic across processes
+        keys = (keys ^ rows[:, column]) * _BAND_MULTIPLIERS[column % 2]
+    return keys.view(np.int64).tolist()
+
+
+def find_clusters(recipes, threshold=DEFAULT_THRESHOLD, hasher=None, bands=BANDS):
+    """
+    Group near-duplicate recipes
+
+    Recipes are visited in order; each joins the most similar cluster
+    leader found in its LSH buckets, or becomes a leader itself. Only
+    leaders are bucketed and compared against (at most MAX_BUCKET_CHECKS
+    per bucket), so the work grows linearly with the corpus instead of with
+    the number of pairs, and clusters cannot chain through intermediate
+    recipes.
+
+    Args:
+        recipes (list): Recipe dictionaries
+        threshold (float): Minimum estimated Jaccard similarity to the leader
+        hasher (MinHasher): Reuse a hasher (default: a new one)
+        bands (int): LSH bands (num_perm must be divisible by it)
+
+    Returns:
+        list: Clusters with more than one recipe, each a sorted list of indices
+    """
+    hasher = hasher or MinHasher()
+    signatures = np.zeros((len(recipes), hasher.num_perm), dtype=np.uint32)
+    buckets = [{} for _ in range(bands)]
+    clusters = {}
+
+    for i, recipe in enumerate(recipes):
+        ingredients, title_grams = recipe_shingles(recipe)
+        if len(ingredients) < MIN_INGREDIENTS:
+            continue
+        signature = hasher.signature(ingredients, title_grams)
+        signatures[i] = signature
+        keys = band_keys(signature, bands)
+
+        candidates = set()
+        for band, key in enumerate(keys):
+            candidates.update(buckets[band].get(key, ())[:MAX_BUCKET_CHECKS])
+        if candidates:
+            leaders = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            scores = (signatures[leaders] == signature).mean(axis=1)
+            best = int(scores.argmax())
+            if scores[best] >= threshold:
+                clusters[int(leaders[best])].append(i)
+                continue
+
+        clusters[i] = [i]
+        for band, key in enumerate(keys):
+            buckets[band].setdefault(key, []).append(i)
+
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def recipe_richness(recipe):
+    """Prefer the most complete copy (ingredients + steps) as the canonical recipe"""
+    return len(recipe.get("ingredients", [])) + len(recipe.get("steps", []))
+
+
+def pick_canonical(recipes, cluster):
+    """Index of the canonical recipe: the richest, then the first seen"""
+    return max(cluster, key=lambda i: (recipe_richness(recipes[i]), -i))
+
+
+def collapse_duplicates(recipes, threshold=DEFAULT_THRESHOLD):
+    """
+    Collapse near-duplicate clusters to one canonical recipe each
+
+    The canonical recipe gains "source_urls" (its own URL first) and
+    "aliases" (the other titles) so no source is lost.
+
+    Args:
+        recipes (list): Recipe dictionaries
+        threshold (float): Minimum estimated Jaccard similarity
+
+    Returns:
+        tuple: (deduplicated recipe list in original order, clusters)
+    """
+    clusters = find_clusters(recipes, threshold)
+    dropped = set()
+    merged = {}
+    for cluster in clusters:
+        canonical = pick_canonical(recipes, cluster)
+        others = [i for i in cluster if i != canonical]
+        recipe = dict(recipes[canonical])
+        urls = [recipes[i].get("url") for i in [canonical, *others]]
+        recipe["source_urls"] = list(dict.fromkeys(url for url in urls if url))
+        aliases = {recipes[i].get("name") for i in others} - {recipe.get("name"), None}
+        recipe["aliases"] = sorted(aliases)
+        merged[canonical] = recipe
+        dropped.update(others)
+
+    kept = [merged.get(i, recipe) for i, recipe in enumerate(recipes) if i not in dropped]
+    return kept, clusters
+
+
+if __name__ == "__main__":
+    from recipe_store import RecipeStore
+
+    recipes = RecipeStore(dedupe=False).load_recipes()
+    clusters = find_clusters(recipes)
+    print(f"🔎 {len(clusters)} duplicate clusters in {len(recipes)} recipes")
+    for cluster in clusters[:20]:
+        print("   " + " = ".join(recipes[i]["name"] for i in cluster))
@@ -0,0 +1,509 @@
+"""
+recipe_store.py : SQLite-backed recipe store
+ที่เก็บสูตรอาหารด้วย SQLite
+
+Usage:
+    python recipe_store.py import     # one-time import of the JSON cache and CSVs
+    python recipe_store.py dedupe     # merge near-duplicates already stored
+    python recipe_store.py reparse    # re-parse stored ingredient lines
+"""
+import csv
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+import recipe_dedup
+from ingredient_normalizer import add_structured_fields, normalize_ingredients
+
+MENU_DIR = Path(__file__).parent.parent
+DEFAULT_DB_PATH = MENU_DIR / "recipes.db"
+DEFAULT_JSON_PATH = MENU_DIR / "recipes_cache.json"
+DEFAULT_CSV_PATHS = [
+    Path(__file__).parent / "recipes_dataset.csv",
+    Path(__file__).parent / "recipe_output.csv",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    url TEXT,
+    difficulty TEXT,
+    time TEXT,
+    source TEXT,
+    updated_at REAL,
+    image TEXT
+);
+CREATE TABLE IF NOT EXISTS ingredients (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (recipe_id, position)
+);
+CREATE TABLE IF NOT EXISTS ingredient_items (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    line TEXT NOT NULL,
+    name TEXT NOT NULL,
+    raw_name TEXT,
+    quantity TEXT,
+    amount REAL,
+    unit TEXT,
+    note TEXT,
+    PRIMARY KEY (recipe_id, position)
+);
+CREATE INDEX IF NOT EXISTS ingredient_items_name ON ingredient_items(name);
+CREATE TABLE IF NOT EXISTS steps (
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (recipe_id, position)
+);
+CREATE TABLE IF NOT EXISTS recipe_sources (
+    key TEXT PRIMARY KEY,
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    url TEXT,
+    name TEXT,
+    source TEXT,
+    added_at REAL
+);
+CREATE INDEX IF NOT EXISTS recipe_sources_recipe ON recipe_sources(recipe_id);
+CREATE TABLE IF NOT EXISTS recipe_signatures (
+    recipe_id INTEGER PRIMARY KEY REFERENCES recipes(id) ON DELETE CASCADE,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lsh_buckets (
+    band INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    recipe_id INTEGER NOT NULL REFERENCES recipes(id) ON DELETE CASCADE,
+    PRIMARY KEY (band, bucket, recipe_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lsh_buckets_recipe ON lsh_buckets(recipe_id);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _normalize_recipe(recipe):
+    """Accept both app recipes ("name") and Kapook rows ("recipe_name")"""
+    normalized = {
+        "name": recipe.get("name") or recipe.get("recipe_name") or "",
+        "ingredients": list(recipe.get("ingredients", [])),
+        "steps": list(recipe.get("steps", [])),
+        "url": recipe.get("url"),
+        "difficulty": recipe.get("difficulty", "ไม่ระบุ"),
+        "time": recipe.get("time", "ไม่ระบุ"),
+        "image": recipe.get("image") or None,
+    }
+    # Structured ingredient fields are parsed once, at ingest time
+    if "ingredients_structured" in recipe:
+        normalized["ingredients_structured"] = recipe["ingredients_structured"]
+    else:
+        add_structured_fields(normalized)
+    return normalized
+
+
+def _split_csv_list(text):
+    """Split "a | b | c" columns written by the Kapook scrapers"""
+    return [part.strip() for part in (text or "").split("|") if part.strip()]
+
+
+class RecipeStore:
+    """
+    Recipes, ingredients and steps in normalized tables
+
+    Free-text search is not answered here: readers search the in-memory
+    trigram index of recipe_index.py (or the compiled snapshot).
+
+    New recipes that are near-duplicates of a stored one (MinHash/LSH, see
+    recipe_dedup.py) are not inserted; their URL is recorded as another
+    source of the stored recipe instead.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, dedupe=True,
+                 dedupe_threshold=recipe_dedup.DEFAULT_THRESHOLD):
+        self.path = Path(path)
+        self.dedupe_enabled = dedupe
+        self.dedupe_threshold = dedupe_threshold
+        self.hasher = recipe_dedup.MinHasher()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(recipes)")}
+            if "image" not in columns:
+                # Databases created before recipe images were stored
+                conn.execute("ALTER TABLE recipes ADD COLUMN image TEXT")
+            # FTS5 index of databases created before search moved in memory
+            conn.execute("DROP TABLE IF EXISTS recipes_fts")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call keeps the store usable from
+        # Streamlit's script threads and from scraper worker threads
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.execute("PRAGMA journal_mode = WAL")
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    # ------------------------------------------
+    # Writing
+    # ------------------------------------------
+
+    def upsert_recipes(self, recipes, source="trueid"):
+        """
+        Insert or update recipes, keyed by URL (or by source + name)
+
+        A new recipe that nearly duplicates a stored one is merged into it
+        (recorded in recipe_sources) instead of being inserted.
+
+        Args:
+            recipes (list): Recipe dictionaries
+            source (str): Where the recipes came from
+
+        Returns:
+            int: Number of recipes written (merged duplicates not included)
+        """
+        count = 0
+        now = time.time()
+        with self._connect() as conn:
+            for raw in recipes:
+                recipe = _normalize_recipe(raw)
+                if not recipe["name"]:
+                    continue
+                key = recipe["url"] or f"{source}:{recipe['name']}"
+                signature = self._signature(recipe)
+
+                row = conn.execute("SELECT id FROM recipes WHERE key = ?", (key,)).fetchone()
+                if not row:
+                    merged_into = conn.execute(
+                        "SELECT recipe_id FROM recipe_sources WHERE key = ?", (key,)
+                    ).fetchone()
+                    if merged_into is None and signature is not None:
+                        duplicate_id = self._find_duplicate(conn, signature)
+                        if duplicate_id is not None:
+                            self._add_source(conn, duplicate_id, key, recipe, source, now)
+                            merged_into = (duplicate_id,)
+                    if merged_into is not None:
+                        continue
+
+                if row:
+                    recipe_id = row[0]
+                    conn.execute(
+                        "UPDATE recipes SET name = ?, url = ?, difficulty = ?, time = ?, "
+                        "source = ?, updated_at = ?, image = COALESCE(?, image) WHERE id = ?",
+                        (recipe["name"], recipe["url"], recipe["difficulty"],
+                         recipe["time"], source, now, recipe["image"], recipe_id)
+                    )
+                    conn.execute("DELETE FROM ingredients WHERE recipe_id = ?", (recipe_id,))
+                    conn.execute("DELETE FROM ingredient_items WHERE recipe_id = ?", (recipe_id,))
+                    conn.execute("DELETE FROM steps WHERE recipe_id = ?", (recipe_id,))
+                else:
+                    recipe_id = conn.execute(
+                        "INSERT INTO recipes "
+                        "(key, name, url, difficulty, time, source, updated_at, image) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (key, recipe["name"], recipe["url"], recipe["difficulty"],
+                         recipe["time"], source, now, recipe["image"])
+                    ).lastrowid
+
+                conn.executemany(
+                    "INSERT INTO ingredients (recipe_id, position, text) VALUES (?, ?, ?)",
+                    [(recipe_id, i, text) for i, text in enumerate(recipe["ingredients"])]
+                )
+                self._write_items(conn, recipe_id, recipe["ingredients_structured"])
+                conn.executemany(
+                    "INSERT INTO steps (recipe_id, position, text) VALUES (?, ?, ?)",
+                    [(recipe_id, i, text) for i, text in enumerate(recipe["steps"])]
+                )
+                self._index_signature(conn, recipe_id, signature)
+                count += 1
+
+            if count:
+                self._bump_version(conn)
+        return count
+
+    def _write_items(self, conn, recipe_id, entries):
+        conn.executemany(
+            "INSERT INTO ingredient_items "
+            "(recipe_id, position, line, name, raw_name, quantity, amount, unit, note) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [(recipe_id, i, e["text"], e["name"], e["raw_name"], e["quantity"],
+              e["amount"], e["unit"], e["note"])
+             for i, e in enumerate(entries)]
+        )
+
+    def reparse_ingredients(self):
+        """
+        Parse every stored ingredient line again with the current normalizer
+
+        Needed once after ingredient_normalizer.py changes, so recipes stored
+        earlier get the same canonical names (and MinHash signatures) as
+        newly ingested ones.
+
+        Returns:
+            int: Number of recipes whose parsed ingredients changed
+        """
+        changed = 0
+        with self._connect() as conn:
+            for recipe in self.load_recipes():
+                entries = normalize_ingredients(recipe["ingredients"])
+                if entries == recipe["ingredients_structured"]:
+                    continue
+                conn.execute("DELETE FROM ingredient_items WHERE recipe_id = ?", (recipe["id"],))
+                self._write_items(conn, recipe["id"], entries)
+                recipe["canonical_ingredients"] = sorted({e["name"] for e in entries})
+                self._index_signature(conn, recipe["id"], self._signature(recipe))
+                changed += 1
+            if changed:
+                self._bump_version(conn)
+        return changed
+
+    # ------------------------------------------
+    # Near-duplicate detection
+    # ------------------------------------------
+
+    def _signature(self, recipe):
+        """MinHash signature, or None when the recipe is too small to compare"""
+        if not self.dedupe_enabled:
+            return None
+        ingredients, title_grams = recipe_dedup.recipe_shingles(recipe)
+        if len(ingredients) < recipe_dedup.MIN_INGREDIENTS:
+            return None
+        return self.hasher.signature(ingredients, title_grams)
+
+    def _find_duplicate(self, conn, signature):
+        """Id of the most similar stored recipe sharing an LSH bucket, if similar enough"""
+        candidates = set()
+        for band, bucket in enumerate(recipe_dedup.band_keys(signature)):
+            candidates.update(row[0] for row in conn.execute(
+                "SELECT recipe_id FROM lsh_buckets WHERE band = ? AND bucket = ? LIMIT ?",
+                (band, bucket, recipe_dedup.MAX_BUCKET_CHECKS)
+            ))
+        best_id, best_similarity = None, self.dedupe_threshold
+        for recipe_id in sorted(candidates):
+            row = conn.execute(
+                "SELECT signature FROM recipe_signatures WHERE recipe_id = ?", (recipe_id,)
+            ).fetchone()
+            if row is None:
+                continue
+            stored = np.frombuffer(row[0], dtype=np.uint32)
+            similarity = recipe_dedup.similarity(signature, stored)
+            if similarity >= best_similarity:
+                best_id, best_similarity = recipe_id, similarity
+        return best_id
+
+    def _index_signature(self, conn, recipe_id, signature):
+        conn.execute("DELETE FROM lsh_buckets WHERE recipe_id = ?", (recipe_id,))
+        conn.execute("DELETE FROM recipe_signatures WHERE recipe_id = ?", (recipe_id,))
+        if signature is None:
+            return
+        conn.execute(
+            "INSERT INTO recipe_signatures (recipe_id, signature) VALUES (?, ?)",
+            (recipe_id, signature.tobytes())
+        )
+        conn.executemany(
+            "INSERT OR IGNORE INTO lsh_buckets (band, bucket, recipe_id) VALUES (?, ?, ?)",
+            [(band, bucket, recipe_id)
+             for band, bucket in enumerate(recipe_dedup.band_keys(signature))]
+        )
+
+    def _add_source(self, conn, recipe_id, key, recipe, source, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO recipe_sources (key, recipe_id, url, name, source, added_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, recipe_id, recipe.get("url"), recipe["name"], source, now)
+        )
+
+    def dedupe(self):
+        """
+        Collapse near-duplicates already in the store and rebuild the LSH index
+
+        Needed once for databases filled before deduplication existed (or
+        after changing the threshold). Each cluster keeps its richest recipe;
+        the others become extra sources of it and are deleted.
+
+        Returns:
+            int: Number of recipes merged away
+        """
+        recipes = self.load_recipes()
+        clusters = recipe_dedup.find_clusters(recipes, self.dedupe_threshold, self.hasher)
+        now = time.time()
+        removed = set()
+        with self._connect() as conn:
+            for cluster in clusters:
+                canonical = recipes[recipe_dedup.pick_canonical(recipes, cluster)]
+                for i in cluster:
+                    duplicate = recipes[i]
+                    if duplicate is canonical:
+                        continue
+                    key, source = conn.execute(
+                        "SELECT key, source FROM recipes WHERE id = ?", (duplicate["id"],)
+                    ).fetchone()
+                    conn.execute(
+                        "UPDATE recipe_sources SET recipe_id = ? WHERE recipe_id = ?",
+                        (canonical["id"], duplicate["id"])
+                    )
+                    self._add_source(conn, canonical["id"], key, duplicate, source, now)
+                    conn.execute("DELETE FROM recipes WHERE id = ?", (duplicate["id"],))
+                    removed.add(duplicate["id"])
+
+            for recipe in recipes:
+                if recipe["id"] not in removed:
+                    self._index_signature(conn, recipe["id"], self._signature(recipe))
+            if removed:
+                self._bump_version(conn)
+        return len(removed)
+
+    def _bump_version(self, conn):
+        conn.execute(
+            "INSERT INTO meta (key, value) VALUES ('version', '1') "
+            "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+        )
+
+    # ------------------------------------------
+    # Reading
+    # ------------------------------------------
+
+    def version(self):
+        """Counter that changes on every write (cheap cache key for the app)"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        return int(row[0]) if row else 0
+
+    def count(self):
+        """Number of stored recipes"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def load_recipes(self):
+        """
+        Load all recipes in insertion order
+
+        Returns:
+            list: Recipe dictionaries in the recipes_cache.json format,
+                plus the database "id"
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, name, url, difficulty, time, image FROM recipes ORDER BY id"
+            ).fetchall()
+            ingredients = {}
+            for recipe_id, text in conn.execute(
+                "SELECT recipe_id, text FROM ingredients ORDER BY recipe_id, position"
+            ):
+                ingredients.setdefault(recipe_id, []).append(text)
+            steps = {}
+            for recipe_id, text in conn.execute(
+                "SELECT recipe_id, text FROM steps ORDER BY recipe_id, position"
+            ):
+                steps.setdefault(recipe_id, []).append(text)
+            sources = {}
+            for recipe_id, url, name in conn.execute(
+                "SELECT recipe_id, url, name FROM recipe_sources ORDER BY added_at, key"
+            ):
+                sources.setdefault(recipe_id, []).append((url, name))
+            items = {}
+            for recipe_id, line, name, raw_name, quantity, amount, unit, note in conn.execute(
+                "SELECT recipe_id, line, name, raw_name, quantity, amount, unit, note "
+                "FROM ingredient_items ORDER BY recipe_id, position"
+            ):
+                items.setdefault(recipe_id, []).append({
+                    "text": line, "name": name, "raw_name": raw_name, "quantity": quantity,
+                    "amount": amount, "unit": unit, "note": note,
+                })
+
+        recipes = []
+        for recipe_id, name, url, difficulty, time_text, image in rows:
+            recipe = {
+                "id": recipe_id,
+                "name": name,
+                "ingredients": ingredients.get(recipe_id, []),
+                "steps": steps.get(recipe_id, []),
+                "difficulty": difficulty,
+                "time": time_text,
+            }
+            if url:
+                recipe["url"] = url
+            if image:
+                recipe["image"] = image
+            if recipe_id in sources:
+                # Near-duplicates merged into this recipe
+                urls = [url] + [source_url for source_url, _ in sources[recipe_id]]
+                recipe["source_urls"] = list(dict.fromkeys(u for u in urls if u))
+                recipe["aliases"] = sorted({n for _, n in sources[recipe_id] if n} - {name})
+            if recipe_id in items:
+                recipe["ingredients_structured"] = items[recipe_id]
+                recipe["canonical_ingredients"] = sorted({e["name"] for e in items[recipe_id]})
+            else:
+                # Rows written before structured parsing existed
+                add_structured_fields(recipe)
+            recipes.append(recipe)
+        return recipes
+
+    # ------------------------------------------
+    # One-time import
+    # ------------------------------------------
+
+    def import_json(self, path=DEFAULT_JSON_PATH, source="trueid"):
+        """Import a recipes_cache.json file"""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        with open(path, 'r', encoding='utf-8') as f:
+            recipes = json.load(f)
+        return self.upsert_recipes(recipes, source=source)
+
+    def import_csv(self, path, source="kapook"):
+        """Import a CSV written by the Kapook scrapers"""
+        path = Path(path)
+        if not path.exists():
+            return 0
+        recipes = []
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                recipes.append({
+                    "name": row.get("recipe_name", ""),
+                    "ingredients": _split_csv_list(
+                        row.get("ingredients_text") or row.get("ingredients")
+                    ),
+                    "steps": _split_csv_list(row.get("steps_text") or row.get("steps")),
+                    "difficulty": row.get("difficulty") or "ไม่ระบุ",
+                    "time": row.get("time") or "ไม่ระบุ",
+                    "image": row.get("image") or None,
+                })
+        return self.upsert_recipes(recipes, source=source)
+
+    def import_existing(self, json_path=DEFAULT_JSON_PATH, csv_paths=DEFAULT_CSV_PATHS):
+        """Import the JSON cache and the Kapook CSVs shipped in the repo"""
+        total = self.import_json(json_path)
+        for csv_path in csv_paths:
+            total += self.import_csv(csv_path)
+        return total
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        store = RecipeStore()
+        imported = store.import_existing()
+        print(f"✅ Imported {imported} recipes into {store.path} ({store.count()} stored)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "dedupe":
+        store = RecipeStore()
+        removed = store.dedupe()
+        print(f"✅ Merged {removed} duplicate recipes ({store.count()} remain)")
+    elif len(sys.argv) > 1 and sys.argv[1] == "reparse":
+        store = RecipeStore()
+        changed = store.reparse_ingredients()
+        print(f"✅ Re-parsed ingredients: {changed} of {store.count()} recipes changed")
+    else:
+        print(__doc__)
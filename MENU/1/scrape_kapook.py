@@ -1,8 +1,11 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import time
 
+from fetcher import get_fetcher
+from recipe_store import RecipeStore
+from scrape_metrics import get_metrics
+
 headers = {
     "User-Agent": "Mozilla/5.0"
 }
@@ -12,8 +15,8 @@ headers = {
 # ----------------------------------
 def get_recipe_links(list_url):
     try:
-        response = requests.get(list_url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
+        html = get_fetcher().get_text(list_url, headers=headers, timeout=10)
+        soup = BeautifulSoup(html, "html.parser")
 
         links = set()
 
@@ -37,47 +40,86 @@ def get_recipe_links(list_url):
 # ----------------------------------
 def scrape_kapook(url):
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
-
-        #  title
-        title_tag = soup.find("h1")
-        recipe_name = title_tag.get_text(strip=True) if title_tag else "ไม่พบชื่อสูตร"
-
-        #  ingredients (แม่นขึ้น)
-        ingredients = []
-        for li in soup.select("li"):
-            text = li.get_text(strip=True)
-
-            if any(unit in text for unit in
-                   ["กรัม", "ช้อน", "ถ้วย", "ฟอง", "ชต.", "ชช.", "มล."]):
-                if len(text) < 200:  # กันข้อความยาวผิดปกติ
-                    ingredients.append(text)
-
-        #  steps (ยืดหยุ่นขึ้น)
-        steps = []
-        for p in soup.find_all("p"):
-            text = p.get_text(strip=True)
-
-            if (
-                text.startswith(tuple(str(i) for i in range(1, 10))) or
-                "ขั้นตอน" in text
-            ):
-                steps.append(text)
-
-        steps = list(dict.fromkeys(steps))
-
-        return {
-            "recipe_name": recipe_name,
-            "ingredients": ingredients,
-            "steps": steps
-        }
+        html = get_fetcher().get_text(url, headers=headers, timeout=10)
+        data, (parse_seconds, extract_seconds, field_seconds) = parse_kapook_page(html)
+        get_metrics().record_parse(url, parse_seconds, extract_seconds, field_seconds)
+        return data
 
     except Exception as e:
         print(f"❌ scrape error {url}:", e)
         return None
 
 
+def _kapook_name(soup):
+    title_tag = soup.find("h1")
+    return title_tag.get_text(strip=True) if title_tag else "ไม่พบชื่อสูตร"
+
+
+def _kapook_ingredients(soup):
+    #  ingredients (แม่นขึ้น)
+    ingredients = []
+    for li in soup.select("li"):
+        text = li.get_text(strip=True)
+
+        if any(unit in text for unit in
+               ["กรัม", "ช้อน", "ถ้วย", "ฟอง", "ชต.", "ชช.", "มล."]):
+            if len(text) < 200:  # กันข้อความยาวผิดปกติ
+                ingredients.append(text)
+    return ingredients
+
+
+def _kapook_steps(soup):
+    #  steps (ยืดหยุ่นขึ้น)
+    steps = []
+    for p in soup.find_all("p"):
+        text = p.get_text(strip=True)
+
+        if (
+            text.startswith(tuple(str(i) for i in range(1, 10))) or
+            "ขั้นตอน" in text
+        ):
+            steps.append(text)
+
+    return list(dict.fromkeys(steps))
+
+
+def _kapook_image(soup):
+    #  image (รูปปกของสูตร)
+    og_image = soup.find("meta", property="og:image")
+    return og_image.get("content", "") if og_image else ""
+
+
+def parse_kapook_page(html):
+    """
+    แยกข้อมูลสูตรพร้อมจับเวลา (เหมือน parse_trueid_page)
+
+    Returns:
+        tuple: (recipe_name/ingredients/steps/image dict,
+            (parse seconds, extract seconds, per-field seconds))
+    """
+    start = time.perf_counter()
+    soup = BeautifulSoup(html, "html.parser")
+    parsed = time.perf_counter()
+
+    data, field_seconds = {}, {}
+    for key, field, extract in (
+        ("recipe_name", "name", _kapook_name),
+        ("ingredients", "ingredients", _kapook_ingredients),
+        ("steps", "steps", _kapook_steps),
+        ("image", "image", _kapook_image),
+    ):
+        field_start = time.perf_counter()
+        data[key] = extract(soup)
+        field_seconds[field] = time.perf_counter() - field_start
+
+    return data, (parsed - start, time.perf_counter() - parsed, field_seconds)
+
+
+def parse_kapook(html):
+    """แยกชื่อสูตร วัตถุดิบ และขั้นตอนจาก HTML ที่ดึงมาแล้ว"""
+    return parse_kapook_page(html)[0]
+
+
 # ----------------------------------
 #  main
 # ----------------------------------
@@ -91,6 +133,7 @@ if __name__ == "__main__":
     print("พบลิงก์ทั้งหมด:", len(recipe_links))
 
     all_data = []
+    recipes = []
 
     for url in recipe_links[:10]:
         print("กำลังดึง:", url)
@@ -103,6 +146,7 @@ if __name__ == "__main__":
                 "ingredients_text": " | ".join(data["ingredients"]),
                 "steps_text": " | ".join(data["steps"])
             })
+            recipes.append(dict(data, url=url))
 
         time.sleep(1)
 
@@ -110,3 +154,6 @@ if __name__ == "__main__":
     df.to_csv("recipes_dataset.csv", index=False, encoding="utf-8-sig")
 
     print("✅ บันทึกไฟล์ recipes_dataset.csv สำเร็จ")
+
+    RecipeStore().upsert_recipes(recipes, source="kapook")
+    print(f"✅ บันทึก {len(recipes)} สูตรลง recipes.db")
@@ -0,0 +1,291 @@
+"""
+scrape_metrics.py : Instrumentation for the scrape pipeline
+เก็บสถิติการดึงข้อมูล (เวลา, ขนาด, สถานะ, retry, เวลา parse) และส่งออกเป็น JSON / Prometheus
+"""
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from pathlib import Path
+from urllib.parse import urlparse
+
+from recipe_cache import atomic_writer, write_json_atomic
+
+QUANTILES = (0.5, 0.9, 0.99)
+# Upper bounds (seconds) of the timing buckets: 0.1 ms to about 2 minutes,
+# 25% apart, so quantiles are estimated to within one bucket
+BUCKET_BOUNDS = tuple(0.0001 * 1.25 ** i for i in range(64))
+# Recent requests and pages kept verbatim for the JSON report; totals and
+# timing distributions cover the whole run without keeping every record
+MAX_RECORDS = 1000
+
+
+class _Histogram:
+    """Running count, sum and bucketed distribution of durations"""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+
+    def add(self, seconds):
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        self.buckets[bisect_left(BUCKET_BOUNDS, seconds)] += 1
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (capped at the maximum)"""
+        if not self.count:
+            return 0.0
+        rank = min(self.count - 1, int(q * self.count))
+        seen = 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen > rank:
+                break
+        return min(BUCKET_BOUNDS[i], self.max) if i < len(BUCKET_BOUNDS) else self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            **{f"p{int(q * 100)}": self.quantile(q) for q in QUANTILES},
+        }
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+class ScrapeMetrics:
+    """
+    Thread-safe recorder for one scrape run
+
+    The fetcher records every HTTP request, the scrapers record parse and
+    extractor timings and per-collection outcomes. Records are folded into
+    per-host totals and timing histograms as they arrive, so memory stays
+    bounded in a long-running process; only the last MAX_RECORDS requests
+    and pages are kept as they were. ``report()`` summarizes the run,
+    ``to_prometheus()`` renders it in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Start a new run"""
+        with self._lock:
+            self.started_at = time.time()
+            self.requests = deque(maxlen=MAX_RECORDS)
+            self.parses = deque(maxlen=MAX_RECORDS)
+            self.hosts = {}
+            self.parse_seconds = _Histogram()
+            self.extract_seconds = _Histogram()
+            self.field_seconds = {}
+            self.counters = {}
+
+    def record_request(self, url, status=None, seconds=0.0, first_byte_seconds=0.0,
+                       nbytes=0, retries=0, from_cache=False, error=None):
+        """
+        Record one HTTP request
+
+        Args:
+            url (str): Requested URL
+            status (int): HTTP status, None when no response arrived
+            seconds (float): Total time including body download
+            first_byte_seconds (float): Time until response headers (includes
+                DNS, TCP/TLS setup on new connections and server latency)
+            nbytes (int): Body size in bytes
+            retries (int): Retries performed by the transport
+            from_cache (bool): True when a 304 reused the cached body
+            error (str): Exception text for failed requests
+        """
+        entry = {
+            "url": url,
+            "host": urlparse(url).netloc,
+            "status": status,
+            "seconds": seconds,
+            "first_byte_seconds": first_byte_seconds,
+            "download_seconds": max(0.0, seconds - first_byte_seconds),
+            "bytes": nbytes,
+            "retries": retries,
+            "from_cache": from_cache,
+            "error": error,
+        }
+        status_text = str(status) if status is not None else "error"
+        with self._lock:
+            self.requests.append(entry)
+            host = self.hosts.get(entry["host"])
+            if host is None:
+                host = self.hosts[entry["host"]] = {
+                    "requests": 0, "errors": 0, "bytes": 0, "retries": 0,
+                    "cache_hits": 0, "status": {},
+                    "seconds": _Histogram(), "first_byte_seconds": _Histogram(),
+                }
+            host["requests"] += 1
+            host["bytes"] += nbytes
+            host["retries"] += retries
+            host["cache_hits"] += from_cache
+            if error:
+                host["errors"] += 1
+            host["status"][status_text] = host["status"].get(status_text, 0) + 1
+            host["seconds"].add(seconds)
+            host["first_byte_seconds"].add(first_byte_seconds)
+
+    def record_parse(self, url, parse_seconds, extract_seconds, field_seconds=None):
+        """Record HTML parse time and per-extractor time for one page"""
+        field_seconds = dict(field_seconds or {})
+        with self._lock:
+            self.parses.append({
+                "url": url,
+                "parse_seconds": parse_seconds,
+                "extract_seconds": extract_seconds,
+                "field_seconds": field_seconds,
+            })
+            self.parse_seconds.add(parse_seconds)
+            self.extract_seconds.add(extract_seconds)
+            for field, seconds in field_seconds.items():
+                self.field_seconds.setdefault(field, _Histogram()).add(seconds)
+
+    def count(self, name, amount=1, **labels):
+        """Increase a counter, e.g. count("recipes", result="success", collection=url)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def report(self):
+        """
+        Summarize the run
+
+        Returns:
+            dict: Run times, request/parse summaries per host and field,
+                counters, and the most recent per-request and per-page records
+        """
+        with self._lock:
+            hosts = {
+                name: {
+                    **{key: value for key, value in host.items()
+                       if not isinstance(value, _Histogram)},
+                    "status": dict(host["status"]),
+                    "seconds": host["seconds"].summary(),
+                    "first_byte_seconds": host["first_byte_seconds"].summary(),
+                }
+                for name, host in self.hosts.items()
+            }
+            parse_seconds = self.parse_seconds.summary()
+            extract_seconds = self.extract_seconds.summary()
+            fields = {field: h.summary() for field, h in self.field_seconds.items()}
+            requests = list(self.requests)
+            parses = list(self.parses)
+            counters = dict(self.counters)
+
+        finished_at = time.time()
+        return {
+            "started_at": self.started_at,
+            "finished_at": finished_at,
+            "duration_seconds": finished_at - self.started_at,
+            "hosts": hosts,
+            "parse_seconds": parse_seconds,
+            "extract_seconds": extract_seconds,
+            "field_seconds": fields,
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(counters.items())
+            ],
+            "requests": requests,
+            "pages": parses,
+        }
+
+    def to_prometheus(self, prefix="recipe_scrape"):
+        """Render the run in the Prometheus text exposition format"""
+        report = self.report()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{prefix}_{name}{suffix}{_label_text(labels)} {value}")
+
+        def summary_samples(summary, labels):
+            samples = [
+                ("", {**labels, "quantile": str(q)}, summary[f"p{int(q * 100)}"])
+                for q in QUANTILES
+            ]
+            samples.append(("_sum", labels, summary["sum"]))
+            samples.append(("_count", labels, summary["count"]))
+            return samples
+
+        hosts = report["hosts"]
+        metric("requests_total", "counter", "HTTP requests by host and status", [
+            ("", {"host": h, "status": s}, n)
+            for h, data in hosts.items() for s, n in sorted(data["status"].items())
+        ])
+        metric("response_bytes_total", "counter", "Response body bytes received", [
+            ("", {"host": h}, data["bytes"]) for h, data in hosts.items()
+        ])
+        metric("retries_total", "counter", "Transport retries", [
+            ("", {"host": h}, data["retries"]) for h, data in hosts.items()
+        ])
+        metric("cache_hits_total", "counter", "Requests answered 304 from the local cache", [
+            ("", {"host": h}, data["cache_hits"]) for h, data in hosts.items()
+        ])
+        metric("request_seconds", "summary", "Total request time including body download", [
+            sample for h, data in hosts.items()
+            for sample in summary_samples(data["seconds"], {"host": h})
+        ])
+        metric("first_byte_seconds", "summary", "Time until response headers", [
+            sample for h, data in hosts.items()
+            for sample in summary_samples(data["first_byte_seconds"], {"host": h})
+        ])
+        metric("parse_seconds", "summary", "BeautifulSoup parse time per page",
+               summary_samples(report["parse_seconds"], {}))
+        metric("extract_seconds", "summary", "Field extraction time per page",
+               summary_samples(report["extract_seconds"], {}))
+        metric("extractor_seconds", "summary", "Time per extractor (field) per page", [
+            sample for field, summary in sorted(report["field_seconds"].items())
+            for sample in summary_samples(summary, {"field": field})
+        ])
+
+        counter_names = sorted({c["name"] for c in report["counters"]})
+        for name in counter_names:
+            metric(f"{name}_total", "counter", f"Scrape outcome counter {name}", [
+                ("", c["labels"], c["value"]) for c in report["counters"] if c["name"] == name
+            ])
+
+        metric("last_run_timestamp_seconds", "gauge", "When the run report was written", [
+            ("", {}, round(report["finished_at"], 3))
+        ])
+        metric("last_run_duration_seconds", "gauge", "Duration of the last run", [
+            ("", {}, round(report["duration_seconds"], 3))
+        ])
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        """Write the run report as JSON (atomically)"""
+        write_json_atomic(path, self.report())
+        return Path(path)
+
+    def write_prometheus(self, path):
+        """Write the Prometheus text file (atomically, for node_exporter's textfile collector)"""
+        with atomic_writer(path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        return Path(path)
+
+
+_default_metrics = ScrapeMetrics()
+
+
+def get_metrics():
+    """Get the process-wide metrics recorder shared by all scrapers"""
+    return _default_metrics
@@ -0,0 +1,135 @@
+"""
+scrape_pipeline.py : Two-stage fetch → parse pipeline for bulk scraping
+แยกการดาวน์โหลด (I/O, หลายเธรด) ออกจากการแยกข้อมูล HTML (CPU, หลายโปรเซส) เพื่อใช้ทุกคอร์
+
+BeautifulSoup with html.parser is pure Python, so parsing on the fetch
+threads keeps every page on one core (the GIL). Here pages are downloaded
+by a thread pool and handed to a process pool of parse workers; at most
+``window`` pages are in flight across both stages, so fetching pauses when
+the parsers fall behind instead of piling up HTML in memory.
+"""
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from itertools import islice
+
+# Parse workers per pipeline (0 parses in the calling thread). Interactive
+# callers such as the Streamlit refresh button get a small fixed pool
+DEFAULT_PARSE_WORKERS = min(2, os.cpu_count() or 1)
+# Batch jobs that have the machine to themselves (scrape_runner.py,
+# preload_recipes.py) use one worker per core
+BULK_PARSE_WORKERS = os.cpu_count() or 1
+
+
+def _start_method():
+    # Fetch threads are already running when workers start; forking a
+    # threaded process can copy held locks, so use a fresh interpreter
+    methods = multiprocessing.get_all_start_methods()
+    return "forkserver" if "forkserver" in methods else "spawn"
+
+
+def resolve_parse_workers(parse_workers):
+    """Parse worker count for a setting (None = DEFAULT_PARSE_WORKERS)"""
+    return DEFAULT_PARSE_WORKERS if parse_workers is None else max(0, parse_workers)
+
+
+@contextmanager
+def open_pools(fetch_workers, parse_workers=None):
+    """
+    Thread pool for downloads and process pool for parsing
+
+    Args:
+        fetch_workers (int): Concurrent downloads
+        parse_workers (int): Parse processes (None = DEFAULT_PARSE_WORKERS, 0 = none)
+
+    Yields:
+        tuple: (ThreadPoolExecutor, ProcessPoolExecutor or None)
+    """
+    parse_workers = resolve_parse_workers(parse_workers)
+    fetch_pool = ThreadPoolExecutor(max_workers=max(1, fetch_workers))
+    parse_pool = None
+    if parse_workers > 0:
+        parse_pool = ProcessPoolExecutor(
+            max_workers=parse_workers,
+            mp_context=multiprocessing.get_context(_start_method()),
+        )
+    try:
+        yield fetch_pool, parse_pool
+    finally:
+        fetch_pool.shutdown(wait=True, cancel_futures=True)
+        if parse_pool is not None:
+            parse_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def default_window(fetch_workers, parse_workers):
+    """Pages in flight: every fetch thread busy plus two queued pages per parser"""
+    return max(1, fetch_workers) + 2 * max(1, parse_workers)
+
+
+def _run_task(task):
+    func, *args = task
+    return func(*args)
+
+
+def iter_fetch_parse(fetch_pool, parse_pool, fetch, items, window):
+    """
+    Fetch ``items`` on threads and parse them on processes, yielding as each finishes
+
+    ``fetch(item)`` runs on a fetch thread and returns ``(fetched, task)``.
+    ``task`` is ``(function, *args)`` with a picklable module-level function
+    run on a parse worker, or None when there is nothing to parse (failed
+    download, unchanged page). Parse failures are printed and reported as a
+    None result.
+
+    At most ``window`` items are being fetched, waiting for a parser or
+    being parsed at any time: a finished download only frees its slot once
+    it has been parsed, so slow parsers throttle the downloads. Results are
+    yielded in the calling thread (Streamlit callbacks and SQLite writes
+    only work there).
+
+    Args:
+        fetch_pool (ThreadPoolExecutor): Download threads
+        parse_pool (ProcessPoolExecutor): Parse workers (None = parse in this thread)
+        fetch (callable): item -> (fetched, task or None)
+        items (iterable): Work items, consumed lazily
+        window (int): Maximum items in flight across both stages
+
+    Yields:
+        tuple: (item, fetched, parse result or None)
+    """
+    items = iter(items)
+    fetching = {}
+    parsing = {}
+
+    def refill():
+        for item in islice(items, max(0, window - len(fetching) - len(parsing))):
+            fetching[fetch_pool.submit(fetch, item)] = item
+
+    refill()
+    while fetching or parsing:
+        done, _ = wait([*fetching, *parsing], return_when=FIRST_COMPLETED)
+        for future in done:
+            if future in fetching:
+                item = fetching.pop(future)
+                fetched, task = future.result()
+                if task is None:
+                    yield item, fetched, None
+                elif parse_pool is None:
+                    try:
+                        result = _run_task(task)
+                    except Exception as e:
+                        print(f"❌ Error parsing {item}: {str(e)}")
+                        result = None
+                    yield item, fetched, result
+                else:
+                    parsing[parse_pool.submit(_run_task, task)] = (item, fetched)
+            else:
+                item, fetched = parsing.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"❌ Error parsing {item}: {str(e)}")
+                    result = None
+                yield item, fetched, result
+        refill()
@@ -1,42 +1,50 @@
 #scrape_runner.py : ตัว “รันเก็บข้อมูลจำนวนมาก”
-#หน้าที่ ดึงหลายสูตรจาก Kapook วนลูปหลาย URL บันทึก CSV สร้าง dataset
+#หน้าที่ ไล่เก็บสูตรจาก Kapook ผ่าน crawl frontier (หยุดแล้วรันต่อได้) บันทึก CSV สร้าง dataset
+import sys
+
 import pandas as pd
-from scraper import scrape_kapook
-import time
+from crawl_frontier import SITES, crawl
+from recipe_store import RecipeStore
+from scrape_metrics import get_metrics
+from scrape_pipeline import BULK_PARSE_WORKERS
 
-# 🔥 ใส่ลิงก์สูตรที่ต้องการ
+# 🔥 ลิงก์เริ่มต้น (สูตรหรือหน้ารวมสูตร) เพิ่มได้ตามต้องการ
 URLS = [
     "https://cooking.kapook.com/view273026.html",
+    *SITES["kapook"]["seeds"],
 ]
 
+# จำนวนหน้าที่ดึงต่อการรันหนึ่งครั้ง (รันซ้ำเพื่อเก็บต่อจากเดิม)
+MAX_PAGES = 200
 
-def main():
-    all_rows = []
 
-    for url in URLS:
-        print("กำลังดึง:", url)
-        data = scrape_kapook(url)
+def main(max_pages=MAX_PAGES):
+    store = RecipeStore()
+    crawl("kapook", store=store, seeds=URLS, max_pages=max_pages,
+          parse_workers=BULK_PARSE_WORKERS)
 
-        if not data:
+    all_rows = []
+    for recipe in store.load_recipes():
+        if "kapook.com" not in (recipe.get("url") or ""):
             continue
-
         all_rows.append({
-            "recipe_name": data["name"],
-            "ingredients": "|".join(data["ingredients"]),
-            "steps": "|".join(data["steps"]),
+            "recipe_name": recipe["name"],
+            "ingredients": "|".join(recipe["ingredients"]),
+            "steps": "|".join(recipe.get("steps", [])),
             "type": "",
             "difficulty": "",
             "time": "",
-            "image": data["image"],
+            "image": recipe.get("image", ""),
         })
 
-        time.sleep(1)
-
     df = pd.DataFrame(all_rows)
     df.to_csv("recipes_dataset.csv", index=False, encoding="utf-8-sig")
 
-    print("✅ สร้าง recipes_dataset.csv สำเร็จ")
+    print(f"✅ สร้าง recipes_dataset.csv สำเร็จ ({len(all_rows)} สูตร)")
+
+    get_metrics().write_json("scrape_report.json")
+    get_metrics().write_prometheus("scrape_metrics.prom")
 
 
 if __name__ == "__main__":
-    main()
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else MAX_PAGES)
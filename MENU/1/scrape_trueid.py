@@ -2,19 +2,78 @@
 scrape_trueid.py : Scraper for TrueID Food website (food.trueid.net)
 ตัวดึงข้อมูลสูตรอาหารจากเว็บไซต์ food.trueid.net
 """
-import requests
 from bs4 import BeautifulSoup
 import json
 import re
-import time
+
+from fetcher import get_fetcher
+from ingredient_normalizer import add_structured_fields
+from rate_limiter import HostRateLimiter
+from scrape_metrics import get_metrics
+from scrape_pipeline import default_window, iter_fetch_parse, open_pools, resolve_parse_workers
+from trueid_extractor import INGREDIENT_UNITS, TrueIDExtractor
+
+
+def parse_trueid_page(recipe_url, html, parser="html.parser"):
+    """
+    Parse a downloaded recipe page (module-level so parse workers can run it)
+    
+    Args:
+        recipe_url (str): Full recipe URL
+        html (str): Page HTML
+        parser (str): BeautifulSoup backend
+        
+    Returns:
+        tuple: (recipe dict or None when name/ingredients are missing,
+            (parse seconds, extract seconds, per-field seconds))
+    """
+    # Extract all fields in a single pass over the document
+    extractor = TrueIDExtractor(parser=parser)
+    fields = extractor.extract(html)
+    timings = (extractor.last_parse_seconds, extractor.last_extract_seconds,
+               extractor.last_field_seconds)
+    name = fields["name"]
+    ingredients = fields["ingredients"]
+    steps = fields["steps"]
+    
+    # Only return if we have valid data
+    if name and ingredients:
+        recipe_data = {
+            "name": name,
+            "ingredients": ingredients,
+            "steps": steps if steps else ["วิธีทำสามารถดูได้จากเว็บไซต์"],
+            "url": recipe_url,
+            "difficulty": fields["difficulty"],
+            "time": fields["time"],
+        }
+        if fields.get("image"):
+            recipe_data["image"] = fields["image"]
+        return add_structured_fields(recipe_data), timings
+    print(f"⚠️  Missing data: name={name}, ingredients={len(ingredients)}")
+    return None, timings
 
 
 class TrueIDFoodScraper:
-    def __init__(self):
+    def __init__(self, max_workers=4, requests_per_second=2.0, parser="html.parser",
+                 parse_workers=None):
+        """
+        Args:
+            max_workers (int): Number of recipe pages fetched concurrently
+            requests_per_second (float): Politeness budget per host
+            parser (str): BeautifulSoup backend for recipe pages ("lxml", "auto")
+            parse_workers (int): Parse processes for collections (None = a
+                small fixed pool, 0 = parse on the calling thread)
+        """
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
         }
         self.base_url = "https://food.trueid.net"
+        self.max_workers = max_workers
+        self.parse_workers = parse_workers
+        self.rate_limiter = HostRateLimiter(requests_per_second)
+        self.fetcher = get_fetcher()
+        self.metrics = get_metrics()
+        self.parser = parser
     
     def extract_recipe_links(self, page_url):
         """
@@ -27,9 +86,9 @@ class TrueIDFoodScraper:
             list: List of recipe URLs
         """
         try:
-            response = requests.get(page_url, headers=self.headers, timeout=15)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, "html.parser")
+            self.rate_limiter.wait(page_url)
+            html = self.fetcher.get_text(page_url, headers=self.headers, timeout=15)
+            soup = BeautifulSoup(html, "html.parser")
             
             recipe_links = []
             for link in soup.find_all("a", href=True):
@@ -55,48 +114,116 @@ class TrueIDFoodScraper:
             print(f"❌ Error extracting recipe links: {str(e)}")
             return []
     
-    def scrape_recipe(self, url):
+    def recipe_url_for(self, url):
+        """Turn a recipe URL or recipe ID into a full recipe URL"""
+        if url.startswith("http"):
+            return url
+        return f"{self.base_url}/detail/{url}"
+    
+    def fetch_recipe_html(self, url):
         """
-        Scrape a single recipe from TrueID Food website
+        Download a recipe page (rate limited, through the shared fetcher)
         
         Args:
             url (str): Recipe URL or recipe ID
             
         Returns:
-            dict: Recipe data with name, ingredients, steps
+            tuple: (full recipe URL, page HTML)
         """
-        try:
-            # Ensure full URL
-            if url.startswith("http"):
-                recipe_url = url
-            else:
-                recipe_url = f"{self.base_url}/detail/{url}"
+        recipe_url = self.recipe_url_for(url)
+        print(f"Scraping: {recipe_url[:60]}...")
+        self.rate_limiter.wait(recipe_url)
+        html = self.fetcher.get_text(recipe_url, headers=self.headers, timeout=15)
+        return recipe_url, html
+    
+    def parse_recipe(self, recipe_url, html):
+        """
+        Parse a downloaded recipe page
+        
+        Args:
+            recipe_url (str): Full recipe URL
+            html (str): Page HTML
             
-            print(f"Scraping: {recipe_url[:60]}...")
-            response = requests.get(recipe_url, headers=self.headers, timeout=15)
-            response.raise_for_status()
+        Returns:
+            dict: Recipe data, or None when name/ingredients are missing
+        """
+        return self.parse_result(recipe_url, parse_trueid_page(recipe_url, html, self.parser))
+    
+    def parse_task(self, recipe_url, html):
+        """Task tuple for a parse worker (see scrape_pipeline.iter_fetch_parse)"""
+        return (parse_trueid_page, recipe_url, html, self.parser)
+    
+    def parse_result(self, recipe_url, result):
+        """
+        Record the timings of a parse_trueid_page() result and return its recipe
+        
+        Args:
+            recipe_url (str): Full recipe URL
+            result (tuple): (recipe, timings), or None when parsing failed
             
-            soup = BeautifulSoup(response.text, "html.parser")
+        Returns:
+            dict: Recipe data or None
+        """
+        if result is None:
+            return None
+        recipe, (parse_seconds, extract_seconds, field_seconds) = result
+        self.metrics.record_parse(recipe_url, parse_seconds, extract_seconds, field_seconds)
+        print(
+            f"   ⏱️  parse {parse_seconds * 1000:.1f} ms, "
+            f"extract {extract_seconds * 1000:.1f} ms"
+        )
+        return recipe
+    
+    def fetch_for_parse(self, url):
+        """
+        Download a recipe page on a fetch thread (for iter_fetch_parse)
+        
+        Returns:
+            tuple: (full recipe URL, parse task), or (None, None) on errors
+        """
+        try:
+            recipe_url, html = self.fetch_recipe_html(url)
+        except Exception as e:
+            print(f"❌ Error scraping {url}: {str(e)}")
+            return None, None
+        return recipe_url, self.parse_task(recipe_url, html)
+    
+    def iter_recipes(self, urls, max_workers=None):
+        """
+        Fetch and parse recipe pages, yielding (url, recipe or None) as each finishes
+        
+        Downloads run on ``max_workers`` threads, parsing on the parse
+        worker processes; only a bounded number of pages is held at once.
+        
+        Args:
+            urls (iterable): Recipe URLs or IDs
+            max_workers (int): Concurrent fetches (defaults to self.max_workers)
             
-            # Extract data
-            name = self._get_recipe_name(soup)
-            ingredients = self._get_ingredients(soup)
-            steps = self._get_steps(soup)
+        Yields:
+            tuple: (url as given, recipe data or None)
+        """
+        workers = max(1, max_workers or self.max_workers)
+        parse_workers = resolve_parse_workers(self.parse_workers)
+        with open_pools(workers, parse_workers) as (fetch_pool, parse_pool):
+            for url, recipe_url, result in iter_fetch_parse(
+                fetch_pool, parse_pool, self.fetch_for_parse, urls,
+                default_window(workers, parse_workers)
+            ):
+                yield url, self.parse_result(recipe_url, result)
+    
+    def scrape_recipe(self, url):
+        """
+        Scrape a single recipe from TrueID Food website
+        
+        Args:
+            url (str): Recipe URL or recipe ID
             
-            # Only return if we have valid data
-            if name and ingredients:
-                recipe_data = {
-                    "name": name,
-                    "ingredients": ingredients,
-                    "steps": steps if steps else ["วิธีทำสามารถดูได้จากเว็บไซต์"],
-                    "url": recipe_url,
-                    "difficulty": self._get_difficulty(soup),
-                    "time": self._get_time(soup),
-                }
-                return recipe_data
-            else:
-                print(f"⚠️  Missing data: name={name}, ingredients={len(ingredients)}")
-                return None
+        Returns:
+            dict: Recipe data with name, ingredients, steps
+        """
+        try:
+            recipe_url, html = self.fetch_recipe_html(url)
+            return self.parse_recipe(recipe_url, html)
                 
         except Exception as e:
             print(f"❌ Error scraping {url}: {str(e)}")
@@ -120,19 +247,11 @@ class TrueIDFoodScraper:
         try:
             ingredients = []
             
-            # Common ingredient amount units (Thai cooking units)
-            units = [
-                "กรัม", "กก.", "ช้อน", "ช้อนโต๊ะ", "ช้อนชา",
-                "ถ้วย", "ฟอง", "ชต.", "ชช.", "มล.", "ลิตร",
-                "ซม.", "เซ็นติเมตร", "ขีด", "ชิ้น", "อย่าง", "ลูก",
-                "หลอด", "แท่ง", "ห่อ", "กำ", "มัด", "ก้อน", "ซอย", "/",
-            ]
-            
             # Find all list items
             for li in soup.find_all("li"):
                 text = li.get_text(strip=True)
                 # Check if contains unit and reasonable length
-                if any(unit in text for unit in units) and 5 < len(text) < 300:
+                if any(unit in text for unit in INGREDIENT_UNITS) and 5 < len(text) < 300:
                     if text not in ingredients and text.count(" ") < 20:
                         ingredients.append(text)
             
@@ -196,31 +315,79 @@ class TrueIDFoodScraper:
         except:
             return "ไม่ระบุ"
     
-    def scrape_collection(self, collection_url, max_recipes=20):
+    def scrape_collection(self, collection_url, max_recipes=20, max_workers=None):
         """
         Scrape all recipes from a collection page
         
+        Recipe pages are fetched by a thread pool and parsed by the parse
+        worker processes. Each request waits on the per-host rate limiter,
+        so the request rate stays within the same politeness budget as
+        scraping one page at a time.
+        
         Args:
             collection_url (str): URL of collection/article page
             max_recipes (int): Maximum number of recipes to scrape
+            max_workers (int): Concurrent fetches (defaults to self.max_workers)
             
         Returns:
-            list: List of recipe data dictionaries
+            list: List of recipe data dictionaries, in link order
         """
         print(f"\n📖 Extracting recipes from collection...")
-        recipe_links = self.extract_recipe_links(collection_url)
+        recipe_links = self.extract_recipe_links(collection_url)[:max_recipes]
+        total = len(recipe_links)
         
-        recipes = []
-        for idx, link in enumerate(recipe_links[:max_recipes], 1):
-            print(f"\n[{idx}/{min(len(recipe_links), max_recipes)}]", end=" ")
-            recipe = self.scrape_recipe(link)
-            if recipe:
-                recipes.append(recipe)
-            time.sleep(0.5)  # Be respectful with requests
+        # Results arrive in completion order; put them back in link order
+        position = {link: idx for idx, link in enumerate(recipe_links)}
+        by_position = {}
+        for link, recipe in self.iter_recipes(recipe_links, max_workers):
+            by_position[position[link]] = recipe
+            print(f"\n[{len(by_position)}/{total}]", end=" ")
+        
+        recipes = [by_position[idx] for idx in range(total) if by_position.get(idx)]
+        self.metrics.count("recipes", len(recipes), collection=collection_url, result="success")
+        self.metrics.count("recipes", total - len(recipes), collection=collection_url,
+                           result="failure")
         
         print(f"\n\n✅ Scraped {len(recipes)} recipes successfully")
         return recipes
 
+    
+    def iter_collection(self, collection_url, max_recipes=20, max_workers=None, skip_urls=()):
+        """
+        Yield recipes from a collection as soon as each one is parsed
+        
+        Unlike scrape_collection, recipes arrive in completion order. Only a
+        small window of pages is in flight (downloading or waiting for a
+        parse worker), so memory stays flat for very large collections.
+        
+        Args:
+            collection_url (str): URL of collection/article page
+            max_recipes (int): Maximum number of recipes to scrape
+            max_workers (int): Concurrent fetches (defaults to self.max_workers)
+            skip_urls (iterable): Recipe URLs already scraped (e.g. checkpointed)
+            
+        Yields:
+            dict: Recipe data
+        """
+        skip = set(skip_urls)
+        links = [
+            link for link in map(self.recipe_url_for,
+                                 self.extract_recipe_links(collection_url)[:max_recipes])
+            if link not in skip
+        ]
+        scraped = failed = 0
+        
+        for _, recipe in self.iter_recipes(links, max_workers):
+            self.metrics.count("recipes", 1, collection=collection_url,
+                               result="success" if recipe else "failure")
+            if recipe:
+                scraped += 1
+                yield recipe
+            else:
+                failed += 1
+        
+        print(f"\n✅ Streamed {scraped} recipes ({failed} failed, {len(skip)} skipped)")
+
 
 def scrape_trueid_recipe(url):
     """
@@ -236,18 +403,19 @@ def scrape_trueid_recipe(url):
     return scraper.scrape_recipe(url)
 
 
-def scrape_trueid_collection(url, max_recipes=20):
+def scrape_trueid_collection(url, max_recipes=20, max_workers=4):
     """
     Scrape all recipes from a TrueID collection page
     
     Args:
         url (str): Collection URL
         max_recipes (int): Max recipes to scrape
+        max_workers (int): Concurrent recipe fetches
         
     Returns:
         list: List of recipes
     """
-    scraper = TrueIDFoodScraper()
+    scraper = TrueIDFoodScraper(max_workers=max_workers)
     return scraper.scrape_collection(url, max_recipes)
 
 
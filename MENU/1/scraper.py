@@ -1,7 +1,11 @@
 #scraper.py : ตัวดึงข้อมูล (core function) หน้าที่ดึง 1 สูตร เป็นฟังก์ชัน reusable
-import requests
+import time
+
 from bs4 import BeautifulSoup
 
+from fetcher import get_fetcher
+from scrape_metrics import get_metrics
+
 
 def scrape_kapook(url):
     headers = {
@@ -9,16 +13,18 @@ def scrape_kapook(url):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
+        html = get_fetcher().get_text(url, headers=headers, timeout=10)
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        start = time.perf_counter()
+        soup = BeautifulSoup(html, "html.parser")
+        parsed = time.perf_counter()
 
         # -------------------
         #  ชื่อสูตร
         # -------------------
         title = soup.find("h1")
         recipe_name = title.get_text(strip=True) if title else "ไม่พบชื่อสูตร"
+        named = time.perf_counter()
 
         # -------------------
         #  วัตถุดิบ
@@ -39,8 +45,19 @@ def scrape_kapook(url):
 
         # ลบซ้ำแต่รักษาลำดับ
         ingredients = list(dict.fromkeys(ingredients))
+        done = time.perf_counter()
+
+        # เวลา parse/extract เหมือนตัวดึง TrueID
+        get_metrics().record_parse(url, parsed - start, done - parsed, {
+            "name": named - parsed,
+            "ingredients": done - named,
+        })
 
         return {
             "name": recipe_name,
             "ingredients": ingredients
         }
+
+    except Exception as e:
+        print(f"❌ scrape error {url}:", e)
+        return None
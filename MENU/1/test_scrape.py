@@ -1,16 +1,40 @@
 #test_scrape.py : ตัวทดสอบสูตรเดียว
-#หน้าที่ debug scraper เช็กว่า selector ยังใช้ได้ไหม
+#หน้าที่ debug scraper เช็กว่า selector ยังใช้ได้ไหม (รันตรง ๆ = ดึงหน้าจริง, pytest = ทดสอบแบบออฟไลน์)
+from scrape_kapook import parse_kapook, parse_kapook_page
 from scraper import scrape_kapook
 
 url = "https://cooking.kapook.com/view273026.html"
 
-data = scrape_kapook(url)
+# หน้าสูตรย่อ ๆ ตามโครงสร้างของ Kapook (ไม่ต้องใช้เครือข่าย)
+SAMPLE_HTML = """<html><head><meta property="og:image" content="https://img.kapook.com/a.jpg"></head>
+<body><h1>ต้มยำกุ้ง</h1>
+<ul><li>กุ้ง 300 กรัม</li><li>น้ำปลา 2 ช้อนโต๊ะ</li><li>เมนู</li></ul>
+<p>1. ต้มน้ำให้เดือด</p><p>ขั้นตอนที่ 2 ใส่กุ้ง</p></body></html>"""
 
-if data:
-    print("ชื่อสูตร:", data["name"])
-    print("วัตถุดิบ:")
 
-    for ing in data["ingredients"]:
-        print("-", ing)
-else:
-    print("❌ ดึงข้อมูลไม่สำเร็จ")
+def test_parse_kapook():
+    data = parse_kapook(SAMPLE_HTML)
+    assert data["recipe_name"] == "ต้มยำกุ้ง"
+    assert data["ingredients"] == ["กุ้ง 300 กรัม", "น้ำปลา 2 ช้อนโต๊ะ"]
+    assert data["steps"] == ["1. ต้มน้ำให้เดือด", "ขั้นตอนที่ 2 ใส่กุ้ง"]
+    assert data["image"] == "https://img.kapook.com/a.jpg"
+
+
+def test_parse_kapook_page_times_every_field():
+    data, (parse_seconds, extract_seconds, field_seconds) = parse_kapook_page(SAMPLE_HTML)
+    assert data == parse_kapook(SAMPLE_HTML)
+    assert parse_seconds >= 0 and extract_seconds >= 0
+    assert set(field_seconds) == {"name", "ingredients", "steps", "image"}
+
+
+if __name__ == "__main__":
+    data = scrape_kapook(url)
+
+    if data:
+        print("ชื่อสูตร:", data["name"])
+        print("วัตถุดิบ:")
+
+        for ing in data["ingredients"]:
+            print("-", ing)
+    else:
+        print("❌ ดึงข้อมูลไม่สำเร็จ")
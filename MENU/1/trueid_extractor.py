@@ -0,0 +1,206 @@
+"""
+trueid_extractor.py : Single-pass extraction engine for TrueID recipe pages
+ตัวแยกข้อมูลสูตรอาหารจากหน้า TrueID แบบเดินเอกสารรอบเดียว
+"""
+import re
+import time
+
+from bs4 import BeautifulSoup, CData, NavigableString, SoupStrainer, Tag
+
+# Common ingredient amount units (Thai cooking units)
+INGREDIENT_UNITS = [
+    "กรัม", "กก.", "ช้อน", "ช้อนโต๊ะ", "ช้อนชา",
+    "ถ้วย", "ฟอง", "ชต.", "ชช.", "มล.", "ลิตร",
+    "ซม.", "เซ็นติเมตร", "ขีด", "ชิ้น", "อย่าง", "ลูก",
+    "หลอด", "แท่ง", "ห่อ", "กำ", "มัด", "ก้อน", "ซอย", "/",
+]
+
+STEP_PATTERN = re.compile(r'^[\d]+\.\s+')
+STEP_PREFIX_PATTERN = re.compile(r'\d*\.?')
+TIME_PATTERN = re.compile(r'(\d+)\s*นาที|(\d+)\s*min')
+
+# Strings that Tag.get_text() includes (comments, scripts and styles are skipped)
+TEXT_TYPES = (NavigableString, CData)
+STEP_TAGS = {"p", "li", "div"}
+RELEVANT_TAGS = ["h1", "li", "p", "div"]
+
+
+def _has_lxml():
+    try:
+        import lxml  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class TrueIDExtractor:
+    """
+    Extract name, ingredients, steps, difficulty, time and image in one traversal
+
+    The document is walked once in order. Every text string is recorded
+    once, and each tag remembers the range of strings it contains, so
+    ``get_text`` results are built from slices instead of re-walking the
+    subtree of every ``p``/``li``/``div``.
+    """
+
+    def __init__(self, parser="html.parser", use_strainer=False):
+        """
+        Args:
+            parser (str): BeautifulSoup backend, "html.parser", "lxml" or
+                "auto" (lxml when installed)
+            use_strainer (bool): Only build h1/li/p/div subtrees. Faster, but
+                difficulty and time then only see text inside those tags.
+        """
+        if parser == "auto":
+            parser = "lxml" if _has_lxml() else "html.parser"
+        self.parser = parser
+        self.use_strainer = use_strainer
+        self.last_parse_seconds = 0.0
+        self.last_extract_seconds = 0.0
+        self.last_field_seconds = {}  # "walk", "name", "ingredients", ...
+
+    def parse(self, html):
+        """Parse HTML with the configured backend"""
+        strainer = SoupStrainer(RELEVANT_TAGS) if self.use_strainer else None
+        return BeautifulSoup(html, self.parser, parse_only=strainer)
+
+    def extract(self, html):
+        """
+        Parse a page and extract all recipe fields
+
+        Args:
+            html (str): Recipe page HTML
+
+        Returns:
+            dict: name, ingredients, steps, difficulty, time
+        """
+        start = time.perf_counter()
+        soup = self.parse(html)
+        parsed = time.perf_counter()
+        fields = self.extract_from_soup(soup)
+        done = time.perf_counter()
+
+        self.last_parse_seconds = parsed - start
+        self.last_extract_seconds = done - parsed
+        return fields
+
+    def extract_from_soup(self, soup):
+        """Extract all recipe fields from an already parsed document"""
+        start = time.perf_counter()
+        raw = []        # every text string, in document order
+        stripped = []   # the same strings after strip()
+        spans = []      # (open order, tag, first string index, end string index)
+        open_tags = []  # (open order, tag, first string index) of unclosed ancestors
+
+        for order, element in enumerate(soup.descendants):
+            while open_tags and open_tags[-1][1] is not element.parent:
+                spans.append(open_tags.pop() + (len(raw),))
+
+            if isinstance(element, Tag):
+                open_tags.append((order, element, len(raw)))
+            elif type(element) in TEXT_TYPES:
+                raw.append(str(element))
+                stripped.append(raw[-1].strip())
+
+        while open_tags:
+            spans.append(open_tags.pop() + (len(raw),))
+
+        # Spans close bottom-up; restore document order and keep only
+        # the tags the extractors look at
+        spans.sort(key=lambda s: s[0])
+        spans = [
+            (tag, first, end) for _, tag, first, end in spans
+            if tag.name in STEP_TAGS or tag.name == "h1"
+        ]
+
+        page_text = "".join(raw)
+        timings = {"walk": time.perf_counter() - start}
+        fields = {}
+        for field, extract in (
+            ("name", lambda: self._name(spans, stripped)),
+            ("ingredients", lambda: self._ingredients(spans, stripped)),
+            ("steps", lambda: self._steps(spans, stripped)),
+            ("difficulty", lambda: self._difficulty(page_text)),
+            ("time", lambda: self._time(page_text)),
+            ("image", lambda: self._image(soup)),
+        ):
+            field_start = time.perf_counter()
+            fields[field] = extract()
+            timings[field] = time.perf_counter() - field_start
+        self.last_field_seconds = timings
+        return fields
+
+    @staticmethod
+    def _image(soup):
+        # og:image is the recipe's cover photo (meta tags are dropped by the strainer)
+        meta = soup.find("meta", property="og:image")
+        if meta is None:
+            return None
+        return meta.get("content") or None
+
+    @staticmethod
+    def _text(stripped, first, end):
+        return "".join(stripped[first:end])
+
+    def _name(self, spans, stripped):
+        for tag, first, end in spans:
+            if tag.name == "h1":
+                name = self._text(stripped, first, end)
+                return name if name and len(name) > 2 else None
+        return None
+
+    def _ingredients(self, spans, stripped):
+        ingredients = []
+        seen = set()
+        for tag, first, end in spans:
+            if tag.name != "li":
+                continue
+            text = self._text(stripped, first, end)
+            if any(unit in text for unit in INGREDIENT_UNITS) and 5 < len(text) < 300:
+                if text not in seen and text.count(" ") < 20:
+                    seen.add(text)
+                    ingredients.append(text)
+        return ingredients
+
+    def _steps(self, spans, stripped):
+        steps = []
+        seen = set()
+        for tag, first, end in spans:
+            if tag.name not in STEP_TAGS:
+                continue
+
+            # Decide the "1. " prefix from the leading strings only, so
+            # non-step containers never build their full text
+            prefix = ""
+            for i in range(first, end):
+                prefix += stripped[i]
+                if STEP_PATTERN.match(prefix) or not STEP_PREFIX_PATTERN.fullmatch(prefix):
+                    break
+            if not STEP_PATTERN.match(prefix):
+                continue
+
+            text = self._text(stripped, first, end)
+            if len(text) > 10 and text not in seen:
+                seen.add(text)
+                steps.append(text)
+
+        return [s for s in steps if len(s) > 10][:20]
+
+    @staticmethod
+    def _difficulty(page_text):
+        page_text = page_text.lower()
+        if "ง่าย" in page_text or "easy" in page_text:
+            return "ง่าย"
+        elif "กลาง" in page_text or "medium" in page_text:
+            return "กลาง"
+        elif "ยาก" in page_text or "hard" in page_text:
+            return "ยาก"
+        return "ไม่ระบุ"
+
+    @staticmethod
+    def _time(page_text):
+        match = TIME_PATTERN.search(page_text)
+        if match:
+            time_val = match.group(1) or match.group(2)
+            return f"{time_val} นาที"
+        return "ไม่ระบุ"
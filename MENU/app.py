@@ -14,6 +14,14 @@ import sys
 sys.path.insert(0, str(Path(__file__).parent / "1"))
 
 from scrape_trueid import TrueIDFoodScraper
+from recipe_cache import incremental_refresh
+from image_store import ImageStore
+from pantry_matrix import PantryMatrix
+from query_cache import QueryCache, query_key
+from ranking import RANKING_MODES, RankingEngine
+from recipe_index import ingredient_key, popcount
+from recipe_snapshot import RecipeSnapshot, SnapshotRecipeIndex, open_snapshot
+from recipe_store import RecipeStore
 
 # Page configuration
 st.set_page_config(
@@ -28,118 +36,191 @@ st.set_page_config(
 # ==========================================
 
 RECIPES_CACHE_FILE = Path("recipes_cache.json")
+REFRESH_TTL_SECONDS = 24 * 60 * 60
+CARD_IMAGE_WIDTH = 480
+# st.image passes JPEGs that fit through unchanged but re-encodes WebP
+STREAMLIT_IMAGE_FORMATS = ("jpeg",)
 
 
-def load_or_scrape_recipes(collection_url, max_recipes=50):
+@st.cache_resource
+def get_recipe_store():
+    """Open the SQLite recipe store once per process"""
+    return RecipeStore()
+
+
+@st.cache_resource
+def get_image_store():
+    """Open the image store index once per process"""
+    return ImageStore()
+
+
+# One store version is cached at a time; the replaced snapshot is unmapped
+@st.cache_resource(max_entries=1, on_release=RecipeSnapshot.close)
+def get_recipe_snapshot(_store, version):
     """
-    Load recipes from cache or scrape from TrueID Food
+    Open the compiled recipe snapshot once per store version
+    
+    The snapshot is memory-mapped read-only, so every session and every
+    process (other Streamlit servers, API workers) shares one copy of it.
+    It is compiled first if it is missing or older than the store, into a
+    new versioned file, so the file mapped by older sessions is never
+    overwritten.
     
     Args:
-        collection_url (str): TrueID collection/article URL
-        max_recipes (int): Maximum number of recipes to scrape
+        _store (RecipeStore): Recipe store (not hashed by Streamlit)
+        version (int): Store version used as the cache key
         
     Returns:
-        list: List of recipe dictionaries
+        RecipeSnapshot: Snapshot whose recipes are decoded on access
     """
-    # Try to load from cache first
-    if RECIPES_CACHE_FILE.exists():
-        try:
-            with open(RECIPES_CACHE_FILE, 'r', encoding='utf-8') as f:
-                recipes = json.load(f)
-                if recipes:
-                    st.success(f"✅ Loaded {len(recipes)} recipes from cache")
-                    return recipes
-        except:
-            pass
-    
-    # If no cache, scrape from TrueID
-    st.info("📡 Scraping recipes from TrueID Food website...")
-    scraper = TrueIDFoodScraper()
-    recipes = scraper.scrape_collection(collection_url, max_recipes)
-    
-    # Save to cache
-    if recipes:
-        with open(RECIPES_CACHE_FILE, 'w', encoding='utf-8') as f:
-            json.dump(recipes, f, ensure_ascii=False, indent=2)
-        st.success(f"✅ Scraped and cached {len(recipes)} recipes!")
-    
-    return recipes
-
+    return open_snapshot(_store)
 
-@st.cache_data
-def get_all_ingredients(recipes):
-    """Extract and sort all unique ingredients from recipes"""
-    all_ingredients = set()
-    for recipe in recipes:
-        for ing in recipe.get("ingredients", []):
-            # Extract just the ingredient name (without amount)
-            # e.g., "กระเทียม 1 ช้อนโต๊ะ" -> "กระเทียม"
-            parts = ing.split()
-            if parts:
-                all_ingredients.add(parts[0])
-    return sorted(list(all_ingredients))
 
-
-def matches_criteria(recipe, selected_ingredients, search_query):
+def show_scrape_progress(store, max_recipes, batch_size=5):
     """
-    Check if a recipe matches the selected ingredients and search query
+    Build an on_recipe callback that lists recipes while a scrape runs
+    
+    Recipes are also written to the store in small batches, so they are
+    kept even if the session ends before the scrape finishes.
     
     Args:
-        recipe (dict): Recipe data
-        selected_ingredients (set): Selected ingredient names
-        search_query (str): Search query string
+        store (RecipeStore): Store receiving partial results
+        max_recipes (int): Expected number of recipes (for the progress bar)
+        batch_size (int): Recipes per store write
         
     Returns:
-        bool: True if recipe matches criteria
+        callable: Callback taking one recipe dictionary
     """
-    # Check search query
-    if search_query:
-        query_lower = search_query.lower()
-        recipe_name = recipe.get("name", "").lower()
-        ingredients_text = " ".join(recipe.get("ingredients", [])).lower()
-        
-        if query_lower not in recipe_name and query_lower not in ingredients_text:
-            return False
+    progress = st.progress(0.0, text="Waiting for the first recipe...")
+    latest = st.empty()
+    received = []
     
-    # Check ingredients
-    if selected_ingredients:
-        recipe_ingredients_text = " ".join(recipe.get("ingredients", [])).lower()
-        
-        # Check if any selected ingredient is in the recipe
-        has_match = False
-        for ing in selected_ingredients:
-            if ing.lower() in recipe_ingredients_text:
-                has_match = True
-                break
-        
-        return has_match
+    def on_recipe(recipe):
+        received.append(recipe)
+        progress.progress(
+            min(1.0, len(received) / max(1, max_recipes)),
+            text=f"🍳 {len(received)} recipes so far"
+        )
+        latest.markdown("\n".join(f"- {r['name']}" for r in received[-5:]))
+        if len(received) % batch_size == 0:
+            store.upsert_recipes(received[-batch_size:])
     
-    # If no filters, show all
-    return True
+    return on_recipe
 
 
-def calculate_match_score(recipe, selected_ingredients):
+def load_or_scrape_recipes(collection_url, max_recipes=50):
     """
-    Calculate how well a recipe matches the selected ingredients
+    Load recipes from the recipe store or scrape from TrueID Food
     
     Args:
-        recipe (dict): Recipe data
-        selected_ingredients (set): Selected ingredient names
+        collection_url (str): TrueID collection/article URL
+        max_recipes (int): Maximum number of recipes to scrape
         
     Returns:
-        float: Match score between 0 and 1
+        tuple: (RecipeSnapshot, store version)
     """
-    if not selected_ingredients:
-        return 0
+    store = get_recipe_store()
+    
+    # Seed an empty store from the JSON cache (one-time import)
+    if store.count() == 0 and RECIPES_CACHE_FILE.exists():
+        store.import_json(RECIPES_CACHE_FILE)
+    
+    if store.count() > 0:
+        version = store.version()
+        snapshot = get_recipe_snapshot(store, version)
+        st.success(f"✅ Loaded {len(snapshot)} recipes from the recipe store")
+        return snapshot, version
+    
+    # If the store is empty, scrape from TrueID, showing recipes as they arrive
+    st.info("📡 Scraping recipes from TrueID Food website...")
+    scraper = TrueIDFoodScraper()
+    scraped, _ = incremental_refresh(
+        scraper, collection_url, RECIPES_CACHE_FILE, max_recipes,
+        on_recipe=show_scrape_progress(store, max_recipes)
+    )
+    store.upsert_recipes(scraped)
     
-    recipe_ingredients_text = " ".join(recipe.get("ingredients", [])).lower()
-    matches = 0
+    version = store.version()
+    snapshot = get_recipe_snapshot(store, version)
+    if len(snapshot):
+        st.success(f"✅ Scraped and cached {len(snapshot)} recipes!")
     
-    for ing in selected_ingredients:
-        if ing.lower() in recipe_ingredients_text:
-            matches += 1
+    return snapshot, version
+
+
+def refresh_recipes(collection_url, max_recipes, full=False):
+    """
+    Refresh the cache, fetching only new links and entries older than the TTL
     
-    return matches / len(selected_ingredients)
+    Args:
+        collection_url (str): TrueID collection/article URL
+        max_recipes (int): Maximum number of recipes to scrape
+        full (bool): Refetch every link regardless of age
+        
+    Returns:
+        dict: Refresh statistics from incremental_refresh
+    """
+    scraper = TrueIDFoodScraper()
+    ttl = 0 if full else REFRESH_TTL_SECONDS
+    recipes, stats = incremental_refresh(
+        scraper, collection_url, RECIPES_CACHE_FILE, max_recipes, ttl_seconds=ttl,
+        on_recipe=show_scrape_progress(get_recipe_store(), max_recipes)
+    )
+    if stats["new"] or stats["updated"]:
+        get_recipe_store().upsert_recipes(recipes)
+    return stats
+
+
+@st.cache_resource(max_entries=1)
+def get_recipe_index(_snapshot, version):
+    """
+    Wrap the snapshot's precompiled ingredient index once per corpus version
+
+    Args:
+        _snapshot (RecipeSnapshot): Open snapshot (not hashed by Streamlit)
+        version (int): Store version used as the cache key
+
+    Returns:
+        RecipeIndex: Index shared by all reruns and sessions
+    """
+    return SnapshotRecipeIndex(_snapshot)
+
+
+@st.cache_resource(max_entries=1)
+def get_ranking_engine(_recipe_index, version):
+    """Precompute ingredient weights once per corpus version"""
+    return RankingEngine(_recipe_index)
+
+
+@st.cache_resource(max_entries=1)
+def get_pantry_matrix(_recipe_index, version):
+    """Pack the recipe x ingredient incidence matrix once per corpus version"""
+    return PantryMatrix(_recipe_index)
+
+
+@st.cache_resource
+def get_query_cache():
+    """
+    Query result cache shared by all sessions of this process
+
+    Entries belong to one corpus version and are dropped on the first
+    lookup after the recipes change.
+    """
+    return QueryCache()
+
+
+def add_ingredient(term):
+    """Add a suggested ingredient to the multiselect (button callback)"""
+    selected = list(st.session_state.get("selected_ingredients", []))
+    if term not in selected:
+        selected.append(term)
+    st.session_state.selected_ingredients = selected
+    st.session_state.ingredient_lookup = ""
+
+
+def use_search_suggestion(term):
+    """Replace the search box text with a suggestion (button callback)"""
+    st.session_state.search_query = term
 
 
 # ==========================================
@@ -154,12 +235,13 @@ st.markdown("**'What's in My Kitchen?' - Find recipes based on ingredients you h
 with st.sidebar:
     st.header("⚙️ Settings")
     
-    # Option to reload recipes
-    if st.button("🔄 Reload Recipes from TrueID", use_container_width=True):
-        if RECIPES_CACHE_FILE.exists():
-            RECIPES_CACHE_FILE.unlink()
-        st.cache_data.clear()
-        st.rerun()
+    # Option to reload recipes (handled below once the URL is known)
+    reload_clicked = st.button("🔄 Reload Recipes from TrueID", width="stretch")
+    full_reload = st.checkbox(
+        "Full reload (ignore recently fetched recipes)",
+        value=False,
+        help="By default only new recipes and ones older than 24 hours are fetched"
+    )
     
     st.divider()
     
@@ -177,12 +259,25 @@ with st.sidebar:
         value=20,
         step=5
     )
+    
+    page_size = st.select_slider(
+        "Recipes per page",
+        options=[6, 10, 20, 50],
+        value=10
+    )
+    
+    if reload_clicked:
+        with st.spinner("Refreshing recipes..."):
+            refresh_recipes(collection_url, max_recipes, full=full_reload)
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        st.rerun()
 
 # Load recipes
 try:
-    recipes = load_or_scrape_recipes(collection_url, max_recipes)
+    snapshot, store_version = load_or_scrape_recipes(collection_url, max_recipes)
     
-    if not recipes:
+    if not len(snapshot):
         st.error("❌ Failed to load recipes. Please check the URL and try again.")
         st.stop()
     
@@ -190,6 +285,14 @@ except Exception as e:
     st.error(f"❌ Error: {str(e)}")
     st.stop()
 
+recipe_index = get_recipe_index(snapshot, store_version)
+ranking_engine = get_ranking_engine(recipe_index, store_version)
+pantry_matrix = get_pantry_matrix(recipe_index, store_version)
+query_cache = get_query_cache()
+image_store = get_image_store()
+# Pick up images imported or fetched since the last run
+image_store.refresh()
+
 # Main content area
 col1, col2 = st.columns([1, 3])
 
@@ -200,7 +303,8 @@ with col1:
     search_query = st.text_input(
         "Search by recipe name or ingredient:",
         placeholder="e.g., ไก่, ไข่, ผัด",
-        label_visibility="collapsed"
+        label_visibility="collapsed",
+        key="search_query"
     )
     
     st.divider()
@@ -208,88 +312,217 @@ with col1:
     # Ingredient selection
     st.markdown("### 🥕 Select Ingredients You Have:")
     
-    all_ingredients = get_all_ingredients(recipes)
+    # Facets: each option shows how many recipes the results would have with
+    # it selected (bitset counts); ingredients of no matching recipe are hidden.
+    # Options and labels change on every pick, so the selection only survives
+    # because a keyed multiselect is identified by its key alone (Streamlit
+    # 1.65+, see requirements.txt); older releases reset it on each rerun
+    search_bits = query_cache.search_bits(recipe_index, search_query) if search_query else None
+    current_selection = st.session_state.get("selected_ingredients", [])
+    facet_counts = query_cache.facet_counts(
+        recipe_index, current_selection, search_query, search_bits
+    )
+    ingredient_options = [
+        term for term in recipe_index.vocabulary
+        if term in facet_counts or term in current_selection
+    ]
     
     selected_ingredients = st.multiselect(
         "Choose ingredients:",
-        options=all_ingredients,
-        label_visibility="collapsed"
+        options=ingredient_options,
+        format_func=lambda term: (
+            term if term in current_selection or term not in facet_counts
+            else f"{term} ({facet_counts[term]})"
+        ),
+        label_visibility="collapsed",
+        key="selected_ingredients"
+    )
+    hidden_ingredients = len(recipe_index.vocabulary) - len(ingredient_options)
+    if hidden_ingredients:
+        st.caption(f"{hidden_ingredients} ingredients with no matching recipes are hidden")
+    
+    ranking_mode = st.selectbox(
+        "Rank by:",
+        options=list(RANKING_MODES),
+        format_func=RANKING_MODES.get,
+        disabled=not selected_ingredients
+    )
+    
+    # Pantry mode: only recipes that can be cooked with what I have
+    pantry_mode = st.checkbox(
+        "🧺 Only recipes I can (almost) cook",
+        disabled=not selected_ingredients
     )
+    max_missing = st.slider(
+        "Missing at most:",
+        min_value=0,
+        max_value=5,
+        value=2,
+        disabled=not (pantry_mode and selected_ingredients)
+    )
+    
+    # Typo-tolerant lookup: the multiselect only matches exact substrings
+    ingredient_lookup = st.text_input(
+        "Can't find an ingredient? Type it here:",
+        placeholder="e.g., กระเที่ยม",
+        key="ingredient_lookup"
+    )
+    if ingredient_lookup:
+        suggestions = recipe_index.suggest_ingredients(ingredient_lookup)
+        if suggestions:
+            st.caption("Did you mean:")
+            for term in suggestions:
+                st.button(
+                    f"➕ {term}",
+                    key=f"add_ingredient_{term}",
+                    on_click=add_ingredient,
+                    args=(term,),
+                    disabled=term in selected_ingredients
+                )
+        else:
+            st.caption("No similar ingredients found")
 
 with col2:
-    # Results section
-    filtered_recipes = [
-        r for r in recipes
-        if matches_criteria(r, set(selected_ingredients), search_query)
-    ]
+    pantry_mode = pantry_mode and bool(selected_ingredients)
+    missing_counts = {}
     
-    # Sort by match score
-    if selected_ingredients:
-        filtered_recipes.sort(
-            key=lambda r: calculate_match_score(r, set(selected_ingredients)),
-            reverse=True
+    if pantry_mode:
+        # Vectorized over the packed incidence matrix: search narrows the
+        # candidates, then recipes missing more than N ingredients drop out
+        cookable = query_cache.get_or_compute(
+            recipe_index.version,
+            ("pantry",) + query_key(selected_ingredients, search_query) + (max_missing,),
+            lambda: pantry_matrix.cookable(selected_ingredients, max_missing, search_bits)
+        )
+        total_results = len(cookable)
+    else:
+        # Results section - free-text search uses the index's trigram postings,
+        # ingredient filtering is a bitset lookup on the index (both cached
+        # across sessions, since popular queries repeat)
+        matched_bits = query_cache.filter_bits(
+            recipe_index, selected_ingredients, search_query, search_bits
         )
+        total_results = popcount(matched_bits)
+    st.subheader(f"📋 Results ({total_results} recipes)")
     
-    st.subheader(f"📋 Results ({len(filtered_recipes)} recipes)")
+    # Reset to the first page whenever the filters change
+    results_key = (
+        tuple(sorted(selected_ingredients)), search_query, ranking_mode,
+        pantry_mode, max_missing, page_size
+    )
+    if st.session_state.get("results_key") != results_key:
+        st.session_state.results_key = results_key
+        st.session_state.results_page = 0
+    
+    page_count = max(1, -(-total_results // page_size))
+    page = min(st.session_state.get("results_page", 0), page_count - 1)
+    
+    if pantry_mode:
+        page_slice = cookable[page * page_size:(page + 1) * page_size]
+        page_results = [(rid, coverage) for rid, coverage, _ in page_slice]
+        missing_counts = {rid: missing for rid, _, missing in page_slice}
+    else:
+        # Each candidate is scored once; only the recipes up to this page are
+        # selected from the heap, and their scores are reused by the cards
+        ranked = query_cache.top_k(
+            ranking_engine, selected_ingredients, search_query, ranking_mode,
+            (page + 1) * page_size, matched_bits
+        )
+        page_results = ranked[page * page_size:]
+    page_ids = [rid for rid, _ in page_results]
     
-    if not filtered_recipes:
+    if not page_ids:
         st.info("❌ No recipes found matching your criteria. Try different ingredients!")
+        
+        # "Did you mean" for misspelled searches (e.g. tone marks)
+        if search_query:
+            suggestions = recipe_index.suggest_searches(search_query)
+            if suggestions:
+                st.markdown("**🔤 Did you mean:**")
+                suggestion_cols = st.columns(len(suggestions))
+                for col, term in zip(suggestion_cols, suggestions):
+                    with col:
+                        st.button(
+                            term,
+                            key=f"suggest_search_{term}",
+                            on_click=use_search_suggestion,
+                            args=(term,),
+                            width="stretch"
+                        )
     else:
-        # Display recipes in grid
+        # Display compact cards; full ingredients and steps live on the detail page
         cols = st.columns(2)
         
-        for idx, recipe in enumerate(filtered_recipes):
+        for idx, (rid, score) in enumerate(page_results):
+            recipe = recipe_index.recipes[rid]
             with cols[idx % 2]:
                 with st.container(border=True):
+                    # Card-size image (pre-resized, never the original)
+                    card_image = image_store.image_for_recipe(
+                        recipe, CARD_IMAGE_WIDTH, STREAMLIT_IMAGE_FORMATS
+                    )
+                    if card_image:
+                        st.image(str(card_image), width="stretch")
+                    
                     # Recipe name
                     st.markdown(f"### {recipe['name']}")
                     
                     # Match score if ingredients selected
-                    if selected_ingredients:
-                        score = calculate_match_score(recipe, set(selected_ingredients))
+                    if rid in missing_counts:
+                        missing = pantry_matrix.missing_ingredients(rid, selected_ingredients)
+                        st.progress(
+                            value=score,
+                            text=f"You have {score*100:.0f}% · missing {missing_counts[rid]}"
+                        )
+                        if missing:
+                            st.caption("🛒 " + ", ".join(missing))
+                    elif score is not None:
                         st.progress(
                             value=score,
                             text=f"Match: {score*100:.0f}%"
                         )
-                        st.divider()
-                    
-                    # Display details in tabs
-                    tab1, tab2, tab3 = st.tabs(["🥕 Ingredients", "📖 Steps", "ℹ️ Info"])
                     
-                    with tab1:
-                        st.markdown("**Ingredients:**")
-                        for ing in recipe.get("ingredients", []):
-                            # Highlight selected ingredients
-                            ing_lower = ing.lower()
-                            is_selected = any(s.lower() in ing_lower for s in selected_ingredients)
-                            
-                            if is_selected:
-                                st.success(f"✅ {ing}")
-                            else:
-                                st.write(f"- {ing}")
+                    st.caption(
+                        f"🥕 {len(recipe.get('ingredients', []))} ingredients · "
+                        f"⏱️ {recipe.get('time', 'ไม่ระบุ')} · "
+                        f"📊 {recipe.get('difficulty', 'ไม่ระบุ')}"
+                    )
                     
-                    with tab2:
-                        steps = recipe.get("steps", [])
-                        if steps:
-                            for step in steps:
-                                st.write(step)
-                        else:
-                            st.info("Steps not available. Visit the website for detailed instructions.")
-                    
-                    with tab3:
-                        col_a, col_b = st.columns([1, 1])
-                        
-                        with col_a:
-                            st.write(f"**Difficulty:** {recipe.get('difficulty', 'ไม่ระบุ')}")
-                            st.write(f"**Time:** {recipe.get('time', 'ไม่ระบุ')}")
-                        
-                        with col_b:
-                            if st.button(
-                                "🌐 View on TrueID",
-                                key=f"url_{recipe.get('url', idx)}",
-                                use_container_width=True
-                            ):
-                                st.write(recipe.get('url', 'N/A'))
+                    if st.button(
+                        "📖 View recipe",
+                        key=f"view_{recipe.get('url', rid)}",
+                        width="stretch"
+                    ):
+                        st.session_state.selected_recipe = recipe
+                        st.session_state.selected = set(selected_ingredients)
+                        st.session_state.selected_keys = {
+                            ingredient_key(s) for s in selected_ingredients
+                        }
+                        st.switch_page("pages/recipe_page.py")
+        
+        # Page navigation
+        if page_count > 1:
+            nav_prev, nav_info, nav_next = st.columns([1, 2, 1])
+            with nav_prev:
+                if st.button("⬅ Previous", disabled=page == 0, width="stretch"):
+                    st.session_state.results_page = page - 1
+                    st.rerun()
+            with nav_info:
+                st.markdown(f"<div style='text-align:center'>Page {page + 1} / {page_count}</div>",
+                            unsafe_allow_html=True)
+            with nav_next:
+                if st.button("Next ➡", disabled=page >= page_count - 1, width="stretch"):
+                    st.session_state.results_page = page + 1
+                    st.rerun()
+
+with st.sidebar:
+    st.divider()
+    cache_stats = query_cache.stats()
+    st.caption(
+        f"🗄️ Query cache: {cache_stats['entries']}/{cache_stats['max_entries']} entries · "
+        f"{cache_stats['hit_rate']:.0%} hits ({cache_stats['hits']} hits, "
+        f"{cache_stats['misses']} misses, {cache_stats['evictions']} evicted)"
+    )
 
 # Footer
 st.divider()
@@ -298,7 +531,8 @@ st.markdown("""
 **💡 Tips:**
 - Select multiple ingredients to find recipes that use them
 - Use the search box to find specific recipes
-- Click ingredient tabs to see all required ingredients
+- Misspelled a name? Pick one of the "Did you mean" suggestions
+- Click "View recipe" to see all ingredients and steps
 - Use the Settings sidebar to change the recipe source
 
 **📊 Data Source:** TrueID Food (food.trueid.net)
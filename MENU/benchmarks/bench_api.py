@@ -0,0 +1,161 @@
+"""
+bench_api.py - Load test for the JSON recipe API
+ทดสอบโหลด API (requests/s, p50/p99) ด้วยไคลเอนต์หลายโปรเซสที่เชื่อมต่อแบบ keep-alive
+
+Start the API first, then:
+
+    python recipe_api.py --workers 4 --port 8000
+    python benchmarks/bench_api.py --url http://127.0.0.1:8000 --clients 8 --duration 10
+    python benchmarks/bench_api.py --revalidate 0.5     # half the requests send If-None-Match
+
+Each client process keeps one HTTP/1.1 connection open and sends requests
+back to back: ranked ingredient filters (like make_queries in
+bench_search.py), text searches and recipe details.
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import random
+import sys
+import time
+from collections import Counter
+from urllib.parse import urlencode, urlsplit
+
+from bench_search import percentile
+
+RANK_MODES = ["selected", "idf", "coverage"]
+
+
+def get_json(conn, path):
+    conn.request("GET", path)
+    response = conn.getresponse()
+    body = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"GET {path} -> {response.status}")
+    return json.loads(body), response.getheader("ETag")
+
+
+def make_workload(base_url, count, random_seed=0):
+    """
+    Request paths drawn from the server's own ingredients and recipes
+
+    Returns:
+        list: Request paths (60% ranked filters, 20% searches, 20% details)
+    """
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    ingredients, _ = get_json(conn, "/api/ingredients?per_page=100")
+    recipes, _ = get_json(conn, "/api/search?per_page=100")
+    conn.close()
+
+    terms = [item["name"] for item in ingredients["results"]]
+    weights = [item["recipes"] for item in ingredients["results"]]
+    recipe_ids = [item["id"] for item in recipes["results"]]
+    names = [item["name"] for item in recipes["results"]]
+    if not terms or not recipe_ids:
+        raise RuntimeError("The API serves no recipes")
+
+    rnd = random.Random(random_seed)
+    paths = []
+    for _ in range(count):
+        roll = rnd.random()
+        if roll < 0.6:
+            selected = sorted(set(rnd.choices(terms, weights=weights, k=rnd.randint(1, 4))))
+            params = {"ingredients": ",".join(selected), "rank": rnd.choice(RANK_MODES)}
+            paths.append("/api/recipes?" + urlencode(params))
+        elif roll < 0.8:
+            words = rnd.choice(names).split() or [""]
+            word = rnd.choice(words)
+            paths.append("/api/search?" + urlencode({"q": word[:rnd.randint(2, 6)]}))
+        else:
+            paths.append(f"/api/recipes/{rnd.choice(recipe_ids)}")
+    return paths
+
+
+def run_client(args):
+    """Send requests on one keep-alive connection until the deadline"""
+    base_url, paths, deadline, revalidate, client_seed = args
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    rnd = random.Random(client_seed)
+    etag = None
+    latencies = []
+    statuses = Counter()
+    received = 0
+    i = client_seed
+    while time.perf_counter() < deadline:
+        path = paths[i % len(paths)]
+        i += 1
+        headers = {"Accept-Encoding": "gzip"}
+        if etag and rnd.random() < revalidate:
+            headers["If-None-Match"] = etag
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            statuses["error"] += 1
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+            continue
+        latencies.append(time.perf_counter() - start)
+        statuses[response.status] += 1
+        received += len(body)
+        etag = response.getheader("ETag") or etag
+    conn.close()
+    return latencies, statuses, received
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the JSON recipe API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent client processes")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--requests", type=int, default=2000, help="distinct request paths")
+    parser.add_argument("--revalidate", type=float, default=0.0,
+                        help="fraction of requests sending If-None-Match")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    paths = make_workload(args.url, args.requests, args.seed)
+    print(f"⏱️ {args.clients} clients for {args.duration}s against {args.url}...", file=sys.stderr)
+    started = time.perf_counter()
+    deadline = started + args.duration
+    jobs = [(args.url, paths, deadline, args.revalidate, args.seed + n) for n in range(args.clients)]
+    with multiprocessing.Pool(args.clients) as pool:
+        outcomes = pool.map(run_client, jobs)
+    elapsed = time.perf_counter() - started
+
+    latencies = [value for samples, _, _ in outcomes for value in samples]
+    statuses = Counter()
+    for _, counts, _ in outcomes:
+        statuses.update(counts)
+    received = sum(size for _, _, size in outcomes)
+    if not latencies:
+        print("❌ No responses received")
+        return
+
+    result = {
+        "clients": args.clients,
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_response_bytes": round(received / len(latencies), 1),
+        "statuses": {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+    print(f"✅ {result['requests']} requests: {result['requests_per_second']} req/s, "
+          f"p50 {result['p50_ms']} ms, p99 {result['p99_ms']} ms, "
+          f"{result['mean_response_bytes']} bytes/response, statuses {result['statuses']}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"✅ Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+bench_scrape.py - Parse-throughput benchmark on recorded HTML fixtures
+วัดความเร็วการแยกข้อมูลจากหน้าเว็บที่บันทึกไว้ (ไม่ต้องใช้เครือข่าย)
+
+Record once with network access, then benchmark anywhere:
+
+    python benchmarks/bench_scrape.py --record https://food.trueid.net/detail/M6oyloE4klNB
+    python benchmarks/bench_scrape.py --record-url https://cooking.kapook.com/view123456
+    python benchmarks/bench_scrape.py --parsers html.parser lxml --repeat 3
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+MENU_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MENU_DIR))
+sys.path.insert(0, str(MENU_DIR / "1"))
+
+import http_fixtures  # noqa: E402
+from fetcher import CachedFetcher  # noqa: E402
+
+TRUEID_GETTERS = ["_get_recipe_name", "_get_ingredients", "_get_steps",
+                  "_get_difficulty", "_get_time"]
+
+
+def _timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def record(collection_urls, page_urls, fixture_dir, max_recipes):
+    """Fetch collections (and their recipe pages) and extra pages, saving fixtures"""
+    from scrape_trueid import TrueIDFoodScraper
+
+    fetcher = CachedFetcher(mode="record", fixture_dir=fixture_dir)
+    scraper = TrueIDFoodScraper()
+    scraper.fetcher = fetcher
+
+    saved = 0
+    for collection_url in collection_urls:
+        for link in scraper.extract_recipe_links(collection_url)[:max_recipes]:
+            try:
+                scraper.fetch_recipe_html(link)
+                saved += 1
+            except Exception as e:
+                print(f"❌ Error recording {link}: {str(e)}")
+    for url in page_urls:
+        try:
+            fetcher.get_text(url, headers=scraper.headers, timeout=15)
+            saved += 1
+        except Exception as e:
+            print(f"❌ Error recording {url}: {str(e)}")
+    print(f"✅ Recorded {saved} pages into {fixture_dir}")
+
+
+def bench_trueid(urls, fetcher, parser, repeat):
+    """
+    Time replayed fetch, HTML parsing, each _get_* method and the single-pass extractor
+
+    Returns:
+        dict: Per-stage mean milliseconds and pages per second
+    """
+    from scrape_trueid import TrueIDFoodScraper
+    from trueid_extractor import TrueIDExtractor
+
+    scraper = TrueIDFoodScraper(parser=parser)
+    extractor = TrueIDExtractor(parser=parser)
+    stages = {name: [] for name in ["network", "parse", *TRUEID_GETTERS, "extract (single pass)"]}
+    pipeline = []
+
+    for _ in range(repeat):
+        for url in urls:
+            html, network = _timed(fetcher.get_text, url, scraper.headers)
+            soup, parse = _timed(extractor.parse, html)
+            _, extract = _timed(extractor.extract_from_soup, soup)
+            stages["network"].append(network)
+            stages["parse"].append(parse)
+            stages["extract (single pass)"].append(extract)
+            pipeline.append(network + parse + extract)
+
+            # The original extractors, each walking its own soup
+            for getter in TRUEID_GETTERS:
+                _, seconds = _timed(getattr(scraper, getter), extractor.parse(html))
+                stages[getter].append(seconds)
+
+    return {
+        "site": "trueid",
+        "parser": parser,
+        "pages": len(urls),
+        "pages_per_second": len(pipeline) / sum(pipeline) if pipeline else 0,
+        "stages_ms": {name: statistics.mean(s) * 1000 for name, s in stages.items() if s},
+    }
+
+
+def bench_kapook(urls, fetcher, repeat):
+    """Time replayed fetch and the whole scrape_kapook() call for Kapook pages"""
+    import scrape_kapook
+
+    network, total = [], []
+    for _ in range(repeat):
+        for url in urls:
+            _, seconds = _timed(fetcher.get_text, url, scrape_kapook.headers)
+            network.append(seconds)
+            _, seconds = _timed(scrape_kapook.scrape_kapook, url)
+            total.append(seconds)
+
+    return {
+        "site": "kapook",
+        "parser": "html.parser",
+        "pages": len(urls),
+        "pages_per_second": len(total) / sum(total) if total else 0,
+        "stages_ms": {
+            "network": statistics.mean(network) * 1000,
+            "scrape_kapook (fetch + parse)": statistics.mean(total) * 1000,
+        },
+    }
+
+
+def print_report(results):
+    """Print one block per site/parser"""
+    for row in results:
+        print(f"\n📄 {row['site']} · {row['parser']} · {row['pages']} pages · "
+              f"{row['pages_per_second']:.1f} pages/s")
+        for stage, ms in row["stages_ms"].items():
+            print(f"   {stage:<32} {ms:>9.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark scraper parsing on recorded fixtures")
+    parser.add_argument("--fixtures", default=str(http_fixtures.DEFAULT_FIXTURE_DIR),
+                        help="fixture directory")
+    parser.add_argument("--record", nargs="*", default=[], metavar="COLLECTION_URL",
+                        help="record TrueID collection pages and their recipes")
+    parser.add_argument("--record-url", nargs="*", default=[], metavar="URL",
+                        help="record individual pages (e.g. Kapook recipes)")
+    parser.add_argument("--max-recipes", type=int, default=20,
+                        help="recipes recorded per collection")
+    parser.add_argument("--parsers", nargs="+", default=["html.parser"],
+                        help="BeautifulSoup backends to compare (html.parser, lxml)")
+    parser.add_argument("--repeat", type=int, default=1, help="passes over the corpus")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    if args.record or args.record_url:
+        record(args.record, args.record_url, args.fixtures, args.max_recipes)
+        return
+
+    # Every scraper (including module-level Kapook functions) replays fixtures
+    os.environ["RECIPE_FETCH_MODE"] = "replay"
+    os.environ["RECIPE_FIXTURE_DIR"] = args.fixtures
+    fetcher = CachedFetcher(mode="replay", fixture_dir=args.fixtures)
+
+    urls = http_fixtures.list_fixtures(args.fixtures)
+    trueid_urls = [u for u in urls if "food.trueid.net/detail/" in u]
+    kapook_urls = [u for u in urls if "cooking.kapook.com/view" in u]
+    if not trueid_urls and not kapook_urls:
+        print(f"❌ No recipe fixtures in {args.fixtures}; record some with --record first")
+        sys.exit(1)
+
+    results = []
+    if trueid_urls:
+        for backend in args.parsers:
+            results.append(bench_trueid(trueid_urls, fetcher, backend, args.repeat))
+    if kapook_urls:
+        results.append(bench_kapook(kapook_urls, fetcher, args.repeat))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✅ Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+"""
+bench_search.py - Benchmarks for the search, filter and ranking path
+วัดความเร็ว (throughput, p50/p99) และหน่วยความจำสูงสุดของการค้นหา กรอง และจัดอันดับสูตรอาหาร
+
+Runs without Streamlit against synthetic corpora of growing size:
+
+    python benchmarks/bench_search.py --sizes 1000 10000 100000
+    python benchmarks/bench_search.py --sizes 1000 --json bench.json
+"""
+
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+# corpus puts MENU/ and MENU/1/ on sys.path for the imports below
+from corpus import CorpusGenerator
+
+from pantry_matrix import PantryMatrix
+from query_cache import QueryCache
+from ranking import RankingEngine
+from recipe_dedup import find_clusters
+from recipe_index import (
+    RecipeIndex, all_ingredients, ingredient_key, recipe_canonical_ingredients
+)
+from recipe_snapshot import RecipeSnapshot, SnapshotRecipeIndex, compile_snapshot
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+PAGE_SIZE = 10
+
+
+def make_queries(index, count, random_seed=0):
+    """
+    Build a query workload: 1-4 selected ingredients, a third with search text
+
+    Ingredients are drawn in proportion to how many recipes use them, like
+    real users picking staples more often than rare items.
+    """
+    rnd = random.Random(random_seed)
+    terms = index.vocabulary
+    weights = [index.document_frequency(term) for term in terms]
+    queries = []
+    for _ in range(count):
+        selected = sorted(set(rnd.choices(terms, weights=weights, k=rnd.randint(1, 4))))
+        search = ""
+        if rnd.random() < 1 / 3:
+            words = index.recipes[rnd.randrange(len(index))]["name"].split()
+            word = rnd.choice(words) if words else ""
+            search = word[:rnd.randint(2, 6)]
+        queries.append((selected, search))
+    return queries
+
+
+# Naive baseline: the app's original per-recipe filter and score
+
+def matches_criteria(recipe, selected_ingredients, search_query):
+    """
+    Check if a recipe matches the selected ingredients and search query
+
+    Args:
+        recipe (dict): Recipe data
+        selected_ingredients (set): Selected ingredient names
+        search_query (str): Search query string
+
+    Returns:
+        bool: True if recipe matches criteria
+    """
+    # Check search query
+    if search_query:
+        query_lower = search_query.lower()
+        recipe_name = recipe.get("name", "").lower()
+        ingredients_text = " ".join(recipe.get("ingredients", [])).lower()
+
+        if query_lower not in recipe_name and query_lower not in ingredients_text:
+            return False
+
+    # Check ingredients
+    if selected_ingredients:
+        recipe_ingredients = set(recipe_canonical_ingredients(recipe))
+
+        # Check if any selected ingredient is in the recipe
+        has_match = False
+        for ing in selected_ingredients:
+            if ingredient_key(ing) in recipe_ingredients:
+                has_match = True
+                break
+
+        return has_match
+
+    # If no filters, show all
+    return True
+
+
+def calculate_match_score(recipe, selected_ingredients):
+    """
+    Calculate how well a recipe matches the selected ingredients
+
+    Args:
+        recipe (dict): Recipe data
+        selected_ingredients (set): Selected ingredient names
+
+    Returns:
+        float: Match score between 0 and 1
+    """
+    if not selected_ingredients:
+        return 0
+
+    recipe_ingredients = set(recipe_canonical_ingredients(recipe))
+    matches = 0
+
+    for ing in selected_ingredients:
+        if ingredient_key(ing) in recipe_ingredients:
+            matches += 1
+
+    return matches / len(selected_ingredients)
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def measure(name, size, func, inputs):
+    """
+    Time ``func`` over every input, then rerun the first one under tracemalloc
+
+    Returns:
+        dict: name, size, calls, throughput (calls/s), p50/p99 (ms), peak memory (MB)
+    """
+    samples = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(inputs[0])
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": name,
+        "size": size,
+        "calls": len(samples),
+        "throughput": len(samples) / sum(samples) if sum(samples) else float("inf"),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def naive_results(recipes, selected, search):
+    """The original results loop: filter, score, sort everything, take a page"""
+    filtered = [r for r in recipes if matches_criteria(r, selected, search)]
+    if selected:
+        filtered.sort(key=lambda r: calculate_match_score(r, selected), reverse=True)
+    return filtered[:PAGE_SIZE]
+
+
+def bench_size(generator, size, queries_per_size, repeat, naive_limit, random_seed=0):
+    """Run every benchmark on one corpus size"""
+    results = []
+    recipes = generator.generate(size)
+    one_shot = [None] * repeat
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = Path(tmp) / "recipes_cache.json"
+        with open(cache_path, 'w', encoding='utf-8') as f:
+            json.dump(recipes, f, ensure_ascii=False)
+
+        def load_cache(_):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+        results.append(measure("cache load (json)", size, load_cache, one_shot))
+
+        snapshot_path = Path(tmp) / "recipes.snapshot"
+        compile_snapshot(recipes, snapshot_path)
+        results.append(measure(
+            "snapshot open + index (mmap)", size,
+            lambda _: SnapshotRecipeIndex(RecipeSnapshot(snapshot_path)), one_shot
+        ))
+        snapshot_index = SnapshotRecipeIndex(RecipeSnapshot(snapshot_path))
+        snapshot_queries = make_queries(snapshot_index, queries_per_size, random_seed)
+        results.append(measure(
+            "filter (snapshot index)", size,
+            lambda q: snapshot_index.filter_bits(q[0], q[1]), snapshot_queries
+        ))
+        results.append(measure(
+            "facet counts (snapshot index)", size,
+            lambda q: snapshot_index.facet_counts(q[0], q[1]), snapshot_queries
+        ))
+
+    results.append(measure("vocabulary extraction", size,
+                           lambda _: all_ingredients(recipes), one_shot))
+    results.append(measure("index build", size, lambda _: RecipeIndex(recipes), one_shot))
+    results.append(measure("near-duplicate clusters (minhash/lsh)", size,
+                           lambda _: find_clusters(recipes), one_shot))
+
+    index = RecipeIndex(recipes)
+    results.append(measure("pantry matrix build", size, lambda _: PantryMatrix(index), one_shot))
+    engine = RankingEngine(index)
+    matrix = PantryMatrix(index)
+    queries = make_queries(index, queries_per_size, random_seed)
+
+    if size <= naive_limit:
+        results.append(measure(
+            "filter (matches_criteria)", size,
+            lambda q: [r for r in recipes if matches_criteria(r, set(q[0]), q[1])],
+            queries
+        ))
+        results.append(measure(
+            "results page (sort by calculate_match_score)", size,
+            lambda q: naive_results(recipes, set(q[0]), q[1]), queries
+        ))
+
+    results.append(measure(
+        "filter (RecipeIndex)", size,
+        lambda q: index.filter_bits(q[0], q[1]), queries
+    ))
+    results.append(measure(
+        "facet counts (RecipeIndex)", size,
+        lambda q: index.facet_counts(q[0], q[1]), queries
+    ))
+    results.append(measure(
+        "results page (RankingEngine top-k)", size,
+        lambda q: engine.top_k(q[0], index.filter_bits(q[0], q[1]), PAGE_SIZE), queries
+    ))
+    # Popular queries repeat: each one is asked four times, in shuffled order
+    cache = QueryCache()
+    repeated = queries * 4
+    random.Random(random_seed).shuffle(repeated)
+    results.append(measure(
+        "results page (QueryCache, 4x repeats)", size,
+        lambda q: cache.top_k(engine, q[0], q[1], "selected", PAGE_SIZE,
+                              cache.filter_bits(index, q[0], q[1])),
+        repeated
+    ))
+    results.append(measure(
+        "scoring (PantryMatrix)", size, lambda q: matrix.scores(q[0]), queries
+    ))
+    results.append(measure(
+        "pantry missing <= 2 (PantryMatrix)", size,
+        lambda q: matrix.cookable(q[0], 2), queries
+    ))
+    return results
+
+
+def print_table(results):
+    """Print benchmark results as a fixed-width table"""
+    header = f"{'benchmark':<46} {'size':>8} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'peak MB':>9}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['name']:<46} {row['size']:>8} {row['throughput']:>10.1f} "
+            f"{row['p50_ms']:>10.3f} {row['p99_ms']:>10.3f} {row['peak_mb']:>9.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recipe search on synthetic corpora")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="corpus sizes (recipes)")
+    parser.add_argument("--queries", type=int, default=200, help="queries per size")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="repetitions of one-shot steps (load, build)")
+    parser.add_argument("--naive-limit", type=int, default=100000,
+                        help="skip the original per-recipe loops above this size")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--json", help="also write results to this JSON file")
+    args = parser.parse_args(argv)
+
+    generator = CorpusGenerator(random_seed=args.seed)
+    results = []
+    for size in args.sizes:
+        print(f"⏱️ Benchmarking {size} recipes...", file=sys.stderr)
+        results.extend(bench_size(generator, size, args.queries, args.repeat, args.naive_limit,
+                                  random_seed=args.seed))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"✅ Saved results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+corpus.py - Synthetic Thai recipe corpora for benchmarks
+สร้างชุดสูตรอาหารภาษาไทยจำลอง (1k - 1M สูตร) จากคำศัพท์ในแคชและไฟล์ CSV ที่มีอยู่
+"""
+
+import csv
+import json
+import random
+import sys
+from itertools import accumulate
+from pathlib import Path
+
+MENU_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MENU_DIR))
+sys.path.insert(0, str(MENU_DIR / "1"))
+
+from ingredient_normalizer import parse_ingredient  # noqa: E402
+
+DEFAULT_JSON_PATH = MENU_DIR / "recipes_cache.json"
+DEFAULT_CSV_PATHS = [
+    MENU_DIR / "1" / "recipes_dataset.csv",
+    MENU_DIR / "1" / "recipe_output.csv",
+]
+
+DIFFICULTIES = ["ง่าย", "ปานกลาง", "ยาก", "ไม่ระบุ"]
+TIMES = ["10 นาที", "15 นาที", "20 นาที", "30 นาที", "45 นาที", "1 ชั่วโมง", "ไม่ระบุ"]
+
+
+def _split_list(text):
+    return [part.strip() for part in (text or "").split("|") if part.strip()]
+
+
+def load_seed(json_path=DEFAULT_JSON_PATH, csv_paths=DEFAULT_CSV_PATHS):
+    """
+    Collect ingredient lines, recipe names and steps from the repo's data
+
+    Returns:
+        dict: "ingredients", "names" and "steps" lists (with repeats, so
+            common ingredients stay common in generated recipes)
+    """
+    seed = {"ingredients": [], "names": [], "steps": []}
+
+    if Path(json_path).exists():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            for recipe in json.load(f):
+                seed["names"].append(recipe.get("name", ""))
+                seed["ingredients"].extend(recipe.get("ingredients", []))
+                seed["steps"].extend(recipe.get("steps", []))
+
+    for path in csv_paths:
+        if not Path(path).exists():
+            continue
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                seed["names"].append(row.get("recipe_name", ""))
+                seed["ingredients"].extend(_split_list(row.get("ingredients_text")))
+                seed["steps"].extend(_split_list(row.get("steps_text")))
+
+    seed["names"] = [name for name in seed["names"] if name]
+    if not seed["ingredients"] or not seed["names"]:
+        raise ValueError("No seed recipes found in the cache or CSV files")
+    return seed
+
+
+class CorpusGenerator:
+    """
+    Generates recipe dictionaries shaped like the scraped ones
+
+    Names are recombined from words of real recipe names and ingredient
+    lines are drawn from the real lines with a Zipf-like skew, so a few
+    staples (garlic, fish sauce) appear everywhere and most are rare.
+    Canonical ingredient names are parsed once per distinct seed line.
+    """
+
+    def __init__(self, seed=None, random_seed=0):
+        seed = seed or load_seed()
+        self.random = random.Random(random_seed)
+
+        counts = {}
+        for line in seed["ingredients"]:
+            counts[line] = counts.get(line, 0) + 1
+        lines = sorted(counts, key=counts.get, reverse=True)
+        self.lines = lines
+        self.cum_weights = list(accumulate(1.0 / (rank + 1) for rank in range(len(lines))))
+        self.line_names = [
+            sorted({entry["name"] for entry in parse_ingredient(line)}) for line in lines
+        ]
+
+        self.name_words = sorted({word for name in seed["names"] for word in name.split()})
+        self.steps = seed["steps"] or ["เตรียมวัตถุดิบทั้งหมด"]
+
+    def recipe(self, number):
+        """Generate one recipe dictionary"""
+        rnd = self.random
+        picks = rnd.choices(range(len(self.lines)), cum_weights=self.cum_weights,
+                            k=rnd.randint(4, 15))
+        picks = list(dict.fromkeys(picks))
+        canonical = sorted({name for i in picks for name in self.line_names[i]})
+        return {
+            "name": " ".join(rnd.sample(self.name_words, min(3, len(self.name_words)))),
+            "ingredients": [self.lines[i] for i in picks],
+            "steps": rnd.sample(self.steps, min(4, len(self.steps))),
+            "url": f"https://example.invalid/recipe/{number}",
+            "difficulty": rnd.choice(DIFFICULTIES),
+            "time": rnd.choice(TIMES),
+            "canonical_ingredients": canonical,
+        }
+
+    def generate(self, size):
+        """
+        Generate a corpus
+
+        Args:
+            size (int): Number of recipes
+
+        Returns:
+            list: Recipe dictionaries
+        """
+        return [self.recipe(number) for number in range(size)]
+
+
+def generate_corpus(size, random_seed=0):
+    """Generate ``size`` synthetic recipes from the repo's seed data"""
+    return CorpusGenerator(random_seed=random_seed).generate(size)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Write a synthetic recipes JSON file")
+    parser.add_argument("size", type=int, help="number of recipes")
+    parser.add_argument("output", help="output JSON path")
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    recipes = generate_corpus(args.size, args.seed)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(recipes, f, ensure_ascii=False)
+    print(f"✅ Wrote {len(recipes)} synthetic recipes to {args.output}")
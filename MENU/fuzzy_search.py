@@ -0,0 +1,164 @@
+"""
+fuzzy_search.py - Typo-tolerant term lookup with a BK-tree
+ค้นหาคำที่สะกดใกล้เคียง (รองรับวรรณยุกต์/ตัวสะกดคลาดเคลื่อน) ด้วย BK-tree
+"""
+
+# Thai tone marks (and ็ ์) that users often mistype or omit
+_MARKS_TABLE = str.maketrans("", "", "็่้๊๋์")
+
+
+def strip_tone_marks(text):
+    """Remove tone marks so "ซีอิ้ว" and "ซีอิ๊ว" share one key"""
+    return text.translate(_MARKS_TABLE)
+
+
+def edit_distance(a, b, max_distance=None):
+    """
+    Levenshtein distance between two strings
+
+    Args:
+        a (str): First string
+        b (str): Second string
+        max_distance (int): Stop early and return max_distance + 1 once
+            the distance is known to exceed it
+
+    Returns:
+        int: Number of single-character edits
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ca != cb),
+            ))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over edit distance
+
+    A lookup within distance ``d`` only descends into children whose edge
+    distance lies in ``[dist - d, dist + d]`` (triangle inequality), so
+    most of the vocabulary is never compared.
+    """
+
+    def __init__(self, terms=()):
+        self._root = None  # [term, {distance: child node}]
+        self.size = 0
+        for term in terms:
+            self.add(term)
+
+    def add(self, term):
+        """Insert a term (duplicates are ignored)"""
+        if self._root is None:
+            self._root = [term, {}]
+            self.size = 1
+            return
+
+        node = self._root
+        while True:
+            distance = edit_distance(term, node[0])
+            if distance == 0:
+                return
+            child = node[1].get(distance)
+            if child is None:
+                node[1][distance] = [term, {}]
+                self.size += 1
+                return
+            node = child
+
+    def search(self, query, max_distance):
+        """
+        Find all terms within an edit distance of the query
+
+        Returns:
+            list: (distance, term) pairs
+        """
+        if self._root is None:
+            return []
+
+        results = []
+        stack = [self._root]
+        while stack:
+            term, children = stack.pop()
+            distance = edit_distance(query, term)
+            if distance <= max_distance:
+                results.append((distance, term))
+            low, high = distance - max_distance, distance + max_distance
+            for edge, child in children.items():
+                if low <= edge <= high:
+                    stack.append(child)
+        return results
+
+
+class FuzzyMatcher:
+    """
+    Ranked "did you mean" suggestions for a vocabulary
+
+    Terms are indexed in a BK-tree, plus a tone-mark-free key so spelling
+    that differs only in tone marks is found without any distance work.
+    """
+
+    def __init__(self, term_counts):
+        """
+        Args:
+            term_counts (dict): term -> how many recipes use it (used to
+                rank equally close suggestions)
+        """
+        self.term_counts = dict(term_counts)
+        self.tree = BKTree(self.term_counts)
+        self._by_skeleton = {}
+        for term in self.term_counts:
+            self._by_skeleton.setdefault(strip_tone_marks(term), []).append(term)
+
+    @staticmethod
+    def default_max_distance(query):
+        """Allow one typo for short terms and two for longer ones"""
+        return 1 if len(query) <= 4 else 2
+
+    def suggest(self, query, limit=5, max_distance=None):
+        """
+        Suggest vocabulary terms close to a query
+
+        Args:
+            query (str): Possibly misspelled term
+            limit (int): Maximum number of suggestions
+            max_distance (int): Edit distance budget (default by length)
+
+        Returns:
+            list: Terms ranked by distance, then by recipe count
+        """
+        query = (query or "").strip().lower()
+        if not query:
+            return []
+        if max_distance is None:
+            max_distance = self.default_max_distance(query)
+
+        scored = {}
+        for term in self._by_skeleton.get(strip_tone_marks(query), []):
+            if term != query:
+                # Only tone marks differ: rank ahead of real typos
+                scored[term] = 0.5
+        for distance, term in self.tree.search(query, max_distance):
+            if term != query:
+                scored[term] = min(scored.get(term, distance), distance)
+
+        ranked = sorted(
+            scored,
+            key=lambda term: (scored[term], -self.term_counts.get(term, 0), term)
+        )
+        return ranked[:limit]
@@ -1,5 +1,16 @@
+import sys
+from pathlib import Path
+
 import streamlit as st
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "1"))
+
+from image_store import ImageStore
+
+DETAIL_IMAGE_WIDTH = 1200
+# st.image passes JPEGs that fit through unchanged but re-encodes WebP
+STREAMLIT_IMAGE_FORMATS = ("jpeg",)
+
 st.set_page_config(page_title="รายละเอียดสูตร", layout="wide")
 
 # =========================
@@ -7,30 +18,49 @@ st.set_page_config(page_title="รายละเอียดสูตร", layo
 # =========================
 if "selected_recipe" not in st.session_state:
     st.warning("ไม่พบสูตรที่เลือก")
+    if st.button("⬅ กลับหน้าหลัก"):
+        st.switch_page("app.py")
     st.stop()
 
 recipe = st.session_state.selected_recipe
+selected = st.session_state.get("selected", set())
+selected_keys = st.session_state.get("selected_keys", set())
+
+@st.cache_resource
+def get_image_store():
+    return ImageStore()
+
 
 # =========================
 # 🖼 helper เลือกรูปตามโปรตีน
 # =========================
 def get_recipe_image(recipe):
-    selected = st.session_state.get("selected", set())
+    images = recipe.get("images")
+    if not images:
+        return recipe.get("image")
 
     for protein in recipe.get("protein_options", []):
         if protein in selected:
-            return recipe["images"].get(
-                protein,
-                recipe["images"]["default"]
-            )
+            return images.get(protein, images.get("default"))
 
-    return recipe["images"]["default"]
+    return images.get("default")
 
 # =========================
 # 🎨 HEADER
 # =========================
 st.title(recipe["name"])
-st.image(get_recipe_image(recipe), use_column_width=True)
+image = get_recipe_image(recipe)
+image_store = get_image_store()
+image_store.refresh()
+# ใช้รูปย่อขนาดพอดีจากคลังรูป ถ้าไม่มีค่อยใช้ต้นฉบับ
+local_image = (
+    image_store.resolve(image, DETAIL_IMAGE_WIDTH, STREAMLIT_IMAGE_FORMATS)
+    or image_store.image_for_recipe(recipe, DETAIL_IMAGE_WIDTH, STREAMLIT_IMAGE_FORMATS)
+)
+if local_image:
+    st.image(str(local_image), width="stretch")
+elif image:
+    st.image(image, width="stretch")
 
 # =========================
 # 📋 ข้อมูลทั่วไป
@@ -40,13 +70,13 @@ st.subheader("ข้อมูลทั่วไป")
 col1, col2, col3 = st.columns(3)
 
 with col1:
-    st.write(f"ประเภท: {recipe['type']}")
+    st.write(f"ประเภท: {recipe.get('type') or 'ไม่ระบุ'}")
 
 with col2:
-    st.write(f"เวลา: {recipe['time']}")
+    st.write(f"เวลา: {recipe.get('time', 'ไม่ระบุ')}")
 
 with col3:
-    st.write(f"ระดับความยาก: {recipe['difficulty']}")
+    st.write(f"ระดับความยาก: {recipe.get('difficulty', 'ไม่ระบุ')}")
 
 # =========================
 # 🧺 วัตถุดิบ
@@ -54,9 +84,22 @@ with col3:
 st.subheader("วัตถุดิบ")
 
 # base ingredients
-st.markdown("**วัตถุดิบหลัก**")
-for ing in recipe.get("base_ingredients", []):
-    st.write("•", ing)
+if recipe.get("base_ingredients"):
+    st.markdown("**วัตถุดิบหลัก**")
+    for ing in recipe["base_ingredients"]:
+        st.write("•", ing)
+
+# scraped ingredients (highlight the ones selected on the main page
+# using the canonical names parsed at ingest time)
+line_names = {}
+for entry in recipe.get("ingredients_structured", []):
+    line_names.setdefault(entry["text"], set()).add(entry["name"])
+
+for ing in recipe.get("ingredients", []):
+    if line_names.get(ing, set()) & selected_keys:
+        st.success(f"✅ {ing}")
+    else:
+        st.write("•", ing)
 
 # protein options
 if recipe.get("protein_options"):
@@ -71,7 +114,20 @@ if recipe.get("steps"):
     st.subheader("วิธีทำ")
 
     for i, step in enumerate(recipe["steps"], start=1):
-        st.write(f"{i}. {step}")
+        # scraped steps already carry their own "1." numbering
+        st.write(step if step[:1].isdigit() else f"{i}. {step}")
+
+if recipe.get("url"):
+    st.link_button("🌐 ดูต้นฉบับ", recipe["url"])
+
+# สูตรเดียวกันจากแหล่งอื่น (รวมสูตรซ้ำไว้ที่สูตรนี้)
+other_sources = [u for u in recipe.get("source_urls", []) if u != recipe.get("url")]
+if other_sources or recipe.get("aliases"):
+    with st.expander(f"🔗 สูตรนี้จากแหล่งอื่น ({len(other_sources)})"):
+        if recipe.get("aliases"):
+            st.caption("ชื่ออื่น: " + ", ".join(recipe["aliases"]))
+        for u in other_sources:
+            st.markdown(f"- [{u}]({u})")
 
 # =========================
 # 🔙 ปุ่มกลับ
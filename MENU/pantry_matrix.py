@@ -0,0 +1,143 @@
+"""
+pantry_matrix.py - Packed recipe x ingredient incidence matrix for pantry queries
+เมทริกซ์วัตถุดิบของทุกสูตร (แบบบิต) สำหรับค้นหา "ทำได้เลย ขาดไม่เกิน N อย่าง" ด้วย NumPy
+"""
+
+import numpy as np
+
+from recipe_index import ingredient_key
+
+# mode -> what the score means
+SCORE_MODES = {
+    "selected": "matched / selected ingredients",
+    "coverage": "matched / the recipe's own ingredients",
+}
+
+_WORD_BITS = 64
+
+if hasattr(np, "bitwise_count"):
+    def _popcount_rows(words):
+        return np.bitwise_count(words).sum(axis=1, dtype=np.int32)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount_rows(words):
+        as_bytes = words.view(np.uint8).reshape(words.shape[0], -1)
+        return _BYTE_COUNTS[as_bytes].sum(axis=1, dtype=np.int32)
+
+
+class PantryMatrix:
+    """
+    Recipe x canonical-ingredient incidence matrix packed into uint64 words
+
+    Row ``i`` holds the ingredients of recipe ``i`` of a RecipeIndex, one
+    bit per vocabulary term. A pantry is packed the same way, so "how many
+    of my ingredients does each recipe use" is one AND plus a popcount over
+    the whole matrix instead of a Python loop over ingredient strings.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.vocabulary = list(index.vocabulary)
+        self._columns = {term: col for col, term in enumerate(self.vocabulary)}
+        n_words = max(1, -(-len(self.vocabulary) // _WORD_BITS))
+
+        self.rows = np.zeros((len(index), n_words), dtype=np.uint64)
+        for col, term in enumerate(self.vocabulary):
+            word, bit = divmod(col, _WORD_BITS)
+            mask = np.uint64(1 << bit)
+            self.rows[index.posting_ids(term), word] |= mask
+        self.ingredient_counts = _popcount_rows(self.rows)
+
+    def __len__(self):
+        return self.rows.shape[0]
+
+    def pack(self, ingredients):
+        """
+        Pack ingredient names into a row-shaped bit vector
+
+        Args:
+            ingredients (iterable): Ingredient names (canonicalized here)
+
+        Returns:
+            tuple: (uint64 vector, number of known distinct ingredients)
+        """
+        vector = np.zeros(self.rows.shape[1], dtype=np.uint64)
+        columns = {self._columns[key] for key in map(ingredient_key, ingredients)
+                   if key in self._columns}
+        for col in columns:
+            word, bit = divmod(col, _WORD_BITS)
+            vector[word] |= np.uint64(1 << bit)
+        return vector, len(columns)
+
+    def candidate_mask(self, candidate_bits):
+        """Convert a RecipeIndex bitset into a boolean row mask"""
+        n = len(self)
+        if candidate_bits is None:
+            return np.ones(n, dtype=bool)
+        raw = candidate_bits.to_bytes(max(1, -(-n // 8)), "little")
+        bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder="little")
+        return bits[:n].astype(bool)
+
+    def have_counts(self, pantry):
+        """Number of pantry ingredients used by every recipe"""
+        vector, _ = self.pack(pantry)
+        return _popcount_rows(self.rows & vector)
+
+    def scores(self, selected_ingredients, mode="selected"):
+        """
+        Score every recipe in one vectorized pass
+
+        Args:
+            selected_ingredients (iterable): Selected ingredient names
+            mode (str): "selected" (the app's original match score) or
+                "coverage" (fraction of the recipe already on hand)
+
+        Returns:
+            numpy.ndarray: float scores between 0 and 1, one per recipe
+        """
+        if mode not in SCORE_MODES:
+            raise ValueError(f"Unknown score mode: {mode}")
+        have = self.have_counts(selected_ingredients)
+        if mode == "selected":
+            selected = len({ingredient_key(s) for s in selected_ingredients} - {""})
+            return have / selected if selected else np.zeros(len(self))
+        return np.divide(have, self.ingredient_counts,
+                         out=np.zeros(len(self)), where=self.ingredient_counts > 0)
+
+    def cookable(self, pantry, max_missing=2, candidate_bits=None):
+        """
+        Recipes that can be cooked from a pantry missing at most N ingredients
+
+        Args:
+            pantry (iterable): Ingredient names on hand
+            max_missing (int): Largest number of missing ingredients allowed
+            candidate_bits (int): Optional RecipeIndex bitset (e.g. search
+                results) restricting the answer
+
+        Returns:
+            list: (recipe id, coverage, missing count) tuples, fewest
+                missing first, then best coverage, then corpus order
+        """
+        have = self.have_counts(pantry)
+        missing = self.ingredient_counts - have
+        mask = self.candidate_mask(candidate_bits)
+        mask &= (missing <= max_missing) & (have > 0)
+
+        rids = np.flatnonzero(mask)
+        coverage = have[rids] / self.ingredient_counts[rids]
+        order = np.lexsort((rids, -coverage, missing[rids]))
+        return [
+            (int(rids[i]), float(coverage[i]), int(missing[rids[i]]))
+            for i in order
+        ]
+
+    def missing_ingredients(self, rid, pantry):
+        """Canonical ingredients of one recipe that are not in the pantry"""
+        vector, _ = self.pack(pantry)
+        remaining = self.rows[rid] & ~vector
+        return [
+            self.vocabulary[word * _WORD_BITS + bit]
+            for word, value in enumerate(remaining.tolist())
+            for bit in range(_WORD_BITS) if value >> bit & 1
+        ]
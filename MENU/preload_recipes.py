@@ -3,42 +3,66 @@ preload_recipes.py - Pre-load recipes cache from TrueID Food
 ตัวโหลดข้อมูลสูตรอาหารล่วงหน้า
 """
 
-import json
 from pathlib import Path
 import sys
 sys.path.insert(0, str(Path(__file__).parent / "1"))
 
 from scrape_trueid import TrueIDFoodScraper
+from recipe_cache import DEFAULT_TTL_SECONDS, incremental_refresh
+from recipe_store import RecipeStore
+from recipe_snapshot import open_snapshot
+from scrape_metrics import get_metrics
+from scrape_pipeline import BULK_PARSE_WORKERS
 
 
-def preload_recipes(collection_url, max_recipes=30, output_file="recipes_cache.json"):
+def preload_recipes(collection_url, max_recipes=30, output_file="recipes_cache.json",
+                    ttl_seconds=DEFAULT_TTL_SECONDS, report_file="scrape_report.json",
+                    metrics_file="scrape_metrics.prom"):
     """
     Pre-load recipes from TrueID and save to cache file
     
+    An existing cache is refreshed incrementally: only new links and
+    recipes fetched more than ``ttl_seconds`` ago are downloaded.
+    
     Args:
         collection_url (str): TrueID collection URL
         max_recipes (int): Number of recipes to scrape
         output_file (str): Output cache file path
+        ttl_seconds (float): Refetch cached recipes older than this (0 = all)
+        report_file (str): JSON run report path (None to skip)
+        metrics_file (str): Prometheus text file path (None to skip)
     """
     print("="*70)
     print("TrueID Food Recipe Pre-Loader")
     print("="*70)
     
-    scraper = TrueIDFoodScraper()
+    scraper = TrueIDFoodScraper(parse_workers=BULK_PARSE_WORKERS)
     
     print(f"\n📡 Starting to scrape recipes...")
     print(f"   URL: {collection_url}")
     print(f"   Max recipes: {max_recipes}\n")
     
-    recipes = scraper.scrape_collection(collection_url, max_recipes)
+    metrics = get_metrics()
+    metrics.reset()
+    recipes, _ = incremental_refresh(
+        scraper, collection_url, output_file, max_recipes, ttl_seconds=ttl_seconds
+    )
+    
+    # Written even when scraping fails, so scheduled runs can alert on it
+    if report_file:
+        metrics.write_json(report_file)
+        print(f"📊 Run report: {report_file}")
+    if metrics_file:
+        metrics.write_prometheus(metrics_file)
+        print(f"📊 Prometheus metrics: {metrics_file}")
     
     if recipes:
-        # Save to file
-        output_path = Path(output_file)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(recipes, f, ensure_ascii=False, indent=2)
-        
+        store = RecipeStore()
+        store.upsert_recipes(recipes)
         print(f"\n✅ Successfully saved {len(recipes)} recipes to {output_file}")
+        print(f"   Recipe store: {store.path} ({store.count()} recipes)")
+        snapshot = open_snapshot(store)
+        print(f"   Snapshot: {snapshot.path} ({snapshot.nbytes / 1024:.0f} KB, shared by all sessions)")
         
         # Show sample recipes
         print("\n📋 Sample Recipes:")
@@ -0,0 +1,186 @@
+"""
+query_cache.py - Process-wide LRU cache of query results
+แคชผลลัพธ์การค้นหาแบบ LRU ที่ใช้ร่วมกันทุกเซสชัน และล้างเมื่อเวอร์ชันของสูตรอาหารเปลี่ยน
+
+Popular queries ("ไก่" + "ไข่") repeat across users and reruns, so their
+search bits, filter bits, facet counts and ranked pages are kept in one
+cache per process. Keys are normalized queries: sorted canonical
+ingredients, normalized search text and the ranking mode. Every entry
+belongs to one corpus version (``RecipeIndex.version``); the first lookup
+with another version, after a reload or a scrape, drops them all.
+"""
+
+import threading
+from collections import OrderedDict
+
+from recipe_index import ingredient_key, normalize_term
+
+DEFAULT_MAX_ENTRIES = 512
+
+
+def query_key(selected_ingredients, search_query="", mode=None):
+    """
+    Normalized cache key of a query
+
+    Order, duplicates, synonyms ("หมูสับ" -> "หมู"), case and surrounding
+    spaces do not change the results, so they do not change the key.
+
+    Args:
+        selected_ingredients (iterable): Selected ingredient names
+        search_query (str): Search query string
+        mode (str): Ranking mode, None for unranked results
+
+    Returns:
+        tuple: (sorted canonical ingredients, normalized search, mode)
+    """
+    keys = sorted({ingredient_key(ing) for ing in selected_ingredients})
+    return (tuple(keys), normalize_term(search_query), mode)
+
+
+class QueryCache:
+    """
+    Thread-safe LRU of query results for one corpus version
+
+    Results are computed outside the lock; two sessions missing the same
+    query at once both compute it, and the second result replaces the
+    first. Entries are never mutated, so callers must not modify them.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, version, key, usable=None):
+        """
+        Look up a result, switching to ``version`` first if it is new
+
+        Args:
+            version (str): Corpus version of the caller's index
+            key (tuple): Cache key
+            usable (callable): Optional check of a cached value; a value
+                it rejects counts as a miss
+
+        Returns:
+            object: Cached value, or None on a miss
+        """
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                    self._entries.clear()
+                self.version = version
+            value = self._entries.get(key)
+            if value is None or (usable is not None and not usable(value)):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, version, key, value):
+        """Store a result, evicting the least recently used beyond max_entries"""
+        with self._lock:
+            # Computed against a corpus that has been replaced meanwhile
+            if version != self.version:
+                return
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, version, key, compute):
+        """Cached value of ``key``, calling ``compute()`` on a miss"""
+        value = self.get(version, key)
+        if value is None:
+            value = compute()
+            self.put(version, key, value)
+        return value
+
+    def clear(self):
+        """Drop every entry (statistics are kept)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Hit, miss, eviction and invalidation counts
+
+        Returns:
+            dict: Counters, current size and hit rate
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "version": self.version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    # ==========================================
+    # 🔍 CACHED INDEX QUERIES
+    # ==========================================
+
+    def search_bits(self, index, search_query):
+        """Cached ``index.search_bits``"""
+        key = ("search", normalize_term(search_query))
+        return self.get_or_compute(index.version, key,
+                                   lambda: index.search_bits(search_query))
+
+    def filter_bits(self, index, selected_ingredients, search_query="", search_bits=None):
+        """Cached ``index.filter_bits`` (search_bits must belong to search_query)"""
+        key = ("filter",) + query_key(selected_ingredients, search_query)
+        return self.get_or_compute(
+            index.version, key,
+            lambda: index.filter_bits(selected_ingredients, search_query, search_bits)
+        )
+
+    def facet_counts(self, index, selected_ingredients, search_query="", search_bits=None):
+        """Cached ``index.facet_counts``"""
+        key = ("facets",) + query_key(selected_ingredients, search_query)
+        return self.get_or_compute(
+            index.version, key,
+            lambda: index.facet_counts(selected_ingredients, search_query, search_bits)
+        )
+
+    def top_k(self, ranking, selected_ingredients, search_query, mode, k, candidate_bits):
+        """
+        Cached ``ranking.top_k`` of a query's filter result
+
+        The ranked prefix is reused by every page it covers; a deeper page
+        ranks again with the larger k and replaces it.
+
+        Args:
+            ranking (RankingEngine): Ranking engine of the current index
+            selected_ingredients (iterable): Selected ingredient names
+            search_query (str): Search query string
+            mode (str): One of RANKING_MODES
+            k (int): Number of results needed
+            candidate_bits (int): Filter result of the same query
+
+        Returns:
+            list: Best ``k`` (recipe id, score) pairs
+        """
+        version = ranking.index.version
+        key = ("ranked",) + query_key(selected_ingredients, search_query, mode)
+        # (k ranked, results): usable when it is long enough or holds every match
+        entry = self.get(version, key,
+                         usable=lambda entry: k <= entry[0] or len(entry[1]) < entry[0])
+        if entry is None:
+            entry = (k, ranking.top_k(selected_ingredients, candidate_bits, k, mode))
+            self.put(version, key, entry)
+        return entry[1][:k]
@@ -0,0 +1,113 @@
+"""
+ranking.py - Single-pass top-k ranking of filtered recipes
+จัดอันดับสูตรอาหารที่ผ่านตัวกรอง โดยคำนวณคะแนนครั้งเดียวและเลือกเฉพาะ k อันดับแรก
+"""
+
+import heapq
+import math
+from itertools import islice
+
+from recipe_index import ingredient_key, iter_ids
+
+# mode -> label shown in the app
+RANKING_MODES = {
+    "selected": "Fraction of selected ingredients",
+    "idf": "Rare ingredients count more (IDF)",
+    "coverage": "Fraction of the recipe I already have",
+}
+DEFAULT_MODE = "selected"
+
+
+class RankingEngine:
+    """
+    Scores candidate recipes once and returns only the best k
+
+    Scores are accumulated by walking the posting bitset of each selected
+    ingredient, so each candidate is scored exactly once per query, and
+    ``heapq.nlargest`` keeps only ``k`` of them instead of sorting the
+    whole result set. Ties keep corpus order, like a stable sort.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        total = max(1, len(index))
+        # Inverse document frequency of each canonical ingredient
+        self.idf = {
+            term: math.log(1 + total / max(1, index.document_frequency(term)))
+            for term in index.vocabulary
+        }
+
+    def weights(self, selected_ingredients, mode=DEFAULT_MODE):
+        """
+        Weight of each selected canonical ingredient
+
+        Args:
+            selected_ingredients (iterable): Selected ingredient names
+            mode (str): One of RANKING_MODES
+
+        Returns:
+            dict: canonical id -> weight
+        """
+        keys = {ingredient_key(ing) for ing in selected_ingredients}
+        keys.discard("")
+        # Sorted so the float sums (and ties) do not depend on selection order
+        keys = sorted(keys)
+        if mode == "idf":
+            return {key: self.idf.get(key, 0.0) for key in keys}
+        return {key: 1.0 for key in keys}
+
+    def scores(self, selected_ingredients, candidate_bits, mode=DEFAULT_MODE):
+        """
+        Score every candidate recipe once
+
+        Args:
+            selected_ingredients (iterable): Selected ingredient names
+            candidate_bits (int): Bitset of recipes passing the filters
+            mode (str): "selected", "idf" or "coverage"
+
+        Returns:
+            dict: recipe id -> score between 0 and 1
+        """
+        if mode not in RANKING_MODES:
+            raise ValueError(f"Unknown ranking mode: {mode}")
+
+        weights = self.weights(selected_ingredients, mode)
+        totals = {}
+        for key, weight in weights.items():
+            for rid in iter_ids(self.index.postings(key) & candidate_bits):
+                totals[rid] = totals.get(rid, 0.0) + weight
+
+        if mode == "coverage":
+            counts = self.index.ingredient_counts
+            return {rid: matched / counts[rid] if counts[rid] else 0.0
+                    for rid, matched in totals.items()}
+
+        weight_sum = sum(weights.values())
+        if not weight_sum:
+            return {}
+        return {rid: matched / weight_sum for rid, matched in totals.items()}
+
+    def top_k(self, selected_ingredients, candidate_bits, k, mode=DEFAULT_MODE):
+        """
+        Best ``k`` candidates with their scores
+
+        Without selected ingredients there is nothing to score and the
+        first ``k`` candidates are returned in corpus order.
+
+        Args:
+            selected_ingredients (iterable): Selected ingredient names
+            candidate_bits (int): Bitset of recipes passing the filters
+            k (int): Number of results wanted
+            mode (str): One of RANKING_MODES
+
+        Returns:
+            list: (recipe id, score) pairs, best first
+        """
+        selected = list(selected_ingredients)
+        if not selected:
+            return [(rid, None) for rid in islice(iter_ids(candidate_bits), k)]
+
+        scores = self.scores(selected, candidate_bits, mode)
+        return heapq.nlargest(
+            k, scores.items(), key=lambda item: (item[1], -item[0])
+        )
@@ -0,0 +1,377 @@
+"""
+recipe_api.py - Read-only JSON API over the recipe corpus
+API แบบ JSON (อ่านอย่างเดียว) สำหรับค้นหา กรองตามวัตถุดิบ จัดอันดับ และดูรายละเอียดสูตรอาหาร
+
+Serves the same recipes, filters and scores as the Streamlit app
+(RecipeIndex bitset filters and RankingEngine scores) to any HTTP client. The corpus is loaded once per worker
+process from the compiled snapshot (recipe_snapshot.py), whose pages all
+workers share, and reopened when the recipe store's version changes.
+
+Every response carries an ETag derived from the corpus version, so clients
+and caches can revalidate with If-None-Match and get a 304 without the
+query running again. Filter and ranking results are also kept in a
+per-worker LRU (query_cache.py), so a query another client already asked
+is not recomputed. JSON bodies are gzip-compressed for clients that
+accept it.
+
+Endpoints:
+    GET /api/version                    corpus version and recipe count
+    GET /api/search?q=ผัด               name/ingredient text search
+    GET /api/recipes?ingredients=ไก่,กระเทียม&q=&rank=selected
+                                        ingredient filter, ranked by RANKING_MODES
+    GET /api/recipes/<id>               recipe detail
+    GET /api/ingredients                canonical ingredients with recipe counts
+    GET /api/cache                      query cache statistics of the answering worker
+    (list endpoints take page=1&per_page=20)
+
+Run:
+    python recipe_api.py --workers 4 --port 8000     # gunicorn when installed
+    gunicorn -w 4 -k gthread --threads 4 --preload -b 0.0.0.0:8000 recipe_api:app
+    RECIPE_DB=/path/to/recipes.db python recipe_api.py
+"""
+
+import argparse
+import gzip
+import os
+import sys
+import threading
+import time
+from functools import wraps
+from itertools import islice
+from pathlib import Path
+
+from flask import Flask, abort, jsonify, request
+from werkzeug.exceptions import HTTPException
+
+sys.path.insert(0, str(Path(__file__).parent / "1"))
+
+from query_cache import QueryCache
+from ranking import DEFAULT_MODE, RANKING_MODES, RankingEngine
+from recipe_index import iter_ids, popcount
+from recipe_snapshot import SnapshotRecipeIndex, open_snapshot
+from recipe_store import DEFAULT_DB_PATH, RecipeStore
+
+RECIPES_CACHE_FILE = Path(__file__).parent / "recipes_cache.json"
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+# How often a worker asks the store whether the corpus changed
+RELOAD_CHECK_SECONDS = 5
+# Smaller bodies gain little from compression
+MIN_GZIP_BYTES = 512
+GZIP_LEVEL = 6
+
+app = Flask(__name__)
+# Thai text as UTF-8 is half the size of \u escapes
+app.json.ensure_ascii = False
+
+
+class Corpus:
+    """Recipes, ingredient index and ranking engine of one store version"""
+
+    def __init__(self, store):
+        # Memory-mapped: all workers share the snapshot's pages
+        self.snapshot = open_snapshot(store)
+        self.store_version = self.snapshot.store_version
+        self.index = SnapshotRecipeIndex(self.snapshot)
+        self.recipes = self.index.recipes
+        self.ranking = RankingEngine(self.index)
+        # Same value in every worker: the store version is shared and the
+        # index version is a content hash
+        self.etag = f"{self.store_version}-{self.index.version}"
+        self.checked_at = time.monotonic()
+        # Requests still reading this corpus, and whether it was replaced
+        self._lock = threading.Lock()
+        self._readers = 0
+        self._retired = False
+
+    def acquire(self):
+        """Register a request reading this corpus; False once it was replaced"""
+        with self._lock:
+            if self._retired:
+                return False
+            self._readers += 1
+            return True
+
+    def release(self):
+        """End a request; the last one on a replaced corpus unmaps its snapshot"""
+        with self._lock:
+            self._readers -= 1
+            close = self._retired and not self._readers
+        if close:
+            self.snapshot.close()
+
+    def retire(self):
+        """Mark as replaced; the snapshot is closed once no request reads it"""
+        with self._lock:
+            self._retired = True
+            close = not self._readers
+        if close:
+            self.snapshot.close()
+
+
+_store = None
+_corpus = None
+_corpus_lock = threading.Lock()
+# Shared by all threads of this worker; emptied when the corpus version changes
+_query_cache = QueryCache()
+
+
+def get_corpus():
+    """
+    Current corpus of this worker, reloaded when the store version changes
+
+    Returns:
+        Corpus: Shared, read-only corpus (replaced, never mutated)
+    """
+    global _store, _corpus
+    corpus = _corpus
+    if corpus is not None and time.monotonic() - corpus.checked_at < RELOAD_CHECK_SECONDS:
+        return corpus
+
+    with _corpus_lock:
+        if _store is None:
+            _store = RecipeStore(os.environ.get("RECIPE_DB") or DEFAULT_DB_PATH)
+            # Seed an empty store from the JSON cache (one-time import)
+            if _store.count() == 0 and RECIPES_CACHE_FILE.exists():
+                _store.import_json(RECIPES_CACHE_FILE)
+        if _corpus is None or _store.version() != _corpus.store_version:
+            previous, _corpus = _corpus, Corpus(_store)
+            if previous is not None:
+                previous.retire()
+            print(f"📚 Loaded {len(_corpus.recipes)} recipes (version {_corpus.etag})")
+        else:
+            _corpus.checked_at = time.monotonic()
+        return _corpus
+
+
+def conditional(view):
+    """
+    Answer If-None-Match with 304 before running the view
+
+    The view receives the corpus as its first argument; its response gets
+    the corpus ETag and must be revalidated by caches on every use.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        corpus = get_corpus()
+        # Replaced between the lookup and now: take the new one
+        while not corpus.acquire():
+            corpus = get_corpus()
+        try:
+            if request.if_none_match.contains_weak(corpus.etag):
+                response = app.response_class(status=304)
+            else:
+                response = view(corpus, *args, **kwargs)
+        finally:
+            corpus.release()
+        response.set_etag(corpus.etag, weak=True)
+        response.headers["Cache-Control"] = "public, no-cache"
+        return response
+    return wrapper
+
+
+# ==========================================
+# 🔧 REQUEST HELPERS
+# ==========================================
+
+def page_args():
+    """Validated (page, per_page) query parameters"""
+    page = request.args.get("page", 1, type=int)
+    per_page = request.args.get("per_page", DEFAULT_PER_PAGE, type=int)
+    if page < 1:
+        abort(400, description="page must be 1 or more")
+    if not 1 <= per_page <= MAX_PER_PAGE:
+        abort(400, description=f"per_page must be between 1 and {MAX_PER_PAGE}")
+    return page, per_page
+
+
+def selected_ingredients():
+    """Ingredients from ?ingredients=a,b and/or repeated ?ingredients= parameters"""
+    names = []
+    for value in request.args.getlist("ingredients"):
+        names.extend(part.strip() for part in value.split(",") if part.strip())
+    return list(dict.fromkeys(names))
+
+
+def recipe_summary(corpus, rid, score=None):
+    """Compact result entry (the fields of a result card)"""
+    recipe = corpus.index.recipes[rid]
+    return {
+        "id": recipe.get("id", rid),
+        "name": recipe.get("name", ""),
+        "url": recipe.get("url"),
+        "image": recipe.get("image"),
+        "time": recipe.get("time"),
+        "difficulty": recipe.get("difficulty"),
+        "ingredient_count": len(recipe.get("ingredients", [])),
+        "score": score,
+    }
+
+
+def paginated(corpus, total, page, per_page, results, **extra):
+    """JSON response for one page of a result list"""
+    return jsonify({
+        "version": corpus.etag,
+        "total": total,
+        "page": page,
+        "per_page": per_page,
+        "pages": max(1, -(-total // per_page)),
+        **extra,
+        "results": results,
+    })
+
+
+# ==========================================
+# 🌐 ENDPOINTS
+# ==========================================
+
+@app.get("/api/version")
+@conditional
+def version(corpus):
+    return jsonify({"version": corpus.etag, "recipes": len(corpus.recipes)})
+
+
+@app.get("/api/search")
+@conditional
+def search(corpus):
+    """Recipes whose name or ingredients contain ``q``, in corpus order"""
+    query = request.args.get("q", "")
+    page, per_page = page_args()
+    bits = _query_cache.filter_bits(corpus.index, [], query)
+    start = (page - 1) * per_page
+    results = [recipe_summary(corpus, rid) for rid in islice(iter_ids(bits), start, start + per_page)]
+    suggestions = corpus.index.suggest_searches(query) if query and not bits else []
+    return paginated(corpus, popcount(bits), page, per_page, results,
+                     query=query, suggestions=suggestions)
+
+
+@app.get("/api/recipes")
+@conditional
+def recipes(corpus):
+    """Recipes with any selected ingredient (and ``q``), best match first"""
+    selected = selected_ingredients()
+    query = request.args.get("q", "")
+    mode = request.args.get("rank", DEFAULT_MODE)
+    if mode not in RANKING_MODES:
+        abort(400, description=f"rank must be one of {', '.join(RANKING_MODES)}")
+    page, per_page = page_args()
+
+    bits = _query_cache.filter_bits(corpus.index, selected, query)
+    # Only the recipes up to the requested page are selected from the heap
+    ranked = _query_cache.top_k(corpus.ranking, selected, query, mode, page * per_page, bits)
+    results = [recipe_summary(corpus, rid, score) for rid, score in ranked[(page - 1) * per_page:]]
+    return paginated(corpus, popcount(bits), page, per_page, results,
+                     ingredients=selected, query=query, rank=mode)
+
+
+@app.get("/api/recipes/<int:recipe_id>")
+@conditional
+def recipe_detail(corpus, recipe_id):
+    rid = corpus.index.position(recipe_id)
+    if rid is None:
+        abort(404, description=f"No recipe with id {recipe_id}")
+    recipe = corpus.index.recipes[rid]
+    detail = recipe_summary(corpus, rid)
+    del detail["score"]
+    detail.update({
+        "ingredients": recipe.get("ingredients", []),
+        "canonical_ingredients": recipe.get("canonical_ingredients", []),
+        "steps": recipe.get("steps", []),
+        "source_urls": recipe.get("source_urls", [recipe["url"]] if recipe.get("url") else []),
+        "aliases": recipe.get("aliases", []),
+    })
+    return jsonify(detail)
+
+
+@app.get("/api/ingredients")
+@conditional
+def ingredients(corpus):
+    """Canonical ingredients, most used first"""
+    page, per_page = page_args()
+    index = corpus.index
+    counts = _query_cache.get_or_compute(index.version, ("ingredients",), lambda: sorted(
+        ((term, index.document_frequency(term)) for term in index.vocabulary),
+        key=lambda item: (-item[1], item[0])
+    ))
+    start = (page - 1) * per_page
+    results = [{"name": term, "recipes": count} for term, count in counts[start:start + per_page]]
+    return paginated(corpus, len(counts), page, per_page, results)
+
+
+@app.get("/api/cache")
+def cache_stats():
+    """Query cache statistics (per worker process, never cached)"""
+    get_corpus()
+    response = jsonify({"pid": os.getpid(), **_query_cache.stats()})
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@app.errorhandler(HTTPException)
+def json_error(error):
+    response = jsonify({"error": error.name, "message": error.description})
+    response.status_code = error.code
+    return response
+
+
+@app.after_request
+def compress(response):
+    """gzip JSON bodies for clients that accept it"""
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.direct_passthrough
+            or "Content-Encoding" in response.headers
+            or "gzip" not in request.accept_encodings):
+        return response
+    data = response.get_data()
+    if len(data) < MIN_GZIP_BYTES:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=GZIP_LEVEL))
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+def serve(host="127.0.0.1", port=8000, workers=1, threads=4):
+    """
+    Run the API with gunicorn workers, or Flask's threaded server without gunicorn
+
+    The corpus is loaded before the workers fork, so they share its memory
+    until the first reload.
+
+    Args:
+        host (str): Bind address
+        port (int): Port
+        workers (int): Worker processes
+        threads (int): Threads per worker (keep-alive connections)
+    """
+    get_corpus()
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("ℹ️ gunicorn is not installed: serving from one threaded process")
+        app.run(host=host, port=port, threaded=True)
+        return
+
+    class APIServer(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "gthread")
+            self.cfg.set("threads", threads)
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            return app
+
+    print(f"🚀 Serving on http://{host}:{port} with {workers} workers x {threads} threads")
+    APIServer().run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only JSON API over the recipe corpus")
+    parser.add_argument("--host", default="127.0.0.1", help="bind address")
+    parser.add_argument("--port", type=int, default=8000, help="port")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="worker processes (gunicorn)")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads)
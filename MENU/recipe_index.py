@@ -0,0 +1,375 @@
+"""
+recipe_index.py - Inverted ingredient index for fast recipe filtering
+ดัชนีวัตถุดิบสำหรับกรองและให้คะแนนสูตรอาหารอย่างรวดเร็ว
+"""
+
+import hashlib
+from functools import lru_cache
+
+import numpy as np
+
+from fuzzy_search import FuzzyMatcher
+from ingredient_normalizer import canonical_name, canonical_names
+
+
+def normalize_term(term):
+    """Normalize a search term the same way the app compares text"""
+    return (term or "").strip().lower()
+
+
+@lru_cache(maxsize=1 << 16)
+def ingredient_key(term):
+    """Map a selected ingredient (or a synonym such as "หมูสับ") to its canonical id"""
+    return canonical_name(term) or normalize_term(term)
+
+
+if hasattr(int, "bit_count"):
+    def popcount(bits):
+        """Count the recipes contained in a bitset"""
+        return bits.bit_count()
+else:  # Python < 3.10
+    def popcount(bits):
+        """Count the recipes contained in a bitset"""
+        return bin(bits).count("1")
+
+
+def bits_to_ids(bits):
+    """
+    Recipe ids of a bitset as an ascending int64 array
+
+    The bitset is unpacked in one vectorized pass; clearing bits one at a
+    time copies the whole int per id and grows with the corpus size.
+    """
+    if not bits:
+        return np.zeros(0, dtype=np.int64)
+    raw = np.frombuffer(bits.to_bytes(-(-bits.bit_length() // 8), "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+def ids_to_bits(ids):
+    """Bitset of recipe ids (any iterable of non-negative ints)"""
+    ids = np.fromiter(ids, dtype=np.int64) if not isinstance(ids, np.ndarray) else ids
+    if not ids.size:
+        return 0
+    mask = np.zeros(int(ids.max()) + 1, dtype=bool)
+    mask[ids] = True
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def iter_ids(bits):
+    """Iterate over recipe ids from a bitset in ascending order"""
+    return iter(bits_to_ids(bits).tolist())
+
+
+def trigrams(text):
+    """Set of character trigrams of a text (Thai needs no word segmentation)"""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def corpus_version(recipes):
+    """
+    Compute a short fingerprint of a recipe list
+
+    Args:
+        recipes (list): List of recipe dictionaries
+
+    Returns:
+        str: Hex digest that changes whenever names or ingredients change
+    """
+    digest = hashlib.sha1()
+    for recipe in recipes:
+        digest.update(recipe.get("name", "").encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update("\x1f".join(recipe.get("ingredients", [])).encode("utf-8"))
+        digest.update(b"\x1e")
+    return digest.hexdigest()[:16]
+
+
+def recipe_canonical_ingredients(recipe):
+    """Canonical ingredient names stored at ingest time (parsed if missing)"""
+    names = recipe.get("canonical_ingredients")
+    if names is None:
+        names = canonical_names(recipe.get("ingredients", []))
+    return names
+
+
+def all_ingredients(recipes):
+    """Sorted unique canonical ingredient names of a recipe list"""
+    names = set()
+    for recipe in recipes:
+        names.update(recipe_canonical_ingredients(recipe))
+    return sorted(names)
+
+
+class RecipeIndex:
+    """
+    Maps normalized ingredient terms to bitsets of recipe ids.
+
+    Vocabulary terms are the canonical ingredient names parsed at ingest
+    time; bit ``i`` of a posting bitset is set when recipe ``i`` lists that
+    canonical ingredient. Selected terms are canonicalized the same way, so
+    matching compares ids instead of searching ingredient strings.
+    """
+
+    def __init__(self, recipes):
+        self.recipes = list(recipes)
+        self.version = corpus_version(self.recipes)
+        self.all_bits = (1 << len(self.recipes)) - 1
+
+        # Lowercased text is built once here instead of on every rerun
+        self._ingredient_texts = [
+            " ".join(r.get("ingredients", [])).lower() for r in self.recipes
+        ]
+        self._name_texts = [r.get("name", "").lower() for r in self.recipes]
+
+        # Character trigram -> bitset of recipes whose name or ingredient
+        # text contains it; "\n" keeps trigrams from spanning both fields
+        # Ids are collected per key first and packed into one int each
+        trigram_ids = {}
+        for rid in range(len(self.recipes)):
+            text = f"{self._name_texts[rid]}\n{self._ingredient_texts[rid]}"
+            for gram in trigrams(text):
+                trigram_ids.setdefault(gram, []).append(rid)
+        self._trigrams = {gram: ids_to_bits(ids) for gram, ids in trigram_ids.items()}
+        # Database ids (recipes loaded from RecipeStore) -> positions
+        self._positions = {
+            r["id"]: rid for rid, r in enumerate(self.recipes) if "id" in r
+        }
+
+        posting_ids = {}
+        # Number of distinct canonical ingredients of each recipe
+        self.ingredient_counts = []
+        for rid, recipe in enumerate(self.recipes):
+            keys = {ingredient_key(name) for name in recipe_canonical_ingredients(recipe)}
+            self.ingredient_counts.append(len(keys))
+            for key in keys:
+                posting_ids.setdefault(key, []).append(rid)
+        self._postings = {key: ids_to_bits(ids) for key, ids in posting_ids.items()}
+        self.vocabulary = sorted(self._postings)
+
+        # Typo-tolerant matchers are built on first use
+        self._ingredient_matcher = None
+        self._search_matcher = None
+
+    def __len__(self):
+        return len(self.recipes)
+
+    def postings(self, term):
+        """
+        Get the bitset of recipes that use an ingredient
+
+        Args:
+            term (str): Ingredient term (any case)
+
+        Returns:
+            int: Bitset of recipe ids
+        """
+        return self._postings.get(ingredient_key(term), 0)
+
+    def document_frequency(self, term):
+        """Number of recipes that use an ingredient"""
+        return popcount(self.postings(term))
+
+    def posting_ids(self, term):
+        """Ids of the recipes that use an ingredient, as an int64 array"""
+        return bits_to_ids(self.postings(term))
+
+    def search_bits(self, search_query):
+        """
+        Get the bitset of recipes whose name or ingredients contain the query
+
+        The posting bitsets of the query's trigrams are intersected first,
+        and only the surviving candidates are checked with a substring
+        test, so cost depends on how selective the query is.
+
+        Args:
+            search_query (str): Search query string
+
+        Returns:
+            int: Bitset of matching recipe ids
+        """
+        query = normalize_term(search_query)
+        if not query:
+            return self.all_bits
+
+        candidates = self.all_bits
+        if len(query) >= 3:
+            # Rarest trigrams first so the intersection empties early
+            postings = sorted(
+                (self._trigrams.get(gram, 0) for gram in trigrams(query)),
+                key=popcount
+            )
+            for bits in postings:
+                candidates &= bits
+                if not candidates:
+                    return 0
+
+        return ids_to_bits(
+            rid for rid in iter_ids(candidates)
+            if query in self._name_texts[rid] or query in self._ingredient_texts[rid]
+        )
+
+    def ingredient_matcher(self):
+        """FuzzyMatcher over the canonical ingredient vocabulary"""
+        if self._ingredient_matcher is None:
+            self._ingredient_matcher = FuzzyMatcher(
+                {term: self.document_frequency(term) for term in self.vocabulary}
+            )
+        return self._ingredient_matcher
+
+    def search_matcher(self):
+        """FuzzyMatcher over ingredient names and words of recipe names"""
+        if self._search_matcher is None:
+            counts = {term: self.document_frequency(term) for term in self.vocabulary}
+            for name in self._name_texts:
+                for word in set(name.split()):
+                    if len(word) >= 2:
+                        counts[word] = counts.get(word, 0) + 1
+            self._search_matcher = FuzzyMatcher(counts)
+        return self._search_matcher
+
+    def suggest_ingredients(self, term, limit=5):
+        """
+        Vocabulary ingredients closest to a possibly misspelled term
+
+        Args:
+            term (str): Typed ingredient, e.g. "กระเที่ยม"
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: Canonical ingredient names, exact match first
+        """
+        key = ingredient_key(term)
+        if not key:
+            return []
+        exact = [key] if key in self._postings else []
+        suggestions = self.ingredient_matcher().suggest(key, limit=limit)
+        return (exact + [s for s in suggestions if s != key])[:limit]
+
+    def suggest_searches(self, search_query, limit=5):
+        """
+        "Did you mean" queries for a search that found nothing
+
+        Args:
+            search_query (str): Search query string
+            limit (int): Maximum number of suggestions
+
+        Returns:
+            list: Terms that return at least one recipe, closest first
+        """
+        query = normalize_term(search_query)
+        if not query:
+            return []
+        suggestions = self.search_matcher().suggest(query, limit=limit * 2)
+        return [s for s in suggestions if self.search_bits(s)][:limit]
+
+    def position(self, recipe_id):
+        """Position of a RecipeStore id in this index, or None"""
+        return self._positions.get(recipe_id)
+
+    def filter_bits(self, selected_ingredients, search_query="", search_bits=None):
+        """
+        Get the bitset of recipes matching the current filters
+
+        Args:
+            selected_ingredients (iterable): Selected ingredient names
+            search_query (str): Search query string
+            search_bits (int): Precomputed search result of search_query
+                (e.g. from the query cache); skips the search
+
+        Returns:
+            int: Bitset of matching recipe ids
+        """
+        if search_bits is not None:
+            bits = search_bits
+        else:
+            bits = self.search_bits(search_query) if search_query else self.all_bits
+
+        if selected_ingredients:
+            # A recipe matches when it contains any selected ingredient
+            any_bits = 0
+            for ing in selected_ingredients:
+                any_bits |= self.postings(ing)
+            bits &= any_bits
+
+        return bits
+
+    def _facet_filters(self, selected_ingredients, search_query, search_bits):
+        """(search bits, current result bits, selected keys) for facet counting"""
+        if search_bits is None:
+            search_bits = self.search_bits(search_query) if search_query else self.all_bits
+        selected_keys = {ingredient_key(ing) for ing in selected_ingredients}
+        # Without a selection nothing is shown "because of" an ingredient yet:
+        # the first one picked narrows the search to its own recipes
+        current = 0
+        if selected_keys:
+            current = self.filter_bits(selected_keys, search_bits=search_bits)
+        return search_bits, current, selected_keys
+
+    def facet_counts(self, selected_ingredients, search_query="", search_bits=None):
+        """
+        Count the results each ingredient option would give if it were selected
+
+        A recipe matches when it contains any selected ingredient, so adding
+        a term brings in the recipes of the current search that use it and
+        are not shown yet. Each term costs one AND and one popcount of its
+        posting bitset instead of a pass over the recipes.
+
+        Args:
+            selected_ingredients (iterable): Selected ingredient names
+            search_query (str): Search query string
+            search_bits (int): Precomputed search result (see filter_bits)
+
+        Returns:
+            dict: vocabulary term -> result count with the term selected.
+                Terms used by no recipe of the current search are left out
+                (selecting them cannot change the results); selected terms
+                map to the current result count.
+        """
+        search_bits, current, selected_keys = self._facet_filters(
+            selected_ingredients, search_query, search_bits
+        )
+        shown = popcount(current)
+        remaining = search_bits & ~current
+        counts = {}
+        for term in self.vocabulary:
+            if term in selected_keys:
+                counts[term] = shown
+                continue
+            bits = self._postings[term]
+            if bits & search_bits:
+                counts[term] = shown + popcount(bits & remaining)
+        return counts
+
+    def filter(self, selected_ingredients, search_query=""):
+        """Get the matching recipe ids in corpus order"""
+        return list(iter_ids(self.filter_bits(selected_ingredients, search_query)))
+
+    def match_counts(self, selected_ingredients, candidate_bits=None):
+        """
+        Count how many selected ingredients each candidate recipe contains
+
+        Args:
+            selected_ingredients (iterable): Selected ingredient names
+            candidate_bits (int): Restrict counting to these recipes
+
+        Returns:
+            dict: recipe id -> number of selected ingredients it contains
+        """
+        if candidate_bits is None:
+            candidate_bits = self.all_bits
+
+        counts = {}
+        for ing in set(selected_ingredients):
+            for rid in iter_ids(self.postings(ing) & candidate_bits):
+                counts[rid] = counts.get(rid, 0) + 1
+        return counts
+
+    def match_score(self, rid, selected_ingredients):
+        """Fraction of selected ingredients found in one recipe"""
+        selected = set(selected_ingredients)
+        if not selected:
+            return 0
+        mask = 1 << rid
+        matches = sum(1 for ing in selected if self.postings(ing) & mask)
+        return matches / len(selected)
@@ -0,0 +1,608 @@
+"""
+recipe_snapshot.py - Compiled, memory-mapped snapshot of the recipe corpus
+สแนปช็อตสูตรอาหารแบบคอมไพล์แล้ว เปิดด้วย mmap แบบอ่านอย่างเดียว ทุกเซสชันและทุกโปรเซสใช้ข้อมูลชุดเดียวกันในหน่วยความจำ
+
+preload_recipes.py compiles the recipe store into one binary file. It
+holds a deduplicated UTF-8 string table, fixed-width columns and offset
+arrays for every recipe field and list, the ingredient vocabulary, and
+the ingredient and trigram postings of RecipeIndex. Opening it maps the
+file read-only and wraps each section in a numpy view without reading
+it, so opening takes the same time at any corpus size. Every process that
+opens the file (Streamlit, API workers) shares one copy in the OS page
+cache. Recipes are decoded into dictionaries only when accessed, and
+posting bitsets only when a query uses them.
+
+File layout:
+    8 bytes    magic b"RSNAP001"
+    8 bytes    header length (little-endian uint64)
+    header     JSON: versions, recipe count, section offsets/dtypes/shapes
+    sections   8-byte aligned little-endian arrays
+
+Each store version gets its own file (recipes.<version>.snapshot), so a
+recompile never replaces a file that another process still has mapped.
+
+Usage:
+    python recipe_snapshot.py          # compile recipes.db -> recipes.<version>.snapshot
+"""
+
+import json
+import mmap
+import struct
+import sys
+import time
+from bisect import bisect_left
+from collections.abc import Mapping, Sequence
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent / "1"))
+
+from recipe_cache import atomic_writer
+from recipe_index import RecipeIndex, ingredient_key, popcount
+from recipe_store import RecipeStore
+
+MAGIC = b"RSNAP001"
+# String id of a missing (None) value
+NONE = 0xFFFFFFFF
+RECIPE_FIELDS = ("name", "url", "image", "time", "difficulty")
+LIST_FIELDS = ("ingredients", "steps", "canonical_ingredients", "source_urls", "aliases")
+ITEM_FIELDS = ("text", "name", "raw_name", "quantity", "unit", "note")
+
+
+def _align(offset, alignment=8):
+    return -(-offset // alignment) * alignment
+
+
+def _bits_to_ids(bits, n):
+    """Recipe ids of a bitset as a uint32 array"""
+    raw = np.frombuffer(bits.to_bytes(max(1, -(-n // 8)), "little"), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little")[:n]).astype(np.uint32)
+
+
+def _ids_to_bits(ids, n):
+    """Bitset of a recipe id array"""
+    mask = np.zeros(n, dtype=bool)
+    mask[ids] = True
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
+
+
+def _bits_to_mask(bits, n):
+    """Boolean recipe mask of a bitset"""
+    raw = np.frombuffer(bits.to_bytes((n + 7) // 8, "little"), dtype=np.uint8)
+    return np.unpackbits(raw, count=n, bitorder="little").view(bool)
+
+
+def default_snapshot_path(store, version=None):
+    """
+    Snapshot file of one store version, next to the store's database
+
+    Args:
+        store (RecipeStore): Recipe store
+        version (int): Store version (default: the current one)
+
+    Returns:
+        Path: e.g. recipes.db -> recipes.12.snapshot
+    """
+    if version is None:
+        version = store.version()
+    db_path = Path(store.path)
+    return db_path.with_name(f"{db_path.stem}.{version}.snapshot")
+
+
+def remove_stale_snapshots(store, keep):
+    """
+    Delete the store's snapshot files other than ``keep``
+
+    A file still mapped by another process cannot be deleted on Windows;
+    it is left for the next call.
+
+    Returns:
+        int: Number of files deleted
+    """
+    db_path = Path(store.path)
+    keep = Path(keep).resolve()
+    # recipes.snapshot is the unversioned name of older releases
+    candidates = list(db_path.parent.glob(f"{db_path.stem}.*.snapshot"))
+    candidates.append(db_path.with_suffix(".snapshot"))
+    removed = 0
+    for path in candidates:
+        if not path.exists() or path.resolve() == keep:
+            continue
+        try:
+            path.unlink()
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+
+# ==========================================
+# 🛠️ COMPILER
+# ==========================================
+
+class _StringTable:
+    """Deduplicated UTF-8 strings addressed by id"""
+
+    def __init__(self):
+        self.ids = {}
+        self.chunks = []
+        self.offsets = [0]
+
+    def add(self, text):
+        if text is None:
+            return NONE
+        text = str(text)
+        sid = self.ids.get(text)
+        if sid is None:
+            data = text.encode("utf-8")
+            sid = self.ids[text] = len(self.chunks)
+            self.chunks.append(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+        return sid
+
+
+def _offsets(lists):
+    """Start of each list in the flattened values, plus the total length"""
+    offsets = np.zeros(len(lists) + 1, dtype=np.uint64)
+    np.cumsum([len(values) for values in lists], out=offsets[1:])
+    return offsets
+
+
+def _csr(lists, dtype=np.uint32):
+    """(offsets, flat values) for a list of lists"""
+    offsets = _offsets(lists)
+    flat = np.fromiter((v for values in lists for v in values), dtype=dtype, count=int(offsets[-1]))
+    return offsets, flat
+
+
+def compile_snapshot(recipes, path, store_version=None):
+    """
+    Compile recipes and their RecipeIndex into a snapshot file
+
+    The file is written to a temporary name and renamed over ``path``, so
+    processes that have the old snapshot mapped keep reading it intact.
+
+    Args:
+        recipes (list): Recipe dictionaries (as loaded from the store)
+        path (str or Path): Snapshot file to write
+        store_version (int): Store version the recipes were loaded at
+
+    Returns:
+        Path: The written snapshot
+    """
+    path = Path(path)
+    index = RecipeIndex(recipes)
+    n = len(index)
+    strings = _StringTable()
+    sections = {}
+
+    ids = np.array([recipe.get("id", -1) for recipe in index.recipes], dtype=np.int64)
+    sections["recipe_ids"] = ids
+    order = np.argsort(ids, kind="stable")
+    sections["id_order"] = order.astype(np.uint32)
+    sections["sorted_ids"] = ids[order]
+    sections["recipe_fields"] = np.array(
+        [[strings.add(recipe.get(field)) for field in RECIPE_FIELDS] for recipe in index.recipes],
+        dtype=np.uint32,
+    ).reshape(n, len(RECIPE_FIELDS))
+    for field in LIST_FIELDS:
+        offsets, values = _csr([
+            [strings.add(text) for text in recipe.get(field) or []] for recipe in index.recipes
+        ])
+        sections[f"{field}_offsets"] = offsets
+        sections[field] = values
+
+    items = [recipe.get("ingredients_structured", []) for recipe in index.recipes]
+    sections["item_offsets"] = _offsets(items)
+    flat_items = [entry for entries in items for entry in entries]
+    sections["item_strings"] = np.array(
+        [[strings.add(entry.get(field)) for field in ITEM_FIELDS] for entry in flat_items],
+        dtype=np.uint32,
+    ).reshape(len(flat_items), len(ITEM_FIELDS))
+    sections["item_amounts"] = np.array(
+        [np.nan if entry.get("amount") is None else entry["amount"] for entry in flat_items],
+        dtype=np.float64,
+    )
+
+    # Search index: lowercased texts, ingredient postings, trigram postings
+    sections["name_texts"] = np.array([strings.add(t) for t in index._name_texts], dtype=np.uint32)
+    sections["ingredient_texts"] = np.array(
+        [strings.add(t) for t in index._ingredient_texts], dtype=np.uint32
+    )
+    sections["ingredient_counts"] = np.array(index.ingredient_counts, dtype=np.uint32)
+    sections["vocabulary"] = np.array([strings.add(t) for t in index.vocabulary], dtype=np.uint32)
+    sections["posting_offsets"], sections["postings"] = _csr(
+        [_bits_to_ids(index._postings[term], n) for term in index.vocabulary]
+    )
+    # Sorted by UTF-8 bytes so lookups can bisect without decoding every key
+    grams = sorted(index._trigrams, key=lambda gram: gram.encode("utf-8"))
+    sections["trigram_keys"] = np.array([strings.add(g) for g in grams], dtype=np.uint32)
+    sections["trigram_offsets"], sections["trigram_postings"] = _csr(
+        [_bits_to_ids(index._trigrams[gram], n) for gram in grams]
+    )
+
+    sections["string_offsets"] = np.array(strings.offsets, dtype=np.uint64)
+    sections["strings"] = np.frombuffer(b"".join(strings.chunks), dtype=np.uint8)
+
+    layout = {}
+    offset = 0
+    for name, array in sections.items():
+        array = np.ascontiguousarray(array)
+        sections[name] = array
+        layout[name] = {"offset": offset, "dtype": array.dtype.str, "shape": list(array.shape)}
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({
+        "version": index.version,
+        "store_version": store_version,
+        "count": n,
+        "compiled_at": time.time(),
+        "sections": layout,
+    }).encode("utf-8")
+
+    with atomic_writer(path) as f:
+        f.write(MAGIC + struct.pack("<Q", len(header)) + header)
+        base = _align(16 + len(header))
+        f.write(b"\0" * (base - 16 - len(header)))
+        for name, array in sections.items():
+            f.seek(base + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(base + offset)
+    return path
+
+
+def compile_store_snapshot(store, path=None):
+    """Compile the current contents of a RecipeStore (default path: its versioned file)"""
+    version = store.version()
+    path = path or default_snapshot_path(store, version)
+    return compile_snapshot(store.load_recipes(), path, store_version=version)
+
+
+# ==========================================
+# 📖 READER
+# ==========================================
+
+class _LazySequence(Sequence):
+    """Read-only sequence whose items are decoded on access"""
+
+    def __init__(self, length, get):
+        self._length = length
+        self._get = get
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._get(j) for j in range(*i.indices(self._length))]
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError(i)
+        return self._get(i)
+
+
+class _PostingBits(Mapping):
+    """
+    Term -> recipe bitset over a posting section, built on first use
+
+    ``keys`` is either a dict term -> row or a sorted _LazySequence of
+    UTF-8 keys searched by bisection.
+    """
+
+    def __init__(self, keys, offsets, postings, n):
+        self._keys = keys
+        self._offsets = offsets
+        self._postings = postings
+        self._n = n
+        self._cache = {}
+
+    def row(self, key):
+        if isinstance(self._keys, dict):
+            return self._keys.get(key)
+        target = key.encode("utf-8")
+        row = bisect_left(self._keys, target)
+        return row if row < len(self._keys) and self._keys[row] == target else None
+
+    def ids(self, key):
+        """Recipe ids of a term as a (memory-mapped) uint32 array, or None"""
+        row = self.row(key)
+        if row is None:
+            return None
+        return self._postings[int(self._offsets[row]):int(self._offsets[row + 1])]
+
+    def count(self, key):
+        row = self.row(key)
+        return 0 if row is None else int(self._offsets[row + 1] - self._offsets[row])
+
+    def row_counts(self, mask=None):
+        """Number of recipes of each row that are set in a boolean recipe mask (or all)"""
+        if mask is None:
+            return np.diff(self._offsets.astype(np.int64))
+        hits = np.zeros(len(self._postings) + 1, dtype=np.int64)
+        np.cumsum(mask[self._postings], out=hits[1:])
+        offsets = self._offsets.astype(np.int64)
+        return hits[offsets[1:]] - hits[offsets[:-1]]
+
+    def __getitem__(self, key):
+        bits = self._cache.get(key)
+        if bits is None:
+            ids = self.ids(key)
+            if ids is None:
+                raise KeyError(key)
+            bits = self._cache[key] = _ids_to_bits(ids, self._n)
+        return bits
+
+    def __contains__(self, key):
+        return self.row(key) is not None
+
+    def __iter__(self):
+        if isinstance(self._keys, dict):
+            return iter(self._keys)
+        return (key.decode("utf-8") for key in self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class _IdPositions:
+    """RecipeStore id -> position, by binary search over the sorted id column"""
+
+    def __init__(self, sorted_ids, order):
+        self._sorted = sorted_ids
+        self._order = order
+
+    def get(self, recipe_id, default=None):
+        if not isinstance(recipe_id, (int, np.integer)) or recipe_id < 0:
+            return default
+        i = int(np.searchsorted(self._sorted, recipe_id))
+        if i < len(self._sorted) and self._sorted[i] == recipe_id:
+            return int(self._order[i])
+        return default
+
+
+class RecipeSnapshot:
+    """
+    Read-only, memory-mapped recipe snapshot
+
+    Attributes:
+        recipes (Sequence): Recipe dictionaries, decoded on access
+        version (str): corpus_version of the compiled recipes
+        store_version (int): RecipeStore version they were loaded at
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:8] != MAGIC:
+            raise ValueError(f"Not a recipe snapshot: {self.path}")
+        (header_length,) = struct.unpack("<Q", self._mmap[8:16])
+        header = json.loads(self._mmap[16:16 + header_length])
+        self.version = header["version"]
+        self.store_version = header["store_version"]
+        self.compiled_at = header["compiled_at"]
+        self._count = header["count"]
+
+        base = _align(16 + header_length)
+        self._sections = {}
+        for name, info in header["sections"].items():
+            shape = tuple(info["shape"])
+            self._sections[name] = np.frombuffer(
+                self._mmap, dtype=np.dtype(info["dtype"]), count=int(np.prod(shape)),
+                offset=base + info["offset"],
+            ).reshape(shape)
+        self._strings_base = base + header["sections"]["strings"]["offset"]
+        self._string_offsets = self._sections["string_offsets"]
+
+        self.recipes = _LazySequence(self._count, self.recipe)
+        self.name_texts = self._text_column("name_texts")
+        self.ingredient_texts = self._text_column("ingredient_texts")
+        self.ingredient_counts = self._sections["ingredient_counts"]
+        self.positions = _IdPositions(self._sections["sorted_ids"], self._sections["id_order"])
+        self._vocabulary = None
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        """
+        Unmap the file once the corpus it serves has been replaced
+
+        Nothing may read through this snapshot afterwards. Numpy views
+        already handed out (e.g. to a SnapshotRecipeIndex that is still
+        referenced) keep the mapping valid until they are garbage
+        collected, so closing never invalidates memory in use.
+        """
+        if self._mmap is None:
+            return
+        mapping, self._mmap = self._mmap, None
+        self._sections = {}
+        self._string_offsets = None
+        self.name_texts = self.ingredient_texts = None
+        self.ingredient_counts = None
+        self.positions = None
+        try:
+            mapping.close()
+        except BufferError:
+            pass
+
+    @property
+    def nbytes(self):
+        """Size of the mapped file"""
+        return len(self._mmap)
+
+    def string(self, sid):
+        """Decode one string id (None for a missing value)"""
+        sid = int(sid)
+        if sid == NONE:
+            return None
+        start = self._strings_base + int(self._string_offsets[sid])
+        end = self._strings_base + int(self._string_offsets[sid + 1])
+        return self._mmap[start:end].decode("utf-8")
+
+    def _raw_string(self, sid):
+        start = self._strings_base + int(self._string_offsets[sid])
+        return self._mmap[start:self._strings_base + int(self._string_offsets[sid + 1])]
+
+    def _text_column(self, name):
+        column = self._sections[name]
+        return _LazySequence(len(column), lambda i: self.string(column[i]))
+
+    def _list(self, field, rid):
+        offsets = self._sections[f"{field}_offsets"]
+        values = self._sections[field][int(offsets[rid]):int(offsets[rid + 1])]
+        return [self.string(sid) for sid in values]
+
+    def recipe(self, rid):
+        """
+        Decode one recipe
+
+        Returns:
+            dict: Recipe in the RecipeStore.load_recipes format
+        """
+        fields = dict(zip(RECIPE_FIELDS, map(self.string, self._sections["recipe_fields"][rid])))
+        recipe = {
+            "name": fields["name"],
+            "ingredients": self._list("ingredients", rid),
+            "steps": self._list("steps", rid),
+            "difficulty": fields["difficulty"],
+            "time": fields["time"],
+        }
+        recipe_id = int(self._sections["recipe_ids"][rid])
+        if recipe_id >= 0:
+            recipe = {"id": recipe_id, **recipe}
+        if fields["url"]:
+            recipe["url"] = fields["url"]
+        if fields["image"]:
+            recipe["image"] = fields["image"]
+        source_urls = self._list("source_urls", rid)
+        if source_urls:
+            recipe["source_urls"] = source_urls
+            recipe["aliases"] = self._list("aliases", rid)
+
+        offsets = self._sections["item_offsets"]
+        start, end = int(offsets[rid]), int(offsets[rid + 1])
+        amounts = self._sections["item_amounts"][start:end]
+        recipe["ingredients_structured"] = [
+            {**dict(zip(ITEM_FIELDS, map(self.string, row))),
+             "amount": None if np.isnan(amount) else float(amount)}
+            for row, amount in zip(self._sections["item_strings"][start:end], amounts)
+        ]
+        recipe["canonical_ingredients"] = self._list("canonical_ingredients", rid)
+        return recipe
+
+    @property
+    def vocabulary(self):
+        """Sorted canonical ingredient names (decoded once)"""
+        if self._vocabulary is None:
+            self._vocabulary = [self.string(sid) for sid in self._sections["vocabulary"]]
+        return self._vocabulary
+
+    def posting_bits(self):
+        """Lazy mapping canonical ingredient -> recipe bitset"""
+        rows = {term: row for row, term in enumerate(self.vocabulary)}
+        return _PostingBits(rows, self._sections["posting_offsets"],
+                            self._sections["postings"], self._count)
+
+    def trigram_bits(self):
+        """Lazy mapping trigram -> recipe bitset (keys are never decoded in bulk)"""
+        keys = self._sections["trigram_keys"]
+        return _PostingBits(_LazySequence(len(keys), lambda i: self._raw_string(keys[i])),
+                            self._sections["trigram_offsets"],
+                            self._sections["trigram_postings"], self._count)
+
+
+class SnapshotRecipeIndex(RecipeIndex):
+    """
+    RecipeIndex over a RecipeSnapshot
+
+    Nothing is rebuilt from the recipes: texts, postings and counts are
+    views into the mapped file, and a bitset is materialized (per process)
+    only for the terms and trigrams that queries touch.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.recipes = snapshot.recipes
+        self.version = snapshot.version
+        self.all_bits = (1 << len(snapshot)) - 1
+        self._name_texts = snapshot.name_texts
+        self._ingredient_texts = snapshot.ingredient_texts
+        self._trigrams = snapshot.trigram_bits()
+        self._positions = snapshot.positions
+        self._postings = snapshot.posting_bits()
+        self.ingredient_counts = snapshot.ingredient_counts
+        self.vocabulary = snapshot.vocabulary
+        self._ingredient_matcher = None
+        self._search_matcher = None
+
+    def document_frequency(self, term):
+        return self._postings.count(ingredient_key(term))
+
+    def posting_ids(self, term):
+        ids = self._postings.ids(ingredient_key(term))
+        return np.zeros(0, dtype=np.uint32) if ids is None else ids
+
+    def facet_counts(self, selected_ingredients, search_query="", search_bits=None):
+        # Two vectorized passes over the posting section (rows are in
+        # vocabulary order) instead of a bitset per vocabulary term
+        search_bits, current, selected_keys = self._facet_filters(
+            selected_ingredients, search_query, search_bits
+        )
+        n = len(self)
+        if search_bits == self.all_bits:
+            hits = self._postings.row_counts(None)
+        else:
+            hits = self._postings.row_counts(_bits_to_mask(search_bits, n))
+        # Without a selection every hit is a new result
+        added = hits
+        if current:
+            added = self._postings.row_counts(_bits_to_mask(search_bits & ~current, n))
+        shown = popcount(current)
+        counts = {}
+        for term, hit, add in zip(self.vocabulary, hits.tolist(), added.tolist()):
+            if term in selected_keys:
+                counts[term] = shown
+            elif hit:
+                counts[term] = shown + add
+        return counts
+
+
+def open_snapshot(store, path=None):
+    """
+    Open the snapshot of a store, compiling it first when missing or stale
+
+    Snapshots of older store versions are deleted once the current one is
+    open (see remove_stale_snapshots); their mappings stay valid until
+    closed.
+
+    Args:
+        store (RecipeStore): Recipe store the snapshot is compiled from
+        path (str or Path): Snapshot file (default: the versioned file
+            next to the database)
+
+    Returns:
+        RecipeSnapshot: Snapshot matching the store's current version
+    """
+    version = store.version()
+    path = Path(path or default_snapshot_path(store, version))
+    if path.exists():
+        snapshot = RecipeSnapshot(path)
+        if snapshot.store_version == version:
+            return snapshot
+        snapshot.close()
+    compile_store_snapshot(store, path)
+    snapshot = RecipeSnapshot(path)
+    remove_stale_snapshots(store, keep=path)
+    return snapshot
+
+
+if __name__ == "__main__":
+    store = RecipeStore()
+    start = time.perf_counter()
+    path = compile_store_snapshot(store)
+    snapshot = RecipeSnapshot(path)
+    remove_stale_snapshots(store, keep=path)
+    print(f"✅ Compiled {len(snapshot)} recipes into {path} "
+          f"({snapshot.nbytes / 1024:.0f} KB, {time.perf_counter() - start:.2f}s)")
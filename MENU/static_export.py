@@ -0,0 +1,379 @@
+"""
+static_export.py - Export the recipe corpus as a static HTML site
+ส่งออกสูตรอาหารทั้งหมดเป็นหน้า HTML สำเร็จรูป เสิร์ฟเป็นไฟล์ธรรมดาได้โดยไม่ต้องมี Python
+
+Every recipe in the recipe store is rendered with the Flask prototype's
+template (templates/recipe.html, the page app1.py serves), along with a
+paginated index and one listing page per canonical ingredient. Each page
+gets .gz (and .br, when the brotli package is installed) siblings, so a web
+server can send them precompressed (nginx: gzip_static / brotli_static).
+
+Builds are incremental: site/.manifest.json keeps a hash of each page's
+template and data, and only pages whose hash changed are rendered again.
+Pages of recipes that left the corpus are removed.
+
+Usage:
+    python static_export.py                   # write site/
+    python static_export.py --out /var/www/recipes --page-size 60
+    python static_export.py --full            # re-render every page
+"""
+
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import quote
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+sys.path.insert(0, str(Path(__file__).parent / "1"))
+
+from image_store import ImageStore
+from recipe_cache import iter_bounded, write_bytes_atomic, write_json_atomic
+from recipe_index import recipe_canonical_ingredients
+from recipe_store import RecipeStore
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MENU_DIR = Path(__file__).parent
+TEMPLATE_DIR = MENU_DIR / "templates"
+DEFAULT_OUTPUT_DIR = MENU_DIR / "site"
+RECIPES_CACHE_FILE = MENU_DIR / "recipes_cache.json"
+MANIFEST_NAME = ".manifest.json"
+
+PAGE_SIZE = 48
+CARD_IMAGE_WIDTH = 480
+DETAIL_IMAGE_WIDTH = 1200
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Canonical names listed under "เครื่องปรุง" instead of the main ingredients
+SEASONINGS = {
+    "เกลือ", "น้ำตาลทราย", "น้ำตาลปี๊บ", "น้ำปลา", "ซีอิ๊วขาว", "ซีอิ๊วดำ",
+    "ซอสหอยนางรม", "ซอสปรุงรส", "พริกไทย", "น้ำมะนาว", "ผงปรุงรส", "ผงชูรส",
+}
+ICONS = {
+    "หมู": "🐷", "ไก่": "🍗", "เนื้อวัว": "🥩", "กุ้ง": "🦐", "ไข่ไก่": "🥚",
+    "ปลา": "🐟", "น้ำ": "💧", "กระเทียม": "🧄", "พริก": "🌶️", "น้ำปลา": "🐟",
+    "น้ำมะนาว": "🍋", "น้ำตาลทราย": "🍯", "เกลือ": "🧂", "ใบกะเพรา": "🌿",
+}
+DEFAULT_ICON = "🥬"
+SEASONING_ICON = "🥄"
+
+# Characters that cannot appear in file names on common file systems
+_UNSAFE_FILENAME = re.compile(r'[\s/\\:*?"<>|#%]+')
+
+
+def slugify(name):
+    """File name stem for a page title (Thai text is kept as is)"""
+    slug = _UNSAFE_FILENAME.sub("-", (name or "").strip()).strip("-.")
+    return slug or hashlib.sha1((name or "").encode("utf-8")).hexdigest()[:10]
+
+
+def compress_variants(data):
+    """
+    Precompressed encodings of a page
+
+    Returns:
+        dict: File suffix -> compressed bytes (".gz", plus ".br" with brotli)
+    """
+    # mtime=0 keeps the output identical for identical input
+    variants = {".gz": gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(data, quality=BROTLI_QUALITY)
+    return variants
+
+
+def load_corpus(store=None):
+    """Recipes of the recipe store, seeding an empty store from recipes_cache.json"""
+    store = store or RecipeStore()
+    if store.count() == 0 and RECIPES_CACHE_FILE.exists():
+        store.import_json(RECIPES_CACHE_FILE)
+    return store.load_recipes()
+
+
+class StaticSiteExporter:
+    """
+    Render recipes into a directory of static, precompressed HTML files
+
+    Layout (all links are relative, so the site can live under any path):
+        index.html, page/2.html, ...     paginated recipe index
+        recipe/<id>.html                 one page per recipe
+        ingredients.html                 every canonical ingredient
+        ingredient/<name>.html           recipes using one ingredient
+        images/                          WebP/JPEG variants from the image store
+    """
+
+    def __init__(self, output_dir=DEFAULT_OUTPUT_DIR, page_size=PAGE_SIZE,
+                 image_store=None, max_workers=None):
+        self.output_dir = Path(output_dir)
+        self.page_size = max(1, page_size)
+        self.image_store = image_store if image_store is not None else ImageStore()
+        # zlib and brotli release the GIL while compressing
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.env = Environment(
+            loader=FileSystemLoader(TEMPLATE_DIR),
+            autoescape=select_autoescape(["html"]),
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+        self.templates_digest = self._templates_digest()
+
+    @staticmethod
+    def _templates_digest():
+        # Any template edit (base.html included) changes every page hash
+        digest = hashlib.sha256()
+        for path in sorted(TEMPLATE_DIR.glob("*.html")):
+            digest.update(path.name.encode("utf-8"))
+            digest.update(path.read_bytes())
+        return digest.hexdigest()
+
+    # ------------------------------------------
+    # Page data
+    # ------------------------------------------
+
+    def _copy_image(self, path, image_paths):
+        rel = f"images/{path.name}"
+        target = self.output_dir / rel
+        # Variant names contain the image digest, so an existing file is current
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(path, target)
+        image_paths.add(rel)
+        return rel
+
+    def _image(self, recipe, width, image_paths):
+        webp = self.image_store.image_for_recipe(recipe, width, formats=("webp",))
+        jpeg = self.image_store.image_for_recipe(recipe, width, formats=("jpeg",))
+        if webp is None and jpeg is None:
+            # Not in the image store: link the source image if there is one
+            remote = recipe.get("image") or ""
+            return {"webp": None, "fallback": remote} if "://" in remote else None
+        image = {"webp": None, "fallback": None}
+        if webp is not None and webp.suffix == ".webp":
+            image["webp"] = self._copy_image(webp, image_paths)
+        image["fallback"] = self._copy_image(jpeg or webp, image_paths)
+        return image
+
+    def _ingredient_items(self, recipe, ingredient_hrefs):
+        """Split a recipe's ingredient lines into the template's main and seasoning cards"""
+        entries = {}
+        for entry in recipe.get("ingredients_structured", []):
+            entries.setdefault(entry["text"], []).append(entry)
+
+        main, seasoning = [], []
+        for line in recipe.get("ingredients", []):
+            parsed = entries.get(line)
+            if not parsed:
+                main.append({"icon": DEFAULT_ICON, "name": line, "qty": "", "desc": "", "href": None})
+                continue
+            for entry in parsed:
+                name = entry["name"]
+                qty = " ".join(part for part in (entry.get("quantity"), entry.get("unit")) if part)
+                is_seasoning = name in SEASONINGS
+                item = {
+                    "icon": ICONS.get(name, SEASONING_ICON if is_seasoning else DEFAULT_ICON),
+                    "name": entry.get("raw_name") or name,
+                    "qty": qty,
+                    "desc": entry.get("note") or "",
+                    "href": ingredient_hrefs.get(name),
+                }
+                (seasoning if is_seasoning else main).append(item)
+        return main, seasoning
+
+    def recipe_page_data(self, recipe, ingredient_hrefs, image_paths):
+        """
+        Template data for one recipe, in the shape app1.py passes to recipe.html
+
+        Args:
+            recipe (dict): Recipe dictionary from the store
+            ingredient_hrefs (dict): Canonical name -> ingredient page path
+            image_paths (set): Collects the image files the site uses
+
+        Returns:
+            dict: title, description, ingredients_main, seasoning, steps, ...
+        """
+        main, seasoning = self._ingredient_items(recipe, ingredient_hrefs)
+        details = [text for text in (recipe.get("time"), recipe.get("difficulty")) if text]
+        aliases = recipe.get("aliases") or []
+        description = " · ".join(details)
+        if aliases:
+            description = " · ".join([*details, "หรือ " + ", ".join(aliases)])
+        return {
+            "title": recipe.get("name", ""),
+            "description": description,
+            "image": self._image(recipe, DETAIL_IMAGE_WIDTH, image_paths),
+            "ingredients_main": main,
+            "seasoning": seasoning,
+            "steps": recipe.get("steps", []),
+            "sources": recipe.get("source_urls") or ([recipe["url"]] if recipe.get("url") else []),
+        }
+
+    # ------------------------------------------
+    # Build
+    # ------------------------------------------
+
+    def _page_jobs(self, recipes, image_paths):
+        """Yield (path, template, context) for every page of the site"""
+        recipe_hrefs = [f"recipe/{recipe.get('id', i)}.html" for i, recipe in enumerate(recipes)]
+
+        by_ingredient = {}
+        for i, recipe in enumerate(recipes):
+            for name in recipe_canonical_ingredients(recipe):
+                by_ingredient.setdefault(name, []).append(i)
+        ingredient_files = {}
+        taken = set()
+        for name in sorted(by_ingredient):
+            slug = slugify(name)
+            while slug.lower() in taken:
+                slug += "-"
+            taken.add(slug.lower())
+            ingredient_files[name] = f"ingredient/{slug}.html"
+        ingredient_hrefs = {
+            name: "ingredient/" + quote(path.split("/", 1)[1]) for name, path in ingredient_files.items()
+        }
+
+        summaries = []
+        for i, recipe in enumerate(recipes):
+            summaries.append({
+                "name": recipe.get("name", ""),
+                "href": recipe_hrefs[i],
+                "image": self._image(recipe, CARD_IMAGE_WIDTH, image_paths),
+                "ingredient_count": len(recipe.get("ingredients", [])),
+                "time": recipe.get("time") or "",
+            })
+            yield recipe_hrefs[i], "recipe.html", {
+                "data": self.recipe_page_data(recipe, ingredient_hrefs, image_paths),
+            }
+
+        pages = max(1, -(-len(recipes) // self.page_size))
+        page_paths = ["index.html"] + [f"page/{n}.html" for n in range(2, pages + 1)]
+        for n, path in enumerate(page_paths, 1):
+            start = (n - 1) * self.page_size
+            yield path, "index.html", {
+                "page": n,
+                "pages": pages,
+                "total": len(recipes),
+                "recipes": summaries[start:start + self.page_size],
+                "prev_href": page_paths[n - 2] if n > 1 else None,
+                "next_href": page_paths[n] if n < pages else None,
+            }
+
+        yield "ingredients.html", "ingredients.html", {
+            "ingredients": [
+                {"name": name, "href": ingredient_hrefs[name], "count": len(by_ingredient[name])}
+                for name in sorted(by_ingredient, key=lambda n: (-len(by_ingredient[n]), n))
+            ],
+        }
+        for name, path in ingredient_files.items():
+            yield path, "ingredient.html", {
+                "ingredient": name,
+                "recipes": [summaries[i] for i in by_ingredient[name]],
+            }
+
+    def _page_hash(self, template, context):
+        payload = json.dumps(context, ensure_ascii=False, sort_keys=True)
+        digest = hashlib.sha256(self.templates_digest.encode("ascii"))
+        digest.update(template.encode("utf-8"))
+        digest.update(payload.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _render_page(self, job):
+        path, template, context = job
+        # Relative prefix back to the site root ("" or "../")
+        root = "../" * path.count("/")
+        html = self.env.get_template(template).render(root=root, **context).encode("utf-8")
+        target = self.output_dir / path
+        write_bytes_atomic(target, html)
+        for suffix, data in compress_variants(html).items():
+            write_bytes_atomic(target.with_name(target.name + suffix), data)
+        return len(html)
+
+    def _remove_page(self, path):
+        target = self.output_dir / path
+        for suffix in ("", ".gz", ".br"):
+            candidate = target.with_name(target.name + suffix)
+            if candidate.exists():
+                candidate.unlink()
+
+    def build(self, recipes, full=False):
+        """
+        Render the site, skipping pages whose content hash is unchanged
+
+        Args:
+            recipes (list): Recipe dictionaries (as loaded from the store)
+            full (bool): Re-render every page regardless of the manifest;
+                pages of removed recipes are still deleted
+
+        Returns:
+            dict: pages, rendered, unchanged and removed counts, bytes written, seconds
+        """
+        start = time.perf_counter()
+        manifest_path = self.output_dir / MANIFEST_NAME
+        previous = {"pages": {}, "images": []}
+        # Loaded even for a full build: its page list drives the removal pass
+        if manifest_path.exists():
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+
+        image_paths = set()
+        hashes = {}
+        stats = {"pages": 0, "rendered": 0, "unchanged": 0, "removed": 0, "bytes": 0}
+
+        def changed_jobs():
+            for path, template, context in self._page_jobs(recipes, image_paths):
+                page_hash = self._page_hash(template, context)
+                hashes[path] = page_hash
+                stats["pages"] += 1
+                if (not full and previous["pages"].get(path) == page_hash
+                        and (self.output_dir / path).exists()):
+                    stats["unchanged"] += 1
+                    continue
+                yield path, template, context
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for _, size in iter_bounded(pool, self._render_page, changed_jobs(),
+                                        window=self.max_workers * 4):
+                stats["rendered"] += 1
+                stats["bytes"] += size
+
+        for path in set(previous["pages"]) - set(hashes):
+            self._remove_page(path)
+            stats["removed"] += 1
+        for path in set(previous.get("images", [])) - image_paths:
+            self._remove_page(path)
+
+        write_json_atomic(manifest_path, {
+            "pages": hashes,
+            "images": sorted(image_paths),
+            "compression": sorted([".gz"] + ([".br"] if brotli is not None else [])),
+        }, indent=None)
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the recipe corpus as a static HTML site")
+    parser.add_argument("--out", default=str(DEFAULT_OUTPUT_DIR), help="Output directory")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE, help="Recipes per index page")
+    parser.add_argument("--workers", type=int, default=None, help="Render/compress threads")
+    parser.add_argument("--full", action="store_true", help="Re-render every page")
+    args = parser.parse_args()
+
+    recipes = load_corpus()
+    exporter = StaticSiteExporter(args.out, page_size=args.page_size, max_workers=args.workers)
+    stats = exporter.build(recipes, full=args.full)
+    print(f"✅ {stats['pages']} pages in {exporter.output_dir}: {stats['rendered']} rendered, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed ({stats['seconds']}s)")
+    if brotli is None:
+        print("ℹ️ Install the brotli package to also write .br files")
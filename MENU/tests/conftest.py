@@ -0,0 +1,45 @@
+"""
+conftest.py - Shared fixtures for the pytest suite
+ข้อมูลทดสอบที่ใช้ร่วมกัน: ชุดสูตรจำลอง และที่เก็บสูตรชั่วคราว
+
+Run from MENU/:
+
+    python -m pytest -q
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+MENU_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MENU_DIR))
+sys.path.insert(0, str(MENU_DIR / "1"))
+sys.path.insert(0, str(MENU_DIR / "benchmarks"))
+
+from corpus import generate_corpus  # noqa: E402
+from recipe_store import RecipeStore  # noqa: E402
+
+RECIPES_CACHE_FILE = MENU_DIR / "recipes_cache.json"
+
+
+@pytest.fixture(scope="session")
+def synthetic_recipes():
+    """2,000 synthetic recipes built from the repo's seed data"""
+    return generate_corpus(2000, random_seed=7)
+
+
+@pytest.fixture
+def cached_recipes():
+    """The scraped recipes shipped in recipes_cache.json"""
+    with open(RECIPES_CACHE_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def store(tmp_path, cached_recipes):
+    """Recipe store in a temp directory, seeded with recipes_cache.json"""
+    store = RecipeStore(tmp_path / "recipes.db")
+    store.upsert_recipes(cached_recipes)
+    return store
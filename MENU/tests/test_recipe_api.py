@@ -0,0 +1,55 @@
+"""ETag revalidation and corpus reloads of the JSON API"""
+
+import pytest
+
+import recipe_api
+
+
+@pytest.fixture
+def client(store, monkeypatch):
+    monkeypatch.setattr(recipe_api, "_store", store)
+    monkeypatch.setattr(recipe_api, "_corpus", None)
+    monkeypatch.setattr(recipe_api, "_query_cache", recipe_api.QueryCache())
+    return recipe_api.app.test_client()
+
+
+def test_matching_etag_gets_304(client):
+    response = client.get("/api/recipes?ingredients=กระเทียม&rank=idf")
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert etag.startswith('W/"')
+    assert response.headers["Cache-Control"] == "public, no-cache"
+
+    cached = client.get("/api/recipes?ingredients=กระเทียม&rank=idf",
+                        headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.data == b""
+    assert cached.headers["ETag"] == etag
+
+
+def test_every_endpoint_shares_the_corpus_etag(client):
+    etags = {client.get(path).headers["ETag"]
+             for path in ("/api/version", "/api/search?q=ไข่", "/api/ingredients")}
+    assert len(etags) == 1
+
+
+def test_store_change_changes_the_etag(client, store):
+    etag = client.get("/api/version").headers["ETag"]
+    old_corpus = recipe_api._corpus
+    store.upsert_recipes([{"name": "ไข่ตุ๋น", "ingredients": ["ไข่ไก่ 3 ฟอง", "น้ำซุป 1 ถ้วย"],
+                           "steps": ["ตีไข่", "นึ่ง"]}])
+    # Skip the reload check interval
+    old_corpus.checked_at = 0
+
+    response = client.get("/api/version", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.get_json()["recipes"] == len(store.load_recipes())
+    # The replaced corpus is unmapped once no request reads it
+    assert old_corpus.snapshot._mmap is None
+
+
+def test_gzip_for_clients_that_accept_it(client):
+    response = client.get("/api/recipes?per_page=50", headers={"Accept-Encoding": "gzip"})
+    assert response.headers.get("Content-Encoding") == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
@@ -0,0 +1,51 @@
+"""MinHash/LSH near-duplicate clustering"""
+
+from recipe_dedup import MIN_INGREDIENTS, collapse_duplicates, find_clusters
+
+KRAPAO = ["ไก่ 300 กรัม", "กระเทียม 3 กลีบ", "น้ำปลา 2 ช้อนโต๊ะ", "พริกขี้หนู 5 เม็ด",
+          "ใบกะเพรา 1 กำ", "น้ำมันพืช 2 ช้อนโต๊ะ"]
+OMELETTE = ["หมู 200 กรัม", "ไข่ไก่ 2 ฟอง", "ซีอิ๊วขาว 1 ช้อนโต๊ะ", "ต้นหอม 2 ต้น",
+            "พริกไทย 1 ช้อนชา"]
+
+
+def recipe(name, ingredients, url, steps=("ผัดให้เข้ากัน",)):
+    return {"name": name, "ingredients": list(ingredients), "steps": list(steps), "url": url}
+
+
+def test_same_dish_from_two_sources_is_one_cluster():
+    recipes = [
+        recipe("ผัดกะเพราไก่", KRAPAO, "https://a.example/1"),
+        recipe("ไข่เจียวหมูสับ", OMELETTE, "https://a.example/2"),
+        # Same ingredients, amounts written differently, similar title
+        recipe("ผัดกะเพราไก่สูตรเด็ด", [line.replace("2 ช้อนโต๊ะ", "1 ช้อนโต๊ะ") for line in KRAPAO],
+               "https://b.example/9"),
+    ]
+    assert find_clusters(recipes) == [[0, 2]]
+
+
+def test_different_dishes_are_not_clustered(synthetic_recipes):
+    recipes = synthetic_recipes[:500]
+    clustered = {i for cluster in find_clusters(recipes) for i in cluster}
+    # Every synthetic recipe is a random ingredient mix: almost none coincide
+    assert len(clustered) <= len(recipes) // 50
+
+
+def test_short_recipes_are_never_merged():
+    short = KRAPAO[:MIN_INGREDIENTS - 1]
+    recipes = [recipe("ผัดกะเพรา", short, "https://a.example/1"),
+               recipe("ผัดกะเพรา", short, "https://b.example/1")]
+    assert find_clusters(recipes) == []
+
+
+def test_collapse_keeps_the_richest_copy_and_every_source():
+    recipes = [
+        recipe("ผัดกะเพราไก่", KRAPAO, "https://a.example/1"),
+        recipe("กะเพราไก่", KRAPAO, "https://b.example/9",
+               steps=["ตั้งกระทะ", "ผัดกระเทียม", "ใส่ไก่", "ใส่ใบกะเพรา"]),
+        recipe("ไข่เจียวหมูสับ", OMELETTE, "https://a.example/2"),
+    ]
+    kept, clusters = collapse_duplicates(recipes)
+    assert clusters == [[0, 1]]
+    assert [r["name"] for r in kept] == ["กะเพราไก่", "ไข่เจียวหมูสับ"]
+    assert kept[0]["source_urls"] == ["https://b.example/9", "https://a.example/1"]
+    assert kept[0]["aliases"] == ["ผัดกะเพราไก่"]
@@ -0,0 +1,100 @@
+"""Bitset filters and top-k ranking against the naive per-recipe loops"""
+
+import random
+
+import pytest
+
+from bench_search import make_queries
+from ranking import RANKING_MODES, RankingEngine
+from recipe_index import (
+    RecipeIndex, bits_to_ids, ids_to_bits, ingredient_key, iter_ids, popcount,
+    recipe_canonical_ingredients,
+)
+
+
+def naive_filter(recipes, selected, search):
+    """Ids of the recipes containing the search text and any selected ingredient"""
+    query = search.strip().lower()
+    keys = {ingredient_key(ing) for ing in selected}
+    ids = []
+    for rid, recipe in enumerate(recipes):
+        text = recipe["name"].lower() + "\n" + " ".join(recipe["ingredients"]).lower()
+        if query and query not in text:
+            continue
+        if keys and not keys & set(recipe_canonical_ingredients(recipe)):
+            continue
+        ids.append(rid)
+    return ids
+
+
+def naive_top_k(index, ranking, selected, candidates, k, mode):
+    """Score every candidate, sort all of them and take k"""
+    weights = ranking.weights(selected, mode)
+    weight_sum = sum(weights.values())
+    scored = []
+    for rid in candidates:
+        names = set(recipe_canonical_ingredients(index.recipes[rid]))
+        matched = sum(weight for key, weight in weights.items() if key in names)
+        if mode == "coverage":
+            count = index.ingredient_counts[rid]
+            score = matched / count if count else 0.0
+        else:
+            score = matched / weight_sum
+        scored.append((rid, score))
+    scored.sort(key=lambda item: (-item[1], item[0]))
+    return scored[:k]
+
+
+@pytest.fixture(scope="module")
+def index(synthetic_recipes):
+    return RecipeIndex(synthetic_recipes)
+
+
+@pytest.mark.parametrize("bits", [0, 1, 1 << 200, ((1 << 5000) - 1) ^ (1 << 17)])
+def test_bitset_round_trip(bits):
+    ids = [i for i in range(bits.bit_length()) if bits >> i & 1]
+    assert list(iter_ids(bits)) == ids
+    assert bits_to_ids(bits).tolist() == ids
+    assert ids_to_bits(ids) == bits
+
+
+def test_filter_matches_naive_loop(index, synthetic_recipes):
+    for selected, search in make_queries(index, 200, random_seed=1):
+        expected = naive_filter(synthetic_recipes, selected, search)
+        bits = index.filter_bits(selected, search)
+        assert list(iter_ids(bits)) == expected, (selected, search)
+        assert popcount(bits) == len(expected)
+
+
+def test_search_matches_substring_scan(index, synthetic_recipes):
+    rnd = random.Random(3)
+    for _ in range(50):
+        name = synthetic_recipes[rnd.randrange(len(synthetic_recipes))]["name"]
+        start = rnd.randrange(len(name))
+        query = name[start:start + rnd.randint(1, 6)]
+        expected = naive_filter(synthetic_recipes, [], query)
+        assert list(iter_ids(index.search_bits(query))) == expected, query
+
+
+@pytest.mark.parametrize("mode", list(RANKING_MODES))
+def test_top_k_matches_full_sort(index, mode):
+    ranking = RankingEngine(index)
+    for selected, search in make_queries(index, 100, random_seed=2):
+        bits = index.filter_bits(selected, search)
+        expected = naive_top_k(index, ranking, selected, iter_ids(bits), 10, mode)
+        result = ranking.top_k(selected, bits, 10, mode)
+        assert [rid for rid, _ in result] == [rid for rid, _ in expected], (selected, search)
+        assert [score for _, score in result] == pytest.approx([s for _, s in expected])
+
+
+def test_top_k_without_selection_keeps_corpus_order(index):
+    bits = index.filter_bits([], "ไข่")
+    assert RankingEngine(index).top_k([], bits, 5) == [(rid, None) for rid in list(iter_ids(bits))[:5]]
+
+
+def test_facet_counts_match_filter_sizes(index):
+    selected = ["ไข่ไก่"]
+    counts = index.facet_counts(selected, "ผัด")
+    for term in index.vocabulary[:200]:
+        if term in counts:
+            assert counts[term] == popcount(index.filter_bits(selected + [term], "ผัด")), term
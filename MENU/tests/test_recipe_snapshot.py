@@ -0,0 +1,58 @@
+"""Compiled snapshot round-trip and its index against RecipeIndex"""
+
+import sys
+
+from recipe_index import RecipeIndex, iter_ids
+from recipe_snapshot import (
+    RecipeSnapshot, SnapshotRecipeIndex, compile_snapshot, default_snapshot_path, open_snapshot,
+)
+
+
+def test_round_trip_decodes_every_recipe(store, tmp_path):
+    recipes = store.load_recipes()
+    path = compile_snapshot(recipes, tmp_path / "recipes.snapshot", store_version=store.version())
+    snapshot = RecipeSnapshot(path)
+    assert len(snapshot) == len(recipes)
+    assert snapshot.store_version == store.version()
+    assert snapshot.version == RecipeIndex(recipes).version
+    assert [snapshot.recipe(rid) for rid in range(len(snapshot))] == recipes
+    snapshot.close()
+
+
+def test_round_trip_of_synthetic_recipes(synthetic_recipes, tmp_path):
+    recipes = synthetic_recipes[:300]
+    snapshot = RecipeSnapshot(compile_snapshot(recipes, tmp_path / "synthetic.snapshot"))
+    for rid in (0, 1, 150, 299):
+        decoded = snapshot.recipe(rid)
+        for field in ("name", "ingredients", "steps", "url", "difficulty", "time",
+                      "canonical_ingredients"):
+            assert decoded[field] == recipes[rid][field], field
+
+
+def test_snapshot_index_matches_recipe_index(store):
+    recipes = store.load_recipes()
+    index = RecipeIndex(recipes)
+    snapshot_index = SnapshotRecipeIndex(open_snapshot(store))
+    assert snapshot_index.vocabulary == index.vocabulary
+    for selected, search in [([], "ไข่"), (["กระเทียม"], ""), (["หมู", "ไก่"], "ผัด"), ([], "")]:
+        assert snapshot_index.filter_bits(selected, search) == index.filter_bits(selected, search)
+        assert snapshot_index.facet_counts(selected, search) == index.facet_counts(selected, search)
+    for term in index.vocabulary:
+        assert snapshot_index.posting_ids(term).tolist() == list(iter_ids(index.postings(term)))
+
+
+def test_new_store_version_gets_a_new_file(store, cached_recipes):
+    first = open_snapshot(store)
+    assert first.path == default_snapshot_path(store)
+    store.upsert_recipes([{"name": "ไข่เจียวหมูสับ", "ingredients": ["ไข่ไก่ 2 ฟอง", "หมูสับ 50 กรัม"],
+                           "steps": ["ตีไข่", "ทอด"]}])
+    second = open_snapshot(store)
+    assert second.path != first.path
+    assert len(second) == len(first) + 1
+    if sys.platform != "win32":
+        # Windows keeps a mapped file until its last mapping is closed
+        assert not first.path.exists()
+    # Still readable: the replaced file was mapped before it was removed
+    assert first.recipe(0)["name"] == cached_recipes[0]["name"]
+    first.close()
+    second.close()